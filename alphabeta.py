@@ -0,0 +1,465 @@
+"""
+deterministic alpha-beta searcher for analysis
+
+negamax with alpha-beta pruning and iterative deepening over the
+bitboard Position from bitboard.py. moves are ordered by the
+transposition table move, then moves that win a subboard, then the
+history heuristic, and moves that let the opponent play anywhere go
+last. the transposition table is keyed by the position's incrementally
+updated Zobrist hash, has a fixed number of slots and replaces entries
+from older searches or shallower depths first. with canonical=True it is
+keyed by the canonical hash from symmetry.py instead, so positions that
+are the same up to symmetry share an entry, at the cost of working the
+canonical hash out at every node.
+
+usage: python alphabeta.py [--depth D] [--seconds S] [--megabytes M] [--canonical]
+searches the opening position and reports nodes/sec and the table hit rate
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from bitboard import CELLS, FULL_BOARD, PLAYERS, WIN_LINES, WON_TABLE, Position
+from symmetry import INVERSE, canonical_hash, transform_move
+
+WIN_SCORE = 1_000_000
+# scores beyond this are wins or losses a known number of moves away
+WIN_THRESHOLD = WIN_SCORE - 1000
+INFINITY = WIN_SCORE + 1
+
+# score of a line still open for a player by how many of its cells they hold
+SUBBOARD_LINE_SCORES = (0, 1, 4, 0)
+TOP_LINE_SCORES = (0, 30, 150, 0)
+SUBBOARD_WON_SCORE = 60
+
+POPCOUNT = tuple(bin(mask).count("1") for mask in range(FULL_BOARD + 1))
+
+# transposition table bound flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# rough size of one table entry, a tuple of small ints in CPython
+ENTRY_BYTES = 120
+
+
+class SearchTimeout(Exception):
+    """raised inside the search when the time budget runs out"""
+
+
+def evaluate(position: Position) -> int:
+    """score position for the player to move, positive is good for them"""
+
+    scores = [0, 0]
+    boards = position.boards
+    for player in (0, 1):
+        other = player ^ 1
+
+        # lines on the top board still open for player
+        for line in WIN_LINES:
+            if not boards[other] & line:
+                scores[player] += TOP_LINE_SCORES[POPCOUNT[boards[player] & line]]
+        scores[player] += SUBBOARD_WON_SCORE * POPCOUNT[boards[player]]
+
+    won = boards[0] | boards[1]
+    for subboard in range(CELLS):
+        if won >> subboard & 1:
+            continue
+        masks = (
+            position.subboard_mask(0, subboard),
+            position.subboard_mask(1, subboard),
+        )
+        for player in (0, 1):
+            own = masks[player]
+            blocked = masks[player ^ 1]
+            for line in WIN_LINES:
+                if not blocked & line:
+                    scores[player] += SUBBOARD_LINE_SCORES[POPCOUNT[own & line]]
+
+    player = position.player
+    return scores[player] - scores[player ^ 1]
+
+
+class TranspositionTable:
+    """fixed size table of search results indexed by Zobrist hash"""
+
+    # one (hash, depth, value, flag, move, generation) tuple or None per slot
+    entries: list[tuple | None]
+    mask: int
+    # bumped once per search so entries from older searches get replaced first
+    generation: int
+
+    probes: int
+    hits: int
+    stores: int
+    replacements: int
+
+    def __init__(self, megabytes: float = 16) -> None:
+
+        slots = max(1, int(megabytes * 2**20 / ENTRY_BYTES))
+        # round down to a power of two so a hash can be masked into a slot
+        size = 1 << (slots.bit_length() - 1)
+
+        self.entries = [None] * size
+        self.mask = size - 1
+        self.generation = 0
+        self.reset_counters()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def reset_counters(self) -> None:
+        """zero the probe and store counters"""
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """fraction of probes that found their position"""
+        return self.hits / max(self.probes, 1)
+
+    def occupancy(self) -> float:
+        """fraction of slots in use"""
+        return sum(entry is not None for entry in self.entries) / len(self.entries)
+
+    def new_search(self) -> None:
+        """age every stored entry"""
+        self.generation += 1
+
+    def probe(self, key: int) -> tuple | None:
+        """return the entry for key, None if it is not stored"""
+
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, value: int, flag: int, move) -> None:
+        """
+        store a result, an entry for another position is only replaced
+        if it is from an older search or was searched less deep
+        """
+
+        index = key & self.mask
+        old = self.entries[index]
+        if old is not None and old[0] != key:
+            if old[5] == self.generation and old[1] > depth:
+                return
+            self.replacements += 1
+
+        self.entries[index] = (key, depth, value, flag, move, self.generation)
+        self.stores += 1
+
+
+def score_to_table(value: int, ply: int) -> int:
+    """store win scores relative to the position instead of the root"""
+
+    if value > WIN_THRESHOLD:
+        return value + ply
+    if value < -WIN_THRESHOLD:
+        return value - ply
+    return value
+
+
+def score_from_table(value: int, ply: int) -> int:
+    """convert a stored win score back to be relative to the root"""
+
+    if value > WIN_THRESHOLD:
+        return value - ply
+    if value < -WIN_THRESHOLD:
+        return value + ply
+    return value
+
+
+class AlphaBetaSearcher:
+    """negamax alpha-beta search with iterative deepening"""
+
+    table: TranspositionTable
+    # history heuristic score of each (subboard, cell) move
+    history: dict[tuple[int, int], int]
+    deadline: float | None
+    # key the table by canonical hash, table moves are then canonical moves
+    canonical: bool
+
+    # statistics of the last search
+    nodes: int
+    seconds: float
+    depth: int
+    score: int
+
+    def __init__(self, megabytes: float = 16, canonical: bool = False) -> None:
+
+        self.table = TranspositionTable(megabytes)
+        self.history = {}
+        self.deadline = None
+        self.canonical = canonical
+
+        self.nodes = 0
+        self.seconds = 0.0
+        self.depth = 0
+        self.score = 0
+
+    @property
+    def nodes_per_second(self) -> float:
+        """nodes searched per second by the last search"""
+        return self.nodes / max(self.seconds, 1e-9)
+
+    def report(self) -> str:
+        """describe the last search"""
+
+        return (
+            f"alphabeta: depth {self.depth} score {self.score} "
+            f"{self.nodes} nodes in {self.seconds:.2f}s "
+            f"({self.nodes_per_second:,.0f}/s), "
+            f"tt hit rate {self.table.hit_rate:.1%}"
+        )
+
+    def table_key(self, position: Position) -> tuple[int, int]:
+        """the table key of position and the transform table moves are stored in"""
+
+        if self.canonical:
+            return canonical_hash(position)
+        return position.hash, 0
+
+    def order_moves(self, position: Position, moves: list, tt_move) -> list:
+        """sort moves so the ones most likely to cause a cutoff come first"""
+
+        player = position.player
+        history = self.history
+
+        def key(move) -> int:
+            if move == tt_move:
+                return 1 << 40
+            subboard, cell = move
+            score = history.get(move, 0)
+            if WON_TABLE[position.subboard_mask(player, subboard) | 1 << cell]:
+                score += 1 << 30
+            if cell != subboard and not position.is_playable(cell):
+                # the opponent may play anywhere after this move
+                score -= 1 << 20
+            return score
+
+        return sorted(moves, key=key, reverse=True)
+
+    def search(
+        self,
+        position: Position,
+        max_depth: int = 64,
+        seconds: float | None = None,
+        verbose: bool = False,
+    ) -> tuple[int, int] | None:
+        """
+        search position deeper and deeper until max_depth or the time runs out,
+        return the best move of the deepest finished iteration
+        """
+
+        position = position.copy()
+        self.table.new_search()
+        self.table.reset_counters()
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+
+        start = time.perf_counter()
+        self.deadline = None if seconds is None else start + seconds
+
+        moves = position.legal_moves()
+        if not moves:
+            return None
+        best_move = self.order_moves(position, moves, None)[0]
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.search_root(position, depth, best_move)
+            except SearchTimeout:
+                break
+
+            best_move = move
+            self.depth = depth
+            self.score = score
+            self.seconds = time.perf_counter() - start
+            if verbose:
+                print(self.report())
+
+            # no point searching deeper once the result is known
+            if abs(score) > WIN_THRESHOLD:
+                break
+
+        self.seconds = time.perf_counter() - start
+        return best_move
+
+    def search_root(self, position: Position, depth: int, best_move) -> tuple:
+        """search every root move to depth, return the best score and move"""
+
+        moves = self.order_moves(position, position.legal_moves(), best_move)
+        alpha = -INFINITY
+        for move in moves:
+            position.apply_move(move)
+            try:
+                value = -self.negamax(position, depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                position.undo_move()
+            if value > alpha:
+                alpha = value
+                best_move = move
+
+        key, transform = self.table_key(position)
+        table_move = transform_move(best_move, transform) if transform else best_move
+        self.table.store(key, depth, alpha, EXACT, table_move)
+        return alpha, best_move
+
+    def negamax(
+        self, position: Position, depth: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        """return the score of position for the player to move"""
+
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 1023 == 0:
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout
+
+        if position.winner is not None:
+            # the player who just moved won
+            return ply - WIN_SCORE
+        if position.drawn:
+            return 0
+        if depth <= 0:
+            return evaluate(position)
+
+        key, transform = self.table_key(position)
+        alpha_original = alpha
+        tt_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            tt_move = entry[4]
+            if transform and tt_move is not None:
+                tt_move = transform_move(tt_move, INVERSE[transform])
+            if entry[1] >= depth:
+                value = score_from_table(entry[2], ply)
+                flag = entry[3]
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        best = -INFINITY
+        best_move = None
+        for move in self.order_moves(position, position.legal_moves(), tt_move):
+            position.apply_move(move)
+            try:
+                value = -self.negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                position.undo_move()
+
+            if value > best:
+                best = value
+                best_move = move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best <= alpha_original:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if transform and best_move is not None:
+            best_move = transform_move(best_move, transform)
+        self.table.store(key, depth, score_to_table(best, ply), flag, best_move)
+
+        return best
+
+
+class AlphaBetaPlayer:
+    """computer player that picks moves with AlphaBetaSearcher"""
+
+    searcher: AlphaBetaSearcher
+    seconds: float | None
+    max_depth: int
+    verbose: bool
+    # an OpeningBook consulted before searching, or None
+    book: object | None
+
+    def __init__(
+        self,
+        seconds: float | None = 1.0,
+        max_depth: int = 64,
+        megabytes: float = 16,
+        verbose: bool = False,
+        book=None,
+        canonical: bool = False,
+    ) -> None:
+
+        self.searcher = AlphaBetaSearcher(megabytes, canonical)
+        self.seconds = seconds
+        self.max_depth = max_depth
+        self.verbose = verbose
+        self.book = book
+
+    def report(self) -> str:
+        """describe the last search"""
+        return self.searcher.report()
+
+    def choose_move(self, position: Position) -> tuple[int, int]:
+        """search from position and return the best move found"""
+
+        if position.is_over():
+            raise ValueError("the game is already over")
+
+        if self.book is not None:
+            entry = self.book.lookup(position)
+            if entry is not None:
+                if self.verbose:
+                    print(f"alphabeta: book move {entry.move}")
+                return entry.move
+
+        move = self.searcher.search(position, self.max_depth, self.seconds)
+        if self.verbose:
+            print(self.report())
+        return move
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="search the opening position")
+    parser.add_argument("--depth", type=int, default=6, help="deepest iteration")
+    parser.add_argument("--seconds", type=float, help="stop after this long")
+    parser.add_argument(
+        "--megabytes", type=float, default=16, help="transposition table size"
+    )
+    parser.add_argument(
+        "--canonical",
+        action="store_true",
+        help="share table entries between positions that are the same up to symmetry",
+    )
+    args = parser.parse_args()
+
+    searcher = AlphaBetaSearcher(args.megabytes, args.canonical)
+    position = Position()
+    move = searcher.search(position, args.depth, args.seconds, verbose=True)
+
+    print(f"best move for {PLAYERS[position.player]}: {move}")
+    print(
+        f"table: {len(searcher.table)} slots, "
+        f"{searcher.table.occupancy():.1%} used, "
+        f"{searcher.table.replacements} replacements"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+background analysis of the position on the screen
+
+a worker process runs Monte Carlo Tree Search playouts on the position it
+was last sent and, every batch of playouts, sends back an estimate of the
+chance the player to move wins after each legal move. it keeps refining
+until it reaches its playout limit or a new position arrives, at which
+point the old tree is thrown away. a position in the opening book starts
+with the book move already searched, so it is shown straight away.
+
+once at most SOLVE_EMPTY_CELLS cells are empty the worker also solves the
+position exactly with the df-pn solver, SOLVE_BATCH_NODES nodes between
+two batches of playouts so new requests are still seen straight away, and
+sends back the result once it is proven, or gives up after
+SOLVE_MAX_NODES nodes. the solver's node table is kept from one position
+to the next, since the next position is usually a child of the last. with
+a solver cache, proven positions are written when a position is solved or
+given up on and when the worker stops, not after every slice.
+
+the GUI only talks to the worker through two queues. Analysis.start and
+Analysis.cancel put a numbered request on one, Analysis.poll drains the
+other from the Tk event loop and drops estimates for any request but the
+latest, so a move played while the worker is busy never shows stale
+results and clicks and redraws are never blocked by the search.
+
+usage: python analysis.py [--seconds S] [--moves M]
+analyses the position after M random moves, the opening by default, and
+prints the estimate of every move and the exact result if it was solved
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import queue
+import time
+
+from bitboard import Position
+from book import OpeningBook
+from frozen import FrozenPosition
+from mcts import MCTSPlayer, Node
+from solver import DfpnSolver, Solution, empty_cells, late_position
+
+# playouts between two estimates sent back to the GUI
+BATCH_PLAYOUTS = 200
+# the worker goes idle after this many playouts on one position
+MAX_PLAYOUTS = 200_000
+
+# positions with at most this many empty cells are solved exactly
+SOLVE_EMPTY_CELLS = 40
+# solver nodes between two batches of playouts
+SOLVE_BATCH_NODES = 2000
+# the solver gives up on a position after this many nodes
+SOLVE_MAX_NODES = 1_000_000
+# memory for the solver's node table
+SOLVER_MEGABYTES = 64
+
+# colors of a move that loses for sure and one that wins for sure,
+# heat_color blends between them
+LOSS_COLOR = (208, 64, 64)
+WIN_COLOR = (64, 192, 64)
+
+
+def heat_color(chance: float) -> str:
+    """return the Tk color of a move the player to move wins chance of the time"""
+
+    chance = min(max(chance, 0.0), 1.0)
+    red, green, blue = (
+        round(loss + (win - loss) * chance) for loss, win in zip(LOSS_COLOR, WIN_COLOR)
+    )
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def move_estimates(root: Node) -> dict[tuple[int, int], tuple[float, int]]:
+    """map every expanded move of root to its win chance and visit count"""
+
+    return {
+        child.move: (child.wins / child.visits, child.visits)
+        for child in root.children
+        if child.visits
+    }
+
+
+def latest_request(requests, block: bool):
+    """return the newest request and drop the older ones, False if there are none"""
+
+    request = False
+    try:
+        request = requests.get(block=block)
+        while True:
+            request = requests.get_nowait()
+    except queue.Empty:
+        return request
+
+
+def add_book_move(root: Node, position: Position, book: OpeningBook) -> bool:
+    """give root a child for the book move with the book's statistics"""
+
+    entry = book.lookup(position)
+    if entry is None:
+        return False
+
+    child_position = position.copy()
+    child_position.play(*entry.move)
+    child = Node(entry.move, root, position.player, child_position.legal_moves())
+    child.visits = entry.visits
+    child.wins = entry.wins
+
+    root.untried.remove(entry.move)
+    root.children.append(child)
+    root.visits += entry.visits
+    return True
+
+
+def analysis_worker(
+    requests,
+    results,
+    batch: int,
+    limit: int,
+    seed,
+    book_path=None,
+    solve_cells: int = SOLVE_EMPTY_CELLS,
+    solver_cache=None,
+) -> None:
+    """
+    run in the worker process, refine the latest requested position until a
+    newer request arrives, a request is (number, FrozenPosition or None), None stops,
+    a result is (number, estimates, playouts, Solution or None)
+    """
+
+    searcher = MCTSPlayer(seconds=None, playouts=batch, seed=seed)
+    book = None if book_path is None else OpeningBook(book_path)
+    solver = DfpnSolver(SOLVER_MEGABYTES, solver_cache)
+
+    number = None
+    position = None
+    root = None
+    playouts = 0
+    # the position still being solved, None once it is solved or given up on
+    solving = None
+    solution = None
+    solve_nodes = 0
+    while True:
+        # wait for work when idle, otherwise only look for a newer request
+        request = latest_request(requests, block=position is None and solving is None)
+        if request is not False:
+            if request is None:
+                solver.close()
+                return
+            number, frozen = request
+            playouts = 0
+            solving = None
+            solution = None
+            solve_nodes = 0
+            if frozen is None or frozen.is_over():
+                position = None
+                root = None
+            else:
+                position = frozen.thaw()
+                root = Node(None, None, position.player ^ 1, position.legal_moves())
+                if book is not None and add_book_move(root, position, book):
+                    results.put((number, move_estimates(root), 0, None))
+                if empty_cells(frozen) <= solve_cells:
+                    solving = frozen
+            continue
+
+        if solving is not None:
+            solution = solver.solve(solving, SOLVE_BATCH_NODES)
+            solve_nodes += solver.nodes
+            if solution is None and solve_nodes >= SOLVE_MAX_NODES:
+                # keep whatever was proven before giving up
+                solver.save_cache()
+            if solution is not None or solve_nodes >= SOLVE_MAX_NODES:
+                solving = None
+                results.put((number, move_estimates(root), playouts, solution))
+
+        if position is None:
+            continue
+        for _ in range(batch):
+            searcher.playout(root, position)
+        playouts += batch
+        results.put((number, move_estimates(root), playouts, solution))
+
+        if playouts >= limit:
+            position = None
+
+
+class Analysis:
+    """the GUI's end of the analysis worker"""
+
+    process: multiprocessing.Process
+    requests: multiprocessing.Queue
+    results: multiprocessing.Queue
+    # number of the latest request, estimates for other numbers are stale
+    number: int
+    # (subboard, cell) -> (win chance for the player to move, visits)
+    estimates: dict[tuple[int, int], tuple[float, int]]
+    playouts: int
+    # the exact result for the player to move, None until it is solved
+    solution: Solution | None
+
+    def __init__(
+        self,
+        batch: int = BATCH_PLAYOUTS,
+        limit: int = MAX_PLAYOUTS,
+        seed=None,
+        book_path=None,
+        solve_cells: int = SOLVE_EMPTY_CELLS,
+        solver_cache=None,
+    ) -> None:
+
+        # spawn instead of fork so the worker does not inherit Tk's state
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=analysis_worker,
+            args=(
+                self.requests,
+                self.results,
+                batch,
+                limit,
+                seed,
+                book_path,
+                solve_cells,
+                solver_cache,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+
+        self.number = 0
+        self.estimates = {}
+        self.playouts = 0
+        self.solution = None
+
+    def start(self, position: Position) -> None:
+        """analyse position instead of whatever was being analysed"""
+
+        self.number += 1
+        self.estimates = {}
+        self.playouts = 0
+        self.solution = None
+        # frozen so the game's history is not pickled with it
+        self.requests.put((self.number, FrozenPosition.from_position(position)))
+
+    def cancel(self) -> None:
+        """stop analysing and forget the estimates"""
+
+        self.number += 1
+        self.estimates = {}
+        self.playouts = 0
+        self.solution = None
+        self.requests.put((self.number, None))
+
+    def poll(self) -> bool:
+        """collect the newest estimates without waiting, return True if they changed"""
+
+        changed = False
+        while True:
+            try:
+                number, estimates, playouts, solution = self.results.get_nowait()
+            except queue.Empty:
+                return changed
+            if number == self.number:
+                self.estimates = estimates
+                self.playouts = playouts
+                self.solution = solution
+                changed = True
+
+    def close(self) -> None:
+        """stop the worker process"""
+
+        self.requests.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="analyse the opening position")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--moves", type=int, default=0, help="random moves played before analysing"
+    )
+    parser.add_argument(
+        "--solver-cache", help="file of solved positions for the solver"
+    )
+    args = parser.parse_args()
+
+    position = late_position(args.moves, args.seed)
+    analysis = Analysis(seed=args.seed, solver_cache=args.solver_cache)
+    analysis.start(position.thaw())
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        time.sleep(0.05)
+        analysis.poll()
+    analysis.poll()
+    analysis.close()
+
+    print(f"{analysis.playouts} playouts")
+    for move, (chance, visits) in sorted(
+        analysis.estimates.items(), key=lambda item: item[1][0], reverse=True
+    ):
+        print(f"{move} {chance:6.1%} {visits:>7} visits")
+    if analysis.solution is not None:
+        print(analysis.solution.describe(position.player))
+
+
+if __name__ == "__main__":
+    main()
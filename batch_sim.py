@@ -0,0 +1,258 @@
+"""
+vectorized simulator that plays many random games in lockstep
+
+the state of N games is held in NumPy arrays and every step plays one
+random legal move in each unfinished game at once. the rules are the
+same as Position in bitboard.py, including ending the game as soon as
+the top board can no longer be won by either player.
+
+needs numpy, which the game itself does not.
+
+usage: python batch_sim.py [--games N] [--batch B] [--seed S]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from bitboard import CELLS, DRAWN_TABLE, OPENING_SUBBOARD, WON_TABLE
+
+# values stored in the cells and boards arrays
+EMPTY = 0
+X = 1
+O = 2
+# a subboard that is full without a winner
+CLOSED = 3
+# a game that ended with the top board drawn
+DRAW = 3
+
+# bit value of each index, a 9 long 0/1 row dotted with this is a 9 bit mask
+MASK_BITS = 1 << np.arange(CELLS, dtype=np.int64)
+WON = np.array(WON_TABLE, dtype=bool)
+DRAWN = np.array(DRAWN_TABLE, dtype=bool)
+
+
+def to_masks(owned: np.ndarray) -> np.ndarray:
+    """turn a (..., 9) boolean array into 9 bit masks"""
+    return owned.astype(np.int64) @ MASK_BITS
+
+
+class BatchStats:
+    """outcome statistics of a batch of finished games"""
+
+    games: int
+    x_wins: int
+    o_wins: int
+    draws: int
+    # lengths[n] is the number of games that ended after n moves
+    lengths: np.ndarray
+    seconds: float
+
+    def __init__(self, results: np.ndarray, lengths: np.ndarray, seconds) -> None:
+
+        self.games = len(results)
+        self.x_wins = int(np.count_nonzero(results == X))
+        self.o_wins = int(np.count_nonzero(results == O))
+        self.draws = int(np.count_nonzero(results == DRAW))
+        self.lengths = np.bincount(lengths, minlength=CELLS * CELLS + 1)
+        self.seconds = seconds
+
+    def merge(self, other: BatchStats) -> BatchStats:
+        """add the games of other to these statistics"""
+
+        self.games += other.games
+        self.x_wins += other.x_wins
+        self.o_wins += other.o_wins
+        self.draws += other.draws
+        self.lengths = self.lengths + other.lengths
+        self.seconds += other.seconds
+        return self
+
+    def mean_length(self) -> float:
+        """average number of moves per game"""
+
+        moves = np.arange(len(self.lengths))
+        return float(self.lengths @ moves) / max(self.games, 1)
+
+    def length_percentile(self, percent: float) -> int:
+        """the game length that percent of the games are no longer than"""
+
+        cumulative = np.cumsum(self.lengths)
+        return int(np.searchsorted(cumulative, cumulative[-1] * percent / 100))
+
+    def report(self) -> str:
+        """describe the outcomes"""
+
+        if self.games == 0:
+            return f"0 games in {self.seconds:.2f}s"
+        games = self.games
+        return (
+            f"{self.games} games in {self.seconds:.2f}s "
+            f"({self.games / max(self.seconds, 1e-9):,.0f}/s)\n"
+            f"X {self.x_wins / games:.1%}  O {self.o_wins / games:.1%}  "
+            f"draw {self.draws / games:.1%}\n"
+            f"length mean {self.mean_length():.1f} "
+            f"min {int(np.flatnonzero(self.lengths)[0])} "
+            f"p50 {self.length_percentile(50)} "
+            f"p95 {self.length_percentile(95)} "
+            f"max {int(np.flatnonzero(self.lengths)[-1])}"
+        )
+
+
+class BatchSimulator:
+    """N random games stored as arrays and advanced one ply at a time"""
+
+    games: int
+    rng: np.random.Generator
+    # keep every move in moves, for replaying the games
+    record_moves: bool
+
+    # (N, 9, 9) owner of every cell, indexed by subboard then cell
+    cells: np.ndarray
+    # (N, 9) owner of every subboard, CLOSED when full without a winner
+    boards: np.ndarray
+    # (N,) subboard that must be played in, -1 to play anywhere
+    forced: np.ndarray
+    # (N,) X or O, the player to move
+    player: np.ndarray
+    # (N,) EMPTY while the game is running, then X, O or DRAW
+    result: np.ndarray
+    # (N,) number of moves played
+    length: np.ndarray
+    # (N, 81) subboard * 9 + cell of every move, only kept if asked for
+    moves: np.ndarray | None
+
+    def __init__(self, games: int, seed=None, record_moves: bool = False) -> None:
+
+        self.games = games
+        self.rng = np.random.default_rng(seed)
+        self.record_moves = record_moves
+        self.reset()
+
+    def reset(self) -> None:
+        """start every game again from the opening position"""
+
+        games = self.games
+        self.cells = np.zeros((games, CELLS, CELLS), dtype=np.int8)
+        self.boards = np.zeros((games, CELLS), dtype=np.int8)
+        self.forced = np.full(games, OPENING_SUBBOARD, dtype=np.int8)
+        self.player = np.full(games, X, dtype=np.int8)
+        self.result = np.zeros(games, dtype=np.int8)
+        self.length = np.zeros(games, dtype=np.int16)
+        if self.record_moves:
+            self.moves = np.full((games, CELLS * CELLS), -1, dtype=np.int8)
+        else:
+            self.moves = None
+
+    def legal_mask(self, games: np.ndarray) -> np.ndarray:
+        """return an (n, 81) mask of the legal moves of each game in games"""
+
+        forced = self.forced[games]
+        allowed = (forced[:, None] == -1) | (
+            forced[:, None] == np.arange(CELLS)[None, :]
+        )
+        allowed &= self.boards[games] == EMPTY
+        legal = (self.cells[games] == EMPTY) & allowed[:, :, None]
+        return legal.reshape(len(games), CELLS * CELLS)
+
+    def step(self) -> int:
+        """play one random legal move in every running game, return how many are left"""
+
+        games = np.flatnonzero(self.result == EMPTY)
+        if len(games) == 0:
+            return 0
+
+        # a random key for every legal move, the largest one is played
+        legal = self.legal_mask(games)
+        keys = self.rng.random(legal.shape)
+        keys[~legal] = -1.0
+        move = keys.argmax(axis=1)
+        subboard = move // CELLS
+        cell = move % CELLS
+
+        player = self.player[games]
+        other = player ^ (X | O)
+        self.cells[games, subboard, cell] = player
+        if self.moves is not None:
+            self.moves[games, self.length[games]] = move
+        self.length[games] += 1
+
+        # did the move win or fill its subboard
+        played = self.cells[games, subboard]
+        won = WON[to_masks(played == player[:, None])]
+        full = (played != EMPTY).all(axis=1)
+        self.boards[games, subboard] = np.where(
+            won, player, np.where(full, CLOSED, EMPTY)
+        )
+
+        # did it win the top board
+        boards = self.boards[games]
+        top_won = WON[to_masks(boards == player[:, None])]
+
+        # can either player still complete a line on the top board,
+        # a subboard is blocked for a player once the other player won it,
+        # it is closed, or the other player has a cell in each of its lines
+        cells = self.cells[games]
+        open_boards = boards == EMPTY
+        x_dead = DRAWN[to_masks(cells == O)] & open_boards
+        o_dead = DRAWN[to_masks(cells == X)] & open_boards
+        x_blocked = to_masks((boards == O) | (boards == CLOSED) | x_dead)
+        o_blocked = to_masks((boards == X) | (boards == CLOSED) | o_dead)
+        drawn = DRAWN[x_blocked] & DRAWN[o_blocked] & ~top_won
+
+        self.result[games] = np.where(top_won, player, np.where(drawn, DRAW, EMPTY))
+
+        # send the next player to the subboard matching the cell if it is open
+        self.forced[games] = np.where(
+            self.boards[games, cell] == EMPTY, cell, -1
+        ).astype(np.int8)
+        self.player[games] = other
+
+        return int(np.count_nonzero(self.result == EMPTY))
+
+    def run(self) -> BatchStats:
+        """play every game to the end and return the outcome statistics"""
+
+        start = time.perf_counter()
+        while self.step():
+            pass
+        return BatchStats(self.result, self.length, time.perf_counter() - start)
+
+
+def simulate(games: int, batch: int = 10_000, seed=None) -> BatchStats:
+    """play games random games in batches of batch and return the combined statistics"""
+
+    if batch < 1:
+        raise ValueError(f"batch must be at least 1, not {batch}")
+    seeds = np.random.SeedSequence(seed)
+    stats = BatchStats(np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int16), 0.0)
+    remaining = games
+    while remaining > 0:
+        size = min(batch, remaining)
+        simulator = BatchSimulator(size, seed=seeds.spawn(1)[0])
+        stats.merge(simulator.run())
+        remaining -= size
+    return stats
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="play random games in lockstep")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument(
+        "--batch", type=int, default=10_000, help="games held in memory at once"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+
+    print(simulate(args.games, args.batch, args.seed).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+benchmark suite for the rules, search and rendering hot paths
+
+every benchmark builds its inputs from a fixed seed, so two runs time the
+same work. boards at different fill levels are made by playing that many
+random moves from the opening. each benchmark is run in batches sized to
+take about --target seconds, the fastest of --repeat batches is kept.
+
+results are printed as a table and can be written as JSON with --output,
+--compare prints how a run changed against an earlier JSON file.
+
+the draw_all benchmarks need a display and are skipped without one.
+
+usage: python bench.py [--filter NAME] [--output FILE] [--compare FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable
+
+from bitboard import Position
+from tick_tac_tick_tac_toe import LAYOUT, Board, GameState, create_window_hitbox
+
+# number of random moves played to make each fill level
+FILL_LEVELS = (0, 20, 40, 60)
+
+
+class SkipBenchmark(Exception):
+    """raised by a benchmark's setup when it cannot run here"""
+
+
+def random_position(moves: int, seed: int) -> Position:
+    """
+    play moves random moves from the opening, games that end early are
+    played again from the next seed so the position is always still running
+    """
+
+    for attempt in range(1000):
+        rng = random.Random(seed * 1000 + attempt)
+        position = Position()
+        while len(position.history) < moves and not position.is_over():
+            position.apply_move(rng.choice(position.legal_moves()))
+        if not position.is_over():
+            break
+    return position
+
+
+def game_state_at(moves: int, seed: int, **options) -> GameState:
+    """a GameState at a random position moves moves into the game"""
+
+    options.setdefault("headless", True)
+    game_state = GameState(**options)
+    for move in random_position(moves, seed).history:
+        game_state.apply_move(move[0])
+    return game_state
+
+
+def bench_game_state(seed: int) -> Callable[[], object]:
+    """build a headless GameState"""
+    return lambda: GameState(headless=True)
+
+
+def bench_board(seed: int) -> Callable[[], object]:
+    """build the top board and its subboards and cells"""
+
+    game_state = GameState(headless=True)
+    hitbox = create_window_hitbox()
+    return lambda: Board(game_state, None, hitbox, None, game_state.board_size, True)
+
+
+def bench_find_board_winner(moves: int):
+    """find the winner of every subboard and the top board"""
+
+    def setup(seed: int) -> Callable[[], object]:
+        game_state = game_state_at(moves, seed)
+        boards = [*game_state.board.get_all_cells(), game_state.board]
+        return lambda: [board.find_board_winner() for board in boards]
+
+    return setup
+
+
+def bench_legal_moves(moves: int):
+    """generate the legal moves"""
+
+    def setup(seed: int) -> Callable[[], object]:
+        position = random_position(moves, seed)
+        return position.legal_moves
+
+    return setup
+
+
+def bench_playout(seed: int) -> Callable[[], object]:
+    """play one random game to the end from the opening"""
+
+    rng = random.Random(seed)
+
+    def playout() -> None:
+        position = Position()
+        while not position.is_over():
+            position.play(*rng.choice(position.legal_moves()))
+
+    return playout
+
+
+def bench_get_clicked_board(seed: int) -> Callable[[], object]:
+    """find the subboard and then the cell under 100 random clicks"""
+
+    rng = random.Random(seed)
+    board = GameState(headless=True).board
+    half = LAYOUT.top_hitbox.size / 2
+    clicks = [(rng.uniform(-half, half), rng.uniform(-half, half)) for _ in range(100)]
+
+    def click_all() -> None:
+        for location in clicks:
+            subboard = board.get_clicked_board(location)
+            if subboard is not None:
+                subboard.get_clicked_board(location)
+
+    return click_all
+
+
+def bench_hit_test(seed: int) -> Callable[[], object]:
+    """hit test the same 100 random clicks arithmetically"""
+
+    rng = random.Random(seed)
+    half = LAYOUT.top_hitbox.size / 2
+    clicks = [(rng.uniform(-half, half), rng.uniform(-half, half)) for _ in range(100)]
+    return lambda: [LAYOUT.hit_test(location) for location in clicks]
+
+
+# one window per renderer, turtle only allows one screen per process
+WINDOWS = {}
+
+
+def bench_draw_all(renderer: str, moves: int):
+    """redraw everything in a window"""
+
+    def setup(seed: int) -> Callable[[], object]:
+        if renderer not in WINDOWS:
+            import tkinter  # pylint: disable=import-outside-toplevel
+            import turtle  # pylint: disable=import-outside-toplevel
+
+            # only a missing display is skipped, a broken renderer fails the run
+            try:
+                WINDOWS[renderer] = GameState(renderer=renderer)
+            except (tkinter.TclError, turtle.Terminator) as error:
+                raise SkipBenchmark(f"no window: {error}") from error
+
+        game_state = WINDOWS[renderer]
+        game_state.position = random_position(moves, seed)
+        return game_state.window.draw_all
+
+    return setup
+
+
+BENCHMARKS = {
+    "game_state_init": bench_game_state,
+    "board_init": bench_board,
+    **{
+        f"find_board_winner/{moves}": bench_find_board_winner(moves)
+        for moves in FILL_LEVELS
+    },
+    **{f"legal_moves/{moves}": bench_legal_moves(moves) for moves in FILL_LEVELS},
+    "random_playout": bench_playout,
+    "get_clicked_board/100": bench_get_clicked_board,
+    "hit_test/100": bench_hit_test,
+    **{
+        f"draw_all_{renderer}/{moves}": bench_draw_all(renderer, moves)
+        for renderer in ("turtle", "canvas")
+        for moves in FILL_LEVELS
+    },
+}
+
+
+def time_function(function: Callable[[], object], target: float, repeat: int):
+    """return the fastest seconds per call over repeat batches and the calls per batch"""
+
+    # grow the batch until it takes long enough to time reliably
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        seconds = time.perf_counter() - start
+        if seconds >= target / 10 or number >= 1 << 20:
+            break
+        number *= 10
+    number = max(1, int(number * target / max(seconds, 1e-9)))
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        seconds = (time.perf_counter() - start) / number
+        best = seconds if best is None else min(best, seconds)
+    return best, number
+
+
+def run_benchmarks(
+    names, seed: int = 0, target: float = 0.2, repeat: int = 3
+) -> dict[str, dict]:
+    """run the named benchmarks, return their results keyed by name"""
+
+    results = {}
+    for name in names:
+        try:
+            function = BENCHMARKS[name](seed)
+        except SkipBenchmark as skip:
+            results[name] = {"skipped": str(skip)}
+            continue
+        seconds, number = time_function(function, target, repeat)
+        results[name] = {
+            "seconds": seconds,
+            "per_second": 1 / max(seconds, 1e-12),
+            "calls": number,
+        }
+    return results
+
+
+def format_results(results: dict[str, dict], baseline: dict | None = None) -> str:
+    """one line per benchmark, with the change against baseline if given"""
+
+    width = max(len(name) for name in results)
+    lines = []
+    for name, result in results.items():
+        if "skipped" in result:
+            lines.append(f"{name:<{width}}  skipped, {result['skipped']}")
+            continue
+        line = (
+            f"{name:<{width}} {result['seconds'] * 1e6:12.2f} us "
+            f"{result['per_second']:14,.1f} /s"
+        )
+        old = (baseline or {}).get(name, {})
+        if "seconds" in old:
+            line += f"  {old['seconds'] / result['seconds']:6.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="time the hot paths")
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--target", type=float, default=0.2, help="seconds per timed batch"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="batches per benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_benchmarks(names, args.seed, args.target, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+    print(format_results(results, baseline))
+
+    if args.output:
+        report = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
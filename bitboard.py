@@ -0,0 +1,466 @@
+"""
+compact bitboard rules engine for Tick Tac Tick Tac Toe
+
+every cell of the game is one bit of an 81 bit int, numbered
+subboard * 9 + cell. both the subboard and the cell index are
+x * BOARD_SIZE + y, the same order Board.get_all_cells returns them in,
+so index 0 is the (0, 0) location and index 8 is (2, 2).
+
+each player has one 81 bit occupancy mask and one 9 bit mask of the
+subboards they have won. a subboard that is full without a winner
+(a cat's game) is in neither won mask but is no longer playable.
+
+winners and draws are found by looking 9 bit masks up in tables built
+once at import, the same tables serve the subboards and the top board.
+a 9 bit mask already holds the state of every line through it, so one
+lookup answers whether a line is complete or still winnable.
+
+the subboards that are full, and the ones each player can no longer win
+because the other player has a cell in every line, are kept as 9 bit
+masks updated as each cell is placed and restored on undo, so checking
+for a draw or for a playable subboard never rescans the board.
+
+moves are (subboard, cell) index pairs.
+
+every position carries a 64 bit Zobrist hash of its cells, forced
+subboard and player to move, updated as moves are played and undone.
+"""
+
+from __future__ import annotations
+
+import random
+
+BOARD_SIZE = 3
+CELLS = BOARD_SIZE * BOARD_SIZE
+FULL_BOARD = (1 << CELLS) - 1
+
+PLAYERS = ("X", "O")
+EMPTY = "*"
+
+# the subboard the first move must be played in, (2, 2) on the real board
+OPENING_SUBBOARD = CELLS - 1
+
+
+def location_to_index(location: tuple[int]) -> int:
+    """convert an (x, y) location into a 0-8 index"""
+    return location[0] * BOARD_SIZE + location[1]
+
+
+def index_to_location(index: int) -> tuple[int]:
+    """convert a 0-8 index into an (x, y) location"""
+    return divmod(index, BOARD_SIZE)
+
+
+def _build_win_lines() -> tuple[int, ...]:
+    """build a 9 bit mask for every row, column and diagonal"""
+
+    lines = []
+    for x in range(BOARD_SIZE):  # pylint: disable=invalid-name
+        lines.append(sum(1 << (x * BOARD_SIZE + y) for y in range(BOARD_SIZE)))
+    for y in range(BOARD_SIZE):  # pylint: disable=invalid-name
+        lines.append(sum(1 << (x * BOARD_SIZE + y) for x in range(BOARD_SIZE)))
+    lines.append(sum(1 << (i * BOARD_SIZE + i) for i in range(BOARD_SIZE)))
+    lines.append(
+        sum(1 << (i * BOARD_SIZE + BOARD_SIZE - 1 - i) for i in range(BOARD_SIZE))
+    )
+
+    return tuple(lines)
+
+
+WIN_LINES = _build_win_lines()
+
+
+def mask_winner(mask: int) -> bool:
+    """return True if the 9 bit mask contains a full row, column or diagonal"""
+
+    for line in WIN_LINES:
+        if mask & line == line:
+            return True
+    return False
+
+
+def mask_open(blocked: int) -> bool:
+    """return True if some line has none of the cells in the 9 bit mask blocked"""
+
+    for line in WIN_LINES:
+        if not blocked & line:
+            return True
+    return False
+
+
+def _build_zobrist_keys(seed: int = 0x7177) -> tuple:
+    """build the random keys xored together into a position's hash"""
+
+    rng = random.Random(seed)
+    cells = tuple(
+        tuple(rng.getrandbits(64) for _ in range(CELLS * CELLS)) for _ in PLAYERS
+    )
+    # the last entry is for playing anywhere
+    forced = tuple(rng.getrandbits(64) for _ in range(CELLS + 1))
+    player = rng.getrandbits(64)
+    return cells, forced, player
+
+
+ZOBRIST_CELLS, ZOBRIST_FORCED, ZOBRIST_PLAYER = _build_zobrist_keys()
+
+
+def zobrist_forced(forced: int | None) -> int:
+    """return the hash key of the forced subboard"""
+    return ZOBRIST_FORCED[CELLS if forced is None else forced]
+
+
+# indexed by a player's 9 bit mask, True if that player has a line
+WON_TABLE = tuple(mask_winner(mask) for mask in range(FULL_BOARD + 1))
+# indexed by the 9 bit mask of cells a player can no longer use,
+# True if the player could still complete a line
+OPEN_TABLE = tuple(mask_open(mask) for mask in range(FULL_BOARD + 1))
+# indexed by the 9 bit mask of cells a player can no longer use,
+# True if the player can never complete a line
+DRAWN_TABLE = tuple(not is_open for is_open in OPEN_TABLE)
+
+
+class Position:
+    """a full game position stored as bitboards"""
+
+    __slots__ = (
+        "cells",
+        "boards",
+        "forced",
+        "player",
+        "winner",
+        "drawn",
+        "history",
+        "hash",
+        "dead",
+        "full",
+    )
+
+    # occupancy of all 81 cells, indexed by player (0 is X, 1 is O)
+    cells: list[int]
+    # 9 bit mask of the subboards won, indexed by player
+    boards: list[int]
+    # index of the subboard that must be played in, None to play anywhere
+    forced: int | None
+    # index of the player to move
+    player: int
+    # index of the player that won the top board, None while undecided
+    winner: int | None
+    # True once neither player can complete a line on the top board
+    drawn: bool
+    # what undo_move needs to restore, one entry per applied move
+    history: list[tuple]
+    # Zobrist hash, change forced and player through set_forced and
+    # swap_player so it stays up to date
+    hash: int
+    # 9 bit mask of the subboards a player can no longer complete a line in
+    # because the other player has a cell in each line, indexed by player
+    dead: list[int]
+    # 9 bit mask of the subboards with every cell taken
+    full: int
+
+    def __init__(self, forced: int | None = OPENING_SUBBOARD) -> None:
+
+        self.cells = [0, 0]
+        self.boards = [0, 0]
+        self.forced = forced
+        self.player = 0
+        self.winner = None
+        self.drawn = False
+        self.history = []
+        self.hash = zobrist_forced(forced)
+        self.dead = [0, 0]
+        self.full = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"Position(x={self.cells[0]:#x}, o={self.cells[1]:#x}, "
+            f"forced={self.forced}, player={PLAYERS[self.player]})"
+        )
+
+    def copy(self) -> Position:
+        """return an independent copy of this position"""
+
+        position = Position.__new__(Position)
+        position.cells = self.cells[:]
+        position.boards = self.boards[:]
+        position.forced = self.forced
+        position.player = self.player
+        position.winner = self.winner
+        position.drawn = self.drawn
+        position.history = self.history[:]
+        position.hash = self.hash
+        position.dead = self.dead[:]
+        position.full = self.full
+        return position
+
+    # masks
+    def subboard_mask(self, player: int, subboard: int) -> int:
+        """return the 9 bit occupancy of subboard for player"""
+        return (self.cells[player] >> (subboard * CELLS)) & FULL_BOARD
+
+    def occupied_mask(self, subboard: int) -> int:
+        """return the 9 bit occupancy of subboard for both players"""
+        return ((self.cells[0] | self.cells[1]) >> (subboard * CELLS)) & FULL_BOARD
+
+    # owners
+    def cell_owner(self, subboard: int, cell: int) -> str:
+        """return the owner of a single cell as 'X', 'O' or '*'"""
+
+        bit = 1 << (subboard * CELLS + cell)
+        if self.cells[0] & bit:
+            return PLAYERS[0]
+        if self.cells[1] & bit:
+            return PLAYERS[1]
+        return EMPTY
+
+    def board_owner(self, subboard: int) -> str:
+        """return the owner of a subboard as 'X', 'O' or '*'"""
+
+        bit = 1 << subboard
+        if self.boards[0] & bit:
+            return PLAYERS[0]
+        if self.boards[1] & bit:
+            return PLAYERS[1]
+        return EMPTY
+
+    def top_owner(self) -> str:
+        """return the owner of the top board as 'X', 'O' or '*'"""
+
+        if self.winner is None:
+            return EMPTY
+        return PLAYERS[self.winner]
+
+    def is_board_won(self, subboard: int) -> bool:
+        """return True if either player has won subboard"""
+        return bool((self.boards[0] | self.boards[1]) >> subboard & 1)
+
+    # rules
+    def place(self, subboard: int, cell: int, player: int) -> bool:
+        """
+        mark a cell for player, return True if sucsessful and False if it was already full
+        """
+
+        index = subboard * CELLS + cell
+        bit = 1 << index
+        if (self.cells[0] | self.cells[1]) & bit:
+            return False
+        self.cells[player] |= bit
+        self.hash ^= ZOBRIST_CELLS[player][index]
+
+        # only this subboard's masks can change
+        if DRAWN_TABLE[self.subboard_mask(player, subboard)]:
+            self.dead[player ^ 1] |= 1 << subboard
+        if self.occupied_mask(subboard) == FULL_BOARD:
+            self.full |= 1 << subboard
+        return True
+
+    def find_board_winner(self, subboard: int) -> int | None:
+        """find the winner of subboard from its cells"""
+
+        bit = 1 << subboard
+        for player in (0, 1):
+            if self.boards[player] & bit:
+                return player
+            if WON_TABLE[self.subboard_mask(player, subboard)]:
+                return player
+        return None
+
+    def apply_board_winner(self, subboard: int) -> int | None:
+        """find and record the winner of subboard"""
+
+        winner = self.find_board_winner(subboard)
+        if winner is not None:
+            self.boards[winner] |= 1 << subboard
+        return winner
+
+    def find_winner(self) -> int | None:
+        """find the winner of the top board from the won subboards"""
+
+        if self.winner is not None:
+            return self.winner
+        for player in (0, 1):
+            if WON_TABLE[self.boards[player]]:
+                return player
+        return None
+
+    def apply_winner(self) -> int | None:
+        """find and record the winner of the top board"""
+
+        self.winner = self.find_winner()
+        return self.winner
+
+    def blocked_boards(self, player: int) -> int:
+        """
+        return a 9 bit mask of the subboards player can no longer win,
+        the ones the other player won and the ones where every line is blocked
+        """
+
+        # a subboard player won always has a line free of the other player,
+        # so it is never in their dead mask
+        return self.boards[player ^ 1] | self.dead[player]
+
+    def find_draw(self) -> bool:
+        """return True if neither player can complete a line on the top board"""
+
+        if self.winner is not None:
+            return False
+        return (
+            DRAWN_TABLE[self.blocked_boards(0)] and DRAWN_TABLE[self.blocked_boards(1)]
+        )
+
+    def apply_draw(self) -> bool:
+        """find and record a drawn top board"""
+
+        self.drawn = self.find_draw()
+        return self.drawn
+
+    def is_over(self) -> bool:
+        """return True if the top board is won or drawn"""
+        return self.winner is not None or self.drawn
+
+    def playable_boards(self) -> int:
+        """return a 9 bit mask of the subboards that are neither won nor full"""
+        return FULL_BOARD & ~(self.boards[0] | self.boards[1] | self.full)
+
+    def is_playable(self, subboard: int) -> bool:
+        """return True if a move can still be played in subboard"""
+        return bool(self.playable_boards() >> subboard & 1)
+
+    def check_legal_subboard(self, subboard: int) -> bool:
+        """return True if the rules allow a move in subboard"""
+
+        if self.forced is None:
+            return True
+        return subboard == self.forced
+
+    def update_legal_subboard(self, cell: int) -> None:
+        """send the next player to the subboard matching cell, or anywhere if it is closed"""
+
+        if self.is_playable(cell):
+            self.set_forced(cell)
+        else:
+            self.set_forced(None)
+
+    def set_forced(self, forced: int | None) -> None:
+        """change the subboard that must be played in, None to play anywhere"""
+
+        self.hash ^= zobrist_forced(self.forced) ^ zobrist_forced(forced)
+        self.forced = forced
+
+    def is_legal(self, subboard: int, cell: int) -> bool:
+        """return True if the player to move may play at subboard, cell"""
+
+        # an index past 8 would read or set a bit of the next subboard
+        if not (0 <= subboard < CELLS and 0 <= cell < CELLS):
+            return False
+        if self.is_over() or not self.check_legal_subboard(subboard):
+            return False
+        if self.is_board_won(subboard):
+            return False
+        return not (self.cells[0] | self.cells[1]) >> (subboard * CELLS + cell) & 1
+
+    def swap_player(self) -> int:
+        """swap the player to move"""
+
+        self.player ^= 1
+        self.hash ^= ZOBRIST_PLAYER
+        return self.player
+
+    def play(self, subboard: int, cell: int) -> int | None:
+        """
+        play a move for the player to move without checking it is legal,
+        return the winner of the top board
+        """
+
+        self.place(subboard, cell, self.player)
+        if self.apply_board_winner(subboard) is not None:
+            self.apply_winner()
+        self.apply_draw()
+        self.update_legal_subboard(cell)
+        self.swap_player()
+
+        return self.winner
+
+    # move generation
+    def legal_moves(self) -> list[tuple[int, int]]:
+        """return every legal (subboard, cell) move for the player to move"""
+
+        if self.is_over():
+            return []
+
+        if self.forced is None:
+            subboards = range(CELLS)
+        else:
+            subboards = (self.forced,)
+
+        playable = self.playable_boards()
+        occupied = self.cells[0] | self.cells[1]
+        moves = []
+        for subboard in subboards:
+            if not playable >> subboard & 1:
+                continue
+            free = ~(occupied >> (subboard * CELLS)) & FULL_BOARD
+            while free:
+                bit = free & -free
+                moves.append((subboard, bit.bit_length() - 1))
+                free ^= bit
+        return moves
+
+    def record_move(self, move: tuple[int, int]) -> None:
+        """remember what is needed to undo move, call before it is played"""
+
+        self.history.append(
+            (
+                move,
+                self.forced,
+                self.boards[0],
+                self.boards[1],
+                self.winner,
+                self.drawn,
+                self.hash,
+                self.dead[0],
+                self.dead[1],
+                self.full,
+            )
+        )
+
+    def apply_move(self, move: tuple[int, int]) -> int | None:
+        """play a legal (subboard, cell) move so it can be undone with undo_move"""
+
+        self.record_move(move)
+        return self.play(*move)
+
+    def undo_move(self) -> tuple[int, int]:
+        """take back the last move played with apply_move and return it"""
+
+        (
+            move,
+            self.forced,
+            self.boards[0],
+            self.boards[1],
+            self.winner,
+            self.drawn,
+            self.hash,
+            self.dead[0],
+            self.dead[1],
+            self.full,
+        ) = self.history.pop()
+        self.player ^= 1
+        self.cells[self.player] &= ~(1 << (move[0] * CELLS + move[1]))
+
+        return move
+
+
+def perft(position: Position, depth: int) -> int:
+    """count the leaf nodes of the move tree depth moves below position"""
+
+    moves = position.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        position.apply_move(move)
+        nodes += perft(position, depth - 1)
+        position.undo_move()
+    return nodes
@@ -0,0 +1,233 @@
+"""
+memory-mapped opening book
+
+the book maps a position's canonical hash (see symmetry.py) to the best
+move found for it and the search statistics behind that move, so the
+positions that are the same up to symmetry share one entry and only one
+of them is searched. moves are stored for the canonical position and
+mapped back to the position being looked up. it is built offline by running
+MCTS on every position reachable from the opening within a few plies,
+the opening being the one GameState starts from, where X must play in
+subboard OPENING_SUBBOARD.
+
+the file is a small header followed by fixed size entries sorted by
+hash. OpeningBook maps the file read only and binary searches it, so the
+book is never loaded into memory and any number of processes can share
+the same pages.
+
+usage: python book.py FILE [--depth D] [--playouts N] [--workers W]
+builds FILE, then reports its size and how fast it can be probed
+"""
+
+from __future__ import annotations
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from typing import NamedTuple
+
+from bitboard import CELLS, Position
+from frozen import OPENING
+from mcts import MCTSPlayer
+from symmetry import INVERSE, canonical_hash, transform_move
+
+MAGIC = b"TTTB"
+VERSION = 2
+# magic, version, entry count
+BOOK_HEADER = struct.Struct("<4sBxxxI")
+# canonical hash, canonical move as subboard * 9 + cell, visits, wins in half points
+BOOK_ENTRY = struct.Struct("<QB3xII")
+
+
+class BookEntry(NamedTuple):
+    """the book's move for a position and the statistics behind it"""
+
+    move: tuple[int, int]
+    visits: int
+    # wins for the player to move, draws count as half
+    wins: float
+
+    @property
+    def score(self) -> float:
+        """fraction of the playouts through move the player to move won"""
+        return self.wins / max(self.visits, 1)
+
+
+class OpeningBook:
+    """read only view of a book file, use it as a context manager"""
+
+    size: int
+
+    def __init__(self, path) -> None:
+
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size = BOOK_HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        if len(self.data) != BOOK_HEADER.size + size * BOOK_ENTRY.size:
+            self.data.close()
+            raise ValueError(f"{path} is truncated")
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> OpeningBook:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def key_at(self, index: int) -> int:
+        """the hash of entry index"""
+        return struct.unpack_from(
+            "<Q", self.data, BOOK_HEADER.size + index * BOOK_ENTRY.size
+        )[0]
+
+    def find(self, key: int) -> BookEntry | None:
+        """binary search for the entry of hash key"""
+
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.size or self.key_at(low) != key:
+            return None
+        _, move, visits, wins = BOOK_ENTRY.unpack_from(
+            self.data, BOOK_HEADER.size + low * BOOK_ENTRY.size
+        )
+        return BookEntry(divmod(move, CELLS), visits, wins / 2)
+
+    def lookup(self, position: Position) -> BookEntry | None:
+        """return the entry for position, None if it is not in the book or not legal"""
+
+        key, transform = canonical_hash(position)
+        entry = self.find(key)
+        if entry is None:
+            return None
+        entry = entry._replace(move=transform_move(entry.move, INVERSE[transform]))
+        if not position.is_legal(*entry.move):
+            return None
+        return entry
+
+    def close(self) -> None:
+        """unmap the file"""
+        self.data.close()
+
+
+def write_book(path, entries: dict[int, BookEntry]) -> None:
+    """write entries, keyed by canonical hash, as a book file"""
+
+    with open(path, "wb") as file:
+        file.write(BOOK_HEADER.pack(MAGIC, VERSION, len(entries)))
+        for key in sorted(entries):
+            entry = entries[key]
+            file.write(
+                BOOK_ENTRY.pack(
+                    key,
+                    entry.move[0] * CELLS + entry.move[1],
+                    entry.visits,
+                    round(entry.wins * 2),
+                )
+            )
+
+
+def book_positions(depth: int) -> list[Position]:
+    """
+    every unfinished position at most depth plies from the opening,
+    only one of the positions that are the same up to symmetry is kept
+    """
+
+    positions = {}
+    frontier = [OPENING]
+    for ply in range(depth + 1):
+        next_frontier = []
+        for position in frontier:
+            key, _ = canonical_hash(position)
+            if key in positions or position.is_over():
+                continue
+            positions[key] = position
+            if ply == depth:
+                continue
+            next_frontier.extend(
+                position.play(*move) for move in position.legal_moves()
+            )
+        frontier = next_frontier
+    return [position.thaw() for position in positions.values()]
+
+
+def analyse_position(task: tuple) -> tuple[int, BookEntry]:
+    """search one book position, return its canonical hash and entry"""
+
+    position, playouts, seed = task
+    player = MCTSPlayer(seconds=None, playouts=playouts, seed=seed)
+    move = player.choose_move(position)
+    # choose_move made the chosen child the new root
+    child = player.root
+
+    key, transform = canonical_hash(position)
+    move = transform_move(move, transform)
+    return key, BookEntry(move, child.visits, child.wins)
+
+
+def build_book(
+    path, depth: int = 2, playouts: int = 2000, workers: int | None = None, seed=0
+) -> int:
+    """search every position within depth plies of the opening and write the book"""
+
+    positions = book_positions(depth)
+    tasks = [
+        (position, playouts, seed * 1_000_003 + number)
+        for number, position in enumerate(positions)
+    ]
+    with multiprocessing.Pool(workers) as pool:
+        entries = dict(pool.imap_unordered(analyse_position, tasks, chunksize=4))
+
+    write_book(path, entries)
+    return len(entries)
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="build an opening book")
+    parser.add_argument("file")
+    parser.add_argument("--depth", type=int, default=2, help="plies from the opening")
+    parser.add_argument(
+        "--playouts", type=int, default=2000, help="mcts playouts per position"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_book(args.file, args.depth, args.playouts, args.workers, args.seed)
+    print(f"{count} positions searched in {time.perf_counter() - start:.1f}s")
+
+    positions = book_positions(args.depth)
+    with OpeningBook(args.file) as book:
+        start = time.perf_counter()
+        found = sum(book.lookup(position) is not None for position in positions)
+        seconds = time.perf_counter() - start
+        opening = book.lookup(Position())
+
+    print(
+        f"{found}/{len(positions)} found, "
+        f"{len(positions) / max(seconds, 1e-9):,.0f} lookups/s"
+    )
+    print(f"opening: {opening.move} scores {opening.score:.1%} over {opening.visits}")
+
+
+if __name__ == "__main__":
+    main()
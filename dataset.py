@@ -0,0 +1,352 @@
+"""
+training data from game records as NumPy arrays
+
+every position before a move in a game record file becomes one example:
+PLANES 9x9 planes of 0s and 1s, the outcome of the game for the player to
+move and the visit count of every move. planes[p, x, y] is the cell at
+(x, y) of the whole 9x9 grid, x = subboard x * 3 + cell x and the same for
+y, so neighbouring cells are neighbours in the array like on the screen.
+
+    x cells      cells X has played in
+    o cells      cells O has played in
+    x boards     every cell of the subboards X has won
+    o boards     every cell of the subboards O has won
+    legal        the cells the player to move may play in, the empty cells
+                 of the forced subboard, playable_subboard in GameState
+    o to move    all 1s when O is to move, all 0s when X is
+
+outcomes are 1 if the player to move went on to win, -1 if they lost and
+0 for a draw. games without a result are skipped. the visit counts come
+from an MCTS search of --playouts playouts from every position, or are 1
+for the move that was played and 0 elsewhere when it is 0.
+
+positions are encoded into a Batch, arrays allocated once and reused:
+each position only stores a few ints, its cell masks, won boards, target
+subboards and player, and the planes of the whole batch are then made
+from them at once with NumPy shifts into preallocated scratch arrays. a
+full batch is written as one shard of three .npy files, which np.load
+with mmap_mode="r" maps back without reading them, so writing is one
+sequential write per array and is not held up by allocating per position.
+
+--canonical maps every position to its canonical form with symmetry.py
+first, so a position and its reflections or rotations are one example.
+
+needs numpy, which the game itself does not.
+
+usage: python dataset.py RECORDS DIRECTORY [--shard-size N] [--playouts P]
+writes the examples of every game in RECORDS to shards in DIRECTORY
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Iterator
+
+import numpy as np
+
+from bitboard import BOARD_SIZE, CELLS, Position, location_to_index
+from mcts import MCTSPlayer, Node
+from records import DRAWN, UNFINISHED, encode_move, read_records
+from symmetry import MASK_PERMUTATIONS, canonical_transform, transform_move
+
+PLANES = ("x cells", "o cells", "x boards", "o boards", "legal", "o to move")
+X_CELLS, O_CELLS, X_BOARDS, O_BOARDS, LEGAL, O_TO_MOVE = range(len(PLANES))
+SIDE = BOARD_SIZE * BOARD_SIZE
+SQUARES = SIDE * SIDE
+SHARD_SIZE = 1 << 14
+# shard file names, the shard number then the array
+SHARD_NAME = "shard-{:05d}-{}.npy"
+ARRAYS = ("planes", "outcomes", "visits")
+
+
+def _square_bit(square: int) -> int:
+    """the bitboard bit of the square at square = x * 9 + y of the grid"""
+
+    x, y = divmod(square, SIDE)  # pylint: disable=invalid-name
+    board_x, cell_x = divmod(x, BOARD_SIZE)
+    board_y, cell_y = divmod(y, BOARD_SIZE)
+    subboard = location_to_index((board_x, board_y))
+    return subboard * CELLS + location_to_index((cell_x, cell_y))
+
+
+# SQUARE_BITS[square] is the bit of each square of a plane, SQUARE_OF the other way
+SQUARE_BITS = np.array([_square_bit(square) for square in range(SQUARES)], np.uint64)
+SQUARE_OF = [0] * SQUARES
+for _square, _bit in enumerate(SQUARE_BITS.tolist()):
+    SQUARE_OF[_bit] = _square
+SQUARE_SUBBOARDS = SQUARE_BITS // np.uint64(CELLS)
+# an 81 bit mask is split into a 64 bit low word and the high bits above it
+LOW_SQUARES = (SQUARE_BITS < 64).astype(np.uint64)
+LOW_SHIFTS = np.where(SQUARE_BITS < 64, SQUARE_BITS, 0).astype(np.uint64)
+HIGH_SHIFTS = np.where(SQUARE_BITS < 64, 0, SQUARE_BITS - 64).astype(np.uint64)
+HIGH_SQUARES = 1 - LOW_SQUARES
+LOW_WORD = (1 << 64) - 1
+
+# columns of Batch.masks, the ints stored for each position
+X_LOW, X_HIGH, O_LOW, O_HIGH, X_WON, O_WON, TARGETS, PLAYER = range(8)
+
+
+class Batch:
+    """reusable arrays for up to size examples, filled with add and made with finish"""
+
+    size: int
+    count: int
+    # (size, PLANES, 9, 9) 0 or 1
+    planes: np.ndarray
+    # (size,) 1, 0 or -1 for the player to move
+    outcomes: np.ndarray
+    # (size, 9, 9) visits of the move to each cell
+    visits: np.ndarray
+    # (size, 8) the ints planes are made from, see X_LOW
+    masks: np.ndarray
+
+    def __init__(self, size: int = SHARD_SIZE) -> None:
+
+        self.size = size
+        self.count = 0
+        self.planes = np.zeros((size, len(PLANES), SIDE, SIDE), np.uint8)
+        self.outcomes = np.zeros(size, np.int8)
+        self.visits = np.zeros((size, SIDE, SIDE), np.uint32)
+        self.masks = np.zeros((size, PLAYER + 1), np.uint64)
+        # flat views of the same memory, a square per column
+        self.flat_planes = self.planes.reshape(size, len(PLANES), SQUARES)
+        self.flat_visits = self.visits.reshape(size, SQUARES)
+        # scratch for finish
+        self.low = np.zeros((size, SQUARES), np.uint64)
+        self.high = np.zeros((size, SQUARES), np.uint64)
+
+    def is_full(self) -> bool:
+        """True once no more examples fit"""
+        return self.count == self.size
+
+    def add(
+        self,
+        position: Position,
+        outcome: int,
+        visits: dict[tuple[int, int], int],
+        canonical: bool = False,
+    ) -> None:
+        """store position with its labels, visits maps moves to their visit counts"""
+
+        row = self.count
+        self.count += 1
+
+        x_cells, o_cells = position.cells
+        boards = position.boards
+        if position.forced is None:
+            targets = position.playable_boards()
+        else:
+            targets = 1 << position.forced
+        transform = None
+        if canonical:
+            transform, (x_cells, o_cells, _) = canonical_transform(position)
+            permuted = MASK_PERMUTATIONS[transform]
+            boards = (permuted[boards[0]], permuted[boards[1]])
+            targets = permuted[targets]
+
+        masks = self.masks[row]
+        masks[X_LOW] = x_cells & LOW_WORD
+        masks[X_HIGH] = x_cells >> 64
+        masks[O_LOW] = o_cells & LOW_WORD
+        masks[O_HIGH] = o_cells >> 64
+        masks[X_WON] = boards[0]
+        masks[O_WON] = boards[1]
+        masks[TARGETS] = targets
+        masks[PLAYER] = position.player
+
+        self.outcomes[row] = outcome
+        row_visits = self.flat_visits[row]
+        row_visits.fill(0)
+        for move, count in visits.items():
+            if transform is not None:
+                move = transform_move(move, transform)
+            row_visits[SQUARE_OF[encode_move(move)]] = count
+
+    def expand_cells(self, low_column: int, plane: int) -> None:
+        """make a cell plane from the low and high words of its 81 bit masks"""
+
+        count = self.count
+        low = self.low[:count]
+        high = self.high[:count]
+        np.right_shift(self.masks[:count, low_column, None], LOW_SHIFTS, out=low)
+        np.bitwise_and(low, LOW_SQUARES, out=low)
+        np.right_shift(self.masks[:count, low_column + 1, None], HIGH_SHIFTS, out=high)
+        np.bitwise_and(high, HIGH_SQUARES, out=high)
+        np.bitwise_or(low, high, out=low)
+        np.copyto(self.flat_planes[:count, plane], low, casting="unsafe")
+
+    def expand_boards(self, column: int, plane: int) -> None:
+        """make a plane of every cell of the subboards set in a 9 bit mask"""
+
+        count = self.count
+        low = self.low[:count]
+        np.right_shift(self.masks[:count, column, None], SQUARE_SUBBOARDS, out=low)
+        np.bitwise_and(low, 1, out=low)
+        np.copyto(self.flat_planes[:count, plane], low, casting="unsafe")
+
+    def finish(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """make the planes of every stored position, return the filled part of each array"""
+
+        count = self.count
+        planes = self.flat_planes[:count]
+        self.expand_cells(X_LOW, X_CELLS)
+        self.expand_cells(O_LOW, O_CELLS)
+        self.expand_boards(X_WON, X_BOARDS)
+        self.expand_boards(O_WON, O_BOARDS)
+
+        # legal is the target subboards without the cells anyone played in,
+        # the empty cells are worked out in the o to move plane before it is set
+        self.expand_boards(TARGETS, LEGAL)
+        np.bitwise_or(planes[:, X_CELLS], planes[:, O_CELLS], out=planes[:, O_TO_MOVE])
+        np.bitwise_xor(planes[:, O_TO_MOVE], 1, out=planes[:, O_TO_MOVE])
+        np.bitwise_and(planes[:, LEGAL], planes[:, O_TO_MOVE], out=planes[:, LEGAL])
+
+        np.copyto(
+            planes[:, O_TO_MOVE], self.masks[:count, PLAYER, None], casting="unsafe"
+        )
+        return self.planes[:count], self.outcomes[:count], self.visits[:count]
+
+    def clear(self) -> None:
+        """forget the stored positions, the arrays are kept"""
+        self.count = 0
+
+
+def game_examples(record, playouts: int = 0, searcher: MCTSPlayer | None = None):
+    """
+    yield (position, outcome, visits) before every move of a finished game,
+    the position is played on in place, so use it before asking for the next
+    """
+
+    if record.result == UNFINISHED:
+        return
+    position = Position()
+    for move in record.move_list():
+        if not position.is_legal(*move):
+            raise ValueError(f"illegal move {move} in game record")
+
+        if record.result == DRAWN:
+            outcome = 0
+        else:
+            outcome = 1 if record.result == position.player else -1
+
+        if playouts:
+            root = Node(None, None, position.player ^ 1, position.legal_moves())
+            for _ in range(playouts):
+                searcher.playout(root, position)
+            visits = {child.move: child.visits for child in root.children}
+        else:
+            visits = {move: 1}
+
+        yield position, outcome, visits
+        position.apply_move(move)
+
+
+def iter_batches(
+    path,
+    size: int = SHARD_SIZE,
+    playouts: int = 0,
+    canonical: bool = False,
+    seed=None,
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    yield (planes, outcomes, visits) of up to size examples at a time from
+    the game record file at path, every batch is in the same arrays, so it
+    is overwritten by the next one
+    """
+
+    batch = Batch(size)
+    searcher = MCTSPlayer(seconds=None, playouts=playouts, seed=seed)
+    for record in read_records(path):
+        for position, outcome, visits in game_examples(record, playouts, searcher):
+            batch.add(position, outcome, visits, canonical)
+            if batch.is_full():
+                yield batch.finish()
+                batch.clear()
+    if batch.count:
+        yield batch.finish()
+
+
+def write_shards(path, directory, size: int = SHARD_SIZE, **options) -> dict:
+    """
+    write the examples of the game record file at path to shards of size
+    examples in directory, options are passed to iter_batches, return the
+    statistics of the run
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    shards = examples = written = 0
+    writing = 0.0
+    start = time.perf_counter()
+    for arrays in iter_batches(path, size, **options):
+        write_start = time.perf_counter()
+        for name, array in zip(ARRAYS, arrays):
+            shard_path = os.path.join(directory, SHARD_NAME.format(shards, name))
+            np.save(shard_path, array)
+            written += array.nbytes
+        writing += time.perf_counter() - write_start
+        shards += 1
+        examples += len(arrays[0])
+
+    return {
+        "shards": shards,
+        "examples": examples,
+        "bytes": written,
+        "seconds": time.perf_counter() - start,
+        "writing": writing,
+    }
+
+
+def load_shard(directory, number: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """map the arrays of a shard without reading them"""
+
+    return tuple(
+        np.load(os.path.join(directory, SHARD_NAME.format(number, name)), mmap_mode="r")
+        for name in ARRAYS
+    )
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="export game records as NumPy arrays")
+    parser.add_argument(
+        "records", help="game record file written by runner.py --record"
+    )
+    parser.add_argument("directory", help="where the shards are written")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument(
+        "--playouts",
+        type=int,
+        default=0,
+        help="MCTS playouts per position for the visit counts, 0 for the move played",
+    )
+    parser.add_argument(
+        "--canonical", action="store_true", help="map positions to their canonical form"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = write_shards(
+        args.records,
+        args.directory,
+        args.shard_size,
+        playouts=args.playouts,
+        canonical=args.canonical,
+        seed=args.seed,
+    )
+    seconds = max(stats["seconds"], 1e-9)
+    print(
+        f"{stats['examples']:,} examples in {stats['shards']} shards, "
+        f"{stats['bytes'] / 2**20:.1f} MB in {seconds:.2f}s"
+    )
+    print(
+        f"{stats['examples'] / seconds:,.0f} examples/s, "
+        f"{stats['bytes'] / 2**20 / seconds:.1f} MB/s, "
+        f"{stats['writing'] / seconds:.0%} of the time writing"
+    )
+
+
+if __name__ == "__main__":
+    main()
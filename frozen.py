@@ -0,0 +1,209 @@
+"""
+immutable, hashable positions
+
+a FrozenPosition is a tuple of the same bitboard ints a Position holds.
+ints never change, so playing a move builds a new tuple around the few
+masks the move touched and shares every other one with the position it
+came from: the mover's cell mask, the won and dead masks of the subboard
+played in and the forced subboard. no history is kept, the position
+before a move is simply the value you already had, so undoing is
+dropping a reference and branching is keeping two.
+
+the read only rules, legal_moves, is_legal, cell_owner and the rest, are
+the Position methods themselves, run on the tuple's fields, so the two
+can never disagree. thaw turns a frozen position back into a Position for
+code that plays moves in place, without copying any history.
+
+equal positions are equal tuples, and the hash is the Zobrist hash.
+
+usage: python frozen.py [--games N]
+times making the children of every position in N random games both ways
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import NamedTuple
+
+from bitboard import (
+    CELLS,
+    DRAWN_TABLE,
+    FULL_BOARD,
+    WON_TABLE,
+    ZOBRIST_CELLS,
+    ZOBRIST_PLAYER,
+    Position,
+    zobrist_forced,
+)
+
+
+def _replace_item(pair: tuple[int, int], player: int, value: int) -> tuple[int, int]:
+    """pair with the item of player replaced by value"""
+    return (value, pair[1]) if player == 0 else (pair[0], value)
+
+
+class FrozenPosition(NamedTuple):
+    """a position that never changes, see Position for what each field means"""
+
+    cells: tuple[int, int]
+    boards: tuple[int, int]
+    dead: tuple[int, int]
+    full: int
+    forced: int | None
+    player: int
+    winner: int | None
+    drawn: bool
+    hash: int
+
+    @classmethod
+    def from_position(cls, position: Position) -> FrozenPosition:
+        """freeze position, its history is left behind"""
+
+        return cls(
+            tuple(position.cells),
+            tuple(position.boards),
+            tuple(position.dead),
+            position.full,
+            position.forced,
+            position.player,
+            position.winner,
+            position.drawn,
+            position.hash,
+        )
+
+    def thaw(self) -> Position:
+        """a Position to play moves on in place, with an empty history"""
+
+        position = Position.__new__(Position)
+        position.cells = list(self.cells)
+        position.boards = list(self.boards)
+        position.dead = list(self.dead)
+        position.full = self.full
+        position.forced = self.forced
+        position.player = self.player
+        position.winner = self.winner
+        position.drawn = self.drawn
+        position.history = []
+        position.hash = self.hash
+        return position
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def play(self, subboard: int, cell: int) -> FrozenPosition:
+        """
+        return the position after a move for the player to move, the move is
+        not checked, the same rules as Position.play
+        """
+
+        player = self.player
+        index = subboard * CELLS + cell
+        subboard_bit = 1 << subboard
+        shift = subboard * CELLS
+
+        cells = _replace_item(self.cells, player, self.cells[player] | 1 << index)
+        mine = cells[player] >> shift & FULL_BOARD
+
+        # only the subboard played in can change its masks
+        dead = self.dead
+        if DRAWN_TABLE[mine]:
+            dead = _replace_item(dead, player ^ 1, dead[player ^ 1] | subboard_bit)
+        full = self.full
+        if (cells[0] | cells[1]) >> shift & FULL_BOARD == FULL_BOARD:
+            full |= subboard_bit
+
+        boards = self.boards
+        winner = self.winner
+        if WON_TABLE[mine]:
+            boards = _replace_item(boards, player, boards[player] | subboard_bit)
+            if WON_TABLE[boards[player]]:
+                winner = player
+        drawn = (
+            winner is None
+            and DRAWN_TABLE[boards[1] | dead[0]]
+            and DRAWN_TABLE[boards[0] | dead[1]]
+        )
+
+        playable = FULL_BOARD & ~(boards[0] | boards[1] | full)
+        forced = cell if playable >> cell & 1 else None
+
+        key = (
+            self.hash
+            ^ ZOBRIST_CELLS[player][index]
+            ^ zobrist_forced(self.forced)
+            ^ zobrist_forced(forced)
+            ^ ZOBRIST_PLAYER
+        )
+        return FrozenPosition(
+            cells, boards, dead, full, forced, player ^ 1, winner, drawn, key
+        )
+
+    # the read only rules, shared with Position
+    subboard_mask = Position.subboard_mask
+    occupied_mask = Position.occupied_mask
+    cell_owner = Position.cell_owner
+    board_owner = Position.board_owner
+    top_owner = Position.top_owner
+    is_board_won = Position.is_board_won
+    blocked_boards = Position.blocked_boards
+    is_over = Position.is_over
+    playable_boards = Position.playable_boards
+    is_playable = Position.is_playable
+    check_legal_subboard = Position.check_legal_subboard
+    is_legal = Position.is_legal
+    legal_moves = Position.legal_moves
+
+
+# the position GameState starts from
+OPENING = FrozenPosition.from_position(Position())
+
+
+def branch_rates(games: int, seed: int = 0) -> tuple[float, float]:
+    """
+    make every child of every position of games random games, return the
+    children per second of Position.copy and apply_move, then of FrozenPosition.play
+    """
+
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        position = Position()
+        while not position.is_over():
+            positions.append(position.copy())
+            position.apply_move(rng.choice(position.legal_moves()))
+    children = sum(len(position.legal_moves()) for position in positions)
+
+    start = time.perf_counter()
+    for position in positions:
+        for move in position.legal_moves():
+            child = position.copy()
+            child.apply_move(move)
+    copied = time.perf_counter() - start
+
+    frozen = [FrozenPosition.from_position(position) for position in positions]
+    start = time.perf_counter()
+    for position in frozen:
+        for move in position.legal_moves():
+            position.play(*move)
+    played = time.perf_counter() - start
+
+    return children / copied, children / played
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="time branching positions")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    copied, played = branch_rates(args.games, args.seed)
+    print(f"Position.copy + apply_move: {copied:12,.0f} children/s")
+    print(f"FrozenPosition.play:        {played:12,.0f} children/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+opt-in timing of the phases of a move, and profiling captures
+
+code wraps each phase in `with TIMINGS.phase("name"):`. while timing is
+off phase returns one shared do-nothing context manager, so the cost is
+a method call and no clock is read. once enable() is called every phase
+records its duration in a rolling histogram that keeps the latest
+samples, and report and export give the count, mean, p50, p95, p99 and
+max of each one in milliseconds.
+
+toggle_capture starts or stops a cProfile and a tracemalloc capture, the
+profile and the largest allocations are written to files when it stops.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+from collections import deque
+
+# samples kept per phase
+HISTORY = 1000
+# allocation sites listed in a tracemalloc capture
+TOP_ALLOCATIONS = 25
+
+
+class RollingHistogram:
+    """the latest durations of one phase"""
+
+    samples: deque[float]
+    count: int
+
+    def __init__(self, size: int | None = HISTORY) -> None:
+        # None keeps every sample
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        """record one duration"""
+
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, percent: float, ordered: list[float] | None = None) -> float:
+        """the duration percent of the kept samples are no longer than"""
+
+        ordered = ordered or sorted(self.samples)
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def summary(self) -> dict[str, float]:
+        """statistics of the kept samples in milliseconds"""
+
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "mean": 1000 * sum(ordered) / len(ordered),
+            "p50": 1000 * self.percentile(50, ordered),
+            "p95": 1000 * self.percentile(95, ordered),
+            "p99": 1000 * self.percentile(99, ordered),
+            "max": 1000 * ordered[-1],
+        }
+
+
+class Phase:
+    """context manager that times one run of a phase"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: RollingHistogram) -> None:
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> Phase:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.add(time.perf_counter() - self.start)
+
+
+# returned by phase while timing is off
+NOT_TIMED = contextlib.nullcontext()
+
+
+class Instruments:
+    """phase histograms and profiling captures, everything is off until enabled"""
+
+    enabled: bool
+    histograms: dict[str, RollingHistogram]
+
+    # where toggle_capture writes its results, None to skip that capture
+    profile_path: str | None
+    memory_path: str | None
+    profiler: cProfile.Profile | None
+
+    def __init__(self) -> None:
+
+        self.enabled = False
+        self.histograms = {}
+        self.profile_path = None
+        self.memory_path = None
+        self.profiler = None
+
+    def enable(self, profile_path=None, memory_path=None) -> None:
+        """start timing phases, and say where captures are written"""
+
+        self.enabled = True
+        self.profile_path = profile_path
+        self.memory_path = memory_path
+
+    def disable(self) -> None:
+        """stop timing phases, the samples so far are kept"""
+        self.enabled = False
+
+    def histogram(self, name: str) -> RollingHistogram:
+        """the histogram of phase name, created the first time"""
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = RollingHistogram()
+        return histogram
+
+    def phase(self, name: str):
+        """context manager timing the phase name"""
+
+        if not self.enabled:
+            return NOT_TIMED
+        return Phase(self.histogram(name))
+
+    def record(self, name: str, seconds: float) -> None:
+        """add a duration measured elsewhere to phase name"""
+
+        if self.enabled:
+            self.histogram(name).add(seconds)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """statistics of every phase"""
+        return {name: hist.summary() for name, hist in self.histograms.items()}
+
+    def report(self) -> str:
+        """a table of every phase in milliseconds"""
+
+        lines = [f"{'phase':<16}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}"]
+        for name, stats in self.summary().items():
+            if "mean" not in stats:
+                continue
+            lines.append(
+                f"{name:<16}{stats['count']:>8}{stats['mean']:>9.3f}"
+                f"{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}"
+            )
+        return "\n".join(lines)
+
+    def export(self, path) -> None:
+        """write the statistics of every phase to a JSON file"""
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    @property
+    def capturing(self) -> bool:
+        """True while a profiling capture is running"""
+        return self.profiler is not None or tracemalloc.is_tracing()
+
+    def start_capture(self) -> None:
+        """start profiling and tracing allocations"""
+
+        if self.profile_path:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if self.memory_path:
+            tracemalloc.start()
+
+    def stop_capture(self) -> None:
+        """stop the capture and write its results"""
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            with open(self.memory_path, "w", encoding="utf-8") as file:
+                file.write(f"current {current:,} bytes, peak {peak:,} bytes\n")
+                for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    file.write(f"{stat}\n")
+
+    def toggle_capture(self) -> bool:
+        """start a capture if none is running, otherwise stop it, return True if started"""
+
+        if self.capturing:
+            self.stop_capture()
+            return False
+        self.start_capture()
+        return True
+
+
+# the instruments the game reports to
+TIMINGS = Instruments()
@@ -0,0 +1,299 @@
+"""
+board geometry computed with arithmetic instead of walking hitboxes
+
+the layout matches the hitboxes Board builds with divide_hitbox and
+shrink_hitbox: the top board is centered in the window and shrunk by the
+outer factor, it is split into board_size x board_size subboards each
+shrunk by the board factor, and each subboard is split the same way into
+cells shrunk by the cell factor. the gaps left by shrinking are gutters
+that belong to nothing.
+
+indexes are x * board_size + y, the same as bitboard.location_to_index.
+
+every hitbox is computed once per set of layout constants by get_layout,
+so building a board only has to look them up.
+
+NestedLayout is the same geometry for boards of any size nested any
+number of levels deep, see variants.py.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+from typing import NamedTuple
+
+
+class Hitbox(NamedTuple):
+    """the edges and size of a square area of the screen"""
+
+    e: float
+    w: float
+    n: float
+    s: float
+    size: float
+
+
+def shrink_hitbox(old_hitbox: Hitbox, shrink_factor: float) -> Hitbox:
+    """shrink a hitbox by shrink_factor so it remains centered"""
+
+    center_x = (old_hitbox.w + old_hitbox.e) / 2
+    center_y = (old_hitbox.n + old_hitbox.s) / 2
+
+    new_size = old_hitbox.size * shrink_factor
+
+    return Hitbox(
+        e=center_x + new_size / 2,
+        w=center_x - new_size / 2,
+        n=center_y + new_size / 2,
+        s=center_y - new_size / 2,
+        size=new_size,
+    )
+
+
+def divide_hitbox(
+    old_hitbox: Hitbox,
+    x,
+    y,
+    board_size: int,
+    shrink_factor: float,  # pylint: disable=invalid-name
+) -> Hitbox:
+    """find the hitbox of a smaller board at x,y"""
+
+    stride = old_hitbox.size / board_size
+
+    hitbox = Hitbox(
+        w=old_hitbox.w + x * stride,
+        e=old_hitbox.w + (x + 1) * stride,
+        s=old_hitbox.s + y * stride,
+        n=old_hitbox.s + (y + 1) * stride,
+        size=old_hitbox.size / board_size,
+    )
+    return shrink_hitbox(hitbox, shrink_factor)
+
+
+def split_slot(offset: float, stride: float, margin: float, inner: float, slots: int):
+    """
+    find which of slots slots offset falls in and how far into it,
+    return None if it is outside every slot or in a gutter
+    """
+
+    slot = math.floor(offset / stride)
+    if slot < 0 or slot >= slots:
+        return None
+    inside = offset - slot * stride - margin
+    if inside <= 0 or inside >= inner:
+        return None
+    return slot, inside
+
+
+class Hit(NamedTuple):
+    """result of a hit test, the parts that were missed are None"""
+
+    subboard: int | None
+    cell: int | None
+
+    @property
+    def is_cell(self) -> bool:
+        """True if the location is inside a cell"""
+        return self.cell is not None
+
+
+MISS = Hit(None, None)
+
+
+class Layout:
+    """sizes and offsets of the top board, subboards and cells"""
+
+    board_size: int
+    top_hitbox: Hitbox
+    # indexed by subboard
+    subboard_hitboxes: tuple[Hitbox, ...]
+    # indexed by subboard then cell
+    cell_hitboxes: tuple[tuple[Hitbox, ...], ...]
+
+    # west and south edge of the top board
+    left: float
+    bottom: float
+    # distance from one subboard to the next, the size of a subboard and
+    # the gutter on each side of it
+    board_stride: float
+    board_inner: float
+    board_margin: float
+    # the same for the cells inside a subboard
+    cell_stride: float
+    cell_inner: float
+    cell_margin: float
+
+    def __init__(
+        self,
+        size: float,
+        board_size: int,
+        outer_factor: float,
+        board_factor: float,
+        cell_factor: float,
+    ) -> None:
+
+        self.board_size = board_size
+
+        half = size / 2
+        window_hitbox = Hitbox(e=+half, w=-half, n=+half, s=-half, size=size)
+        self.top_hitbox = shrink_hitbox(window_hitbox, outer_factor)
+
+        self.subboard_hitboxes = tuple(
+            divide_hitbox(self.top_hitbox, x, y, board_size, board_factor)
+            for x in range(board_size)  # pylint: disable=invalid-name
+            for y in range(board_size)  # pylint: disable=invalid-name
+        )
+        self.cell_hitboxes = tuple(
+            tuple(
+                divide_hitbox(subboard, x, y, board_size, cell_factor)
+                for x in range(board_size)  # pylint: disable=invalid-name
+                for y in range(board_size)  # pylint: disable=invalid-name
+            )
+            for subboard in self.subboard_hitboxes
+        )
+
+        top_size = size * outer_factor
+        self.left = -top_size / 2
+        self.bottom = -top_size / 2
+
+        self.board_stride = top_size / board_size
+        self.board_inner = self.board_stride * board_factor
+        self.board_margin = (self.board_stride - self.board_inner) / 2
+
+        self.cell_stride = self.board_inner / board_size
+        self.cell_inner = self.cell_stride * cell_factor
+        self.cell_margin = (self.cell_stride - self.cell_inner) / 2
+
+    def split(self, offset: float, stride: float, margin: float, inner: float):
+        """
+        find which slot offset falls in and how far into it,
+        return None if it is outside every slot or in a gutter
+        """
+        return split_slot(offset, stride, margin, inner, self.board_size)
+
+    def hit_test(self, location) -> Hit:
+        """return the subboard and cell at a screen location"""
+
+        board_x = self.split(
+            location[0] - self.left,
+            self.board_stride,
+            self.board_margin,
+            self.board_inner,
+        )
+        board_y = self.split(
+            location[1] - self.bottom,
+            self.board_stride,
+            self.board_margin,
+            self.board_inner,
+        )
+        if board_x is None or board_y is None:
+            return MISS
+        subboard = board_x[0] * self.board_size + board_y[0]
+
+        cell_x = self.split(
+            board_x[1], self.cell_stride, self.cell_margin, self.cell_inner
+        )
+        cell_y = self.split(
+            board_y[1], self.cell_stride, self.cell_margin, self.cell_inner
+        )
+        if cell_x is None or cell_y is None:
+            return Hit(subboard, None)
+
+        return Hit(subboard, cell_x[0] * self.board_size + cell_y[0])
+
+
+@functools.lru_cache(maxsize=None)
+def get_layout(
+    size: float,
+    board_size: int,
+    outer_factor: float,
+    board_factor: float,
+    cell_factor: float,
+) -> Layout:
+    """return the layout for these constants, it is only computed the first time"""
+    return Layout(size, board_size, outer_factor, board_factor, cell_factor)
+
+
+class NestedLayout:
+    """sizes and offsets of every level of boards nested depth levels deep"""
+
+    board_size: int
+    depth: int
+    top_hitbox: Hitbox
+    # hitboxes[level][board], level 1 is the top board and level depth + 1
+    # the cells, boards are numbered like variants.NestedPosition numbers them
+    hitboxes: list[tuple[Hitbox, ...]]
+    # per level below the top board: (stride, margin, inner) of its slots
+    slots: list[tuple[float, float, float]]
+
+    def __init__(
+        self,
+        size: float,
+        board_size: int,
+        depth: int,
+        outer_factor: float,
+        factor: float,
+    ) -> None:
+
+        self.board_size = board_size
+        self.depth = depth
+
+        half = size / 2
+        window_hitbox = Hitbox(e=+half, w=-half, n=+half, s=-half, size=size)
+        self.top_hitbox = shrink_hitbox(window_hitbox, outer_factor)
+
+        self.hitboxes = [(), (self.top_hitbox,)]
+        for _ in range(depth):
+            self.hitboxes.append(
+                tuple(
+                    divide_hitbox(parent, x, y, board_size, factor)
+                    for parent in self.hitboxes[-1]
+                    for x in range(board_size)  # pylint: disable=invalid-name
+                    for y in range(board_size)  # pylint: disable=invalid-name
+                )
+            )
+
+        self.slots = []
+        inner = self.top_hitbox.size
+        for _ in range(depth):
+            stride = inner / board_size
+            inner = stride * factor
+            self.slots.append((stride, (stride - inner) / 2, inner))
+
+    def hit_path(self, location) -> tuple[int, ...]:
+        """
+        return the path of indexes from the top board to whatever is at a
+        screen location, as deep as it reaches before a gutter, all depth
+        indexes long if it is a cell
+        """
+
+        x = location[0] - self.top_hitbox.w  # pylint: disable=invalid-name
+        y = location[1] - self.top_hitbox.s  # pylint: disable=invalid-name
+        path = []
+        for stride, margin, inner in self.slots:
+            slot_x = split_slot(x, stride, margin, inner, self.board_size)
+            slot_y = split_slot(y, stride, margin, inner, self.board_size)
+            if slot_x is None or slot_y is None:
+                break
+            path.append(slot_x[0] * self.board_size + slot_y[0])
+            x = slot_x[1]  # pylint: disable=invalid-name
+            y = slot_y[1]  # pylint: disable=invalid-name
+        return tuple(path)
+
+    def hitbox(self, path) -> Hitbox:
+        """the hitbox of the board or cell at path"""
+
+        board = 0
+        for index in path:
+            board = board * self.board_size * self.board_size + index
+        return self.hitboxes[len(path) + 1][board]
+
+
+@functools.lru_cache(maxsize=None)
+def get_nested_layout(
+    size: float, board_size: int, depth: int, outer_factor: float, factor: float
+) -> NestedLayout:
+    """return the nested layout for these constants, it is only computed the first time"""
+    return NestedLayout(size, board_size, depth, outer_factor, factor)
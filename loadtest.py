@@ -0,0 +1,363 @@
+"""
+load test for server.py
+
+starts a server in a separate process, unless --port names one already
+running, then opens --clients pairs of connections. each pair plays
+--games games at the same time, X from one connection and O from the
+other, and starts a new game whenever one ends until --seconds have
+passed. moves are picked at random from a bitboard each client keeps up
+to date from the deltas, so every move is answered as soon as the
+opponent's delta arrives. --spectators more connections per pair watch
+every game the pair plays.
+
+the latency of a move is the time from sending it to reading its ack,
+which the server sends once the delta has been queued for everyone in
+the game.
+
+usage: python loadtest.py [--clients N] [--games G] [--seconds S] [--port P]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+from bitboard import PLAYERS, Position
+from instrument import RollingHistogram
+from server import HOST, MAX_LINE, SPECTATOR, encode
+
+
+class Client:
+    """one connection, playing a seat or watching in any number of games"""
+
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    rng: random.Random
+    # game id -> the game as this client has seen it
+    positions: dict[int, Position]
+    # game id -> the player index this client moves for, None to only watch
+    roles: dict[int, int | None]
+    # request id -> when the move was sent
+    sent: dict[int, float]
+    # request id -> future for the ack of a new or join request
+    pending: dict[int, asyncio.Future]
+    # game id -> future set when the game ends
+    finished: dict[int, asyncio.Future]
+    latencies: RollingHistogram
+    # deltas read, for any game
+    deltas: int
+    reading: asyncio.Task
+    # why reading stopped, None while the connection is being read
+    error: Exception | None
+
+    def __init__(self, reader, writer, rng: random.Random) -> None:
+
+        self.reader = reader
+        self.writer = writer
+        self.rng = rng
+        self.positions = {}
+        self.roles = {}
+        self.sent = {}
+        self.pending = {}
+        self.finished = {}
+        self.latencies = RollingHistogram(None)
+        self.deltas = 0
+        self.error = None
+        self.request_ids = itertools.count()
+
+    @classmethod
+    async def connect(cls, host: str, port: int, rng: random.Random) -> Client:
+        """open a connection and start reading it"""
+
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE * 16)
+        client = cls(reader, writer, rng)
+        client.reading = asyncio.create_task(client.read())
+        return client
+
+    async def request(self, message: dict) -> dict:
+        """send a request and wait for its ack"""
+
+        if self.error is not None:
+            raise self.error
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(encode({**message, "id": request_id}))
+        await self.writer.drain()
+        return await future
+
+    async def sit(self, game_id: int | None, role: str | None) -> int:
+        """join a game, or start one when game_id is None, and follow it"""
+
+        if game_id is None:
+            reply = await self.request({"op": "new"})
+        else:
+            reply = await self.request({"op": "join", "game": game_id, "role": role})
+        game_id = reply["game"]
+        self.positions[game_id] = Position()
+        role = reply["role"]
+        self.roles[game_id] = None if role == SPECTATOR else PLAYERS.index(role)
+        self.finished[game_id] = asyncio.get_running_loop().create_future()
+        return game_id
+
+    async def leave(self, game_id: int) -> None:
+        """stop following a game"""
+
+        await self.request({"op": "leave", "game": game_id})
+        del self.positions[game_id], self.roles[game_id], self.finished[game_id]
+
+    def play(self, game_id: int) -> None:
+        """send a random legal move if it is this client's turn"""
+
+        position = self.positions[game_id]
+        if position.is_over() or position.player != self.roles[game_id]:
+            return
+        move = self.rng.choice(position.legal_moves())
+        request_id = next(self.request_ids)
+        self.sent[request_id] = time.perf_counter()
+        self.writer.write(
+            encode(
+                {"op": "move", "game": game_id, "move": list(move), "id": request_id}
+            )
+        )
+
+    async def read(self) -> None:
+        """
+        handle every message from the server until it disconnects, then fail
+        everything still waiting on it so the load test stops instead of hanging
+        """
+
+        try:
+            while line := await self.reader.readline():
+                self.handle(json.loads(line))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.fail(error)
+        else:
+            self.fail(ConnectionError("the server closed the connection"))
+
+    def fail(self, error: Exception) -> None:
+        """give error to every request and game waiting on the server"""
+
+        self.error = error
+        for future in (*self.pending.values(), *self.finished.values()):
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+    def handle(self, message: dict) -> None:
+        """apply a delta or resolve the request an ack or error answers"""
+
+        if message["op"] == "delta":
+            self.deltas += 1
+            game_id = message["game"]
+            position = self.positions[game_id]
+            position.apply_move(tuple(message["move"]))
+            if position.is_over():
+                self.finished[game_id].set_result(message)
+            else:
+                self.play(game_id)
+        elif message["op"] == "ack":
+            start = self.sent.pop(message["id"], None)
+            if start is not None:
+                self.latencies.add(time.perf_counter() - start)
+            future = self.pending.pop(message["id"], None)
+            if future is not None:
+                future.set_result(message)
+        else:
+            raise RuntimeError(f"server error: {message['message']}")
+
+    async def close(self) -> None:
+        """disconnect"""
+
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.reading.cancel()
+
+
+async def play_games(x_client: Client, o_client: Client, watchers, deadline: float):
+    """play games between two clients one after another until deadline, return the count"""
+
+    games = 0
+    while time.perf_counter() < deadline:
+        game_id = await x_client.sit(None, "X")
+        await o_client.sit(game_id, "O")
+        for watcher in watchers:
+            await watcher.sit(game_id, SPECTATOR)
+
+        x_client.play(game_id)
+        await x_client.finished[game_id]
+
+        for client in (x_client, o_client, *watchers):
+            await client.leave(game_id)
+        games += 1
+    return games
+
+
+async def load_test(
+    host: str,
+    port: int,
+    clients: int,
+    games: int,
+    spectators: int,
+    seconds: float,
+    seed: int = 0,
+) -> dict:
+    """run the load test against a server, return its statistics"""
+
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(clients):
+        pairs.append(
+            [
+                await Client.connect(host, port, random.Random(rng.random()))
+                for _ in range(2 + spectators)
+            ]
+        )
+
+    start = time.perf_counter()
+    deadline = start + seconds
+    counts = await asyncio.gather(
+        *(
+            play_games(pair[0], pair[1], pair[2:], deadline)
+            for pair in pairs
+            for _ in range(games)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    players = [client for pair in pairs for client in pair[:2]]
+    watchers = [client for pair in pairs for client in pair[2:]]
+    for client in (*players, *watchers):
+        await client.close()
+
+    return {
+        "connections": len(players) + len(watchers),
+        "games": sum(counts),
+        "seconds": elapsed,
+        "spectator_deltas": sum(client.deltas for client in watchers),
+        "latencies": [
+            latency for client in players for latency in client.latencies.samples
+        ],
+    }
+
+
+def client_process(task: tuple) -> dict:
+    """run load_test in a process of its own"""
+    return asyncio.run(load_test(*task))
+
+
+async def run_clients(host: str, port: int, args) -> dict:
+    """share the clients between args.processes processes and merge their statistics"""
+
+    processes = max(1, min(args.processes, args.clients))
+    tasks = [
+        (
+            host,
+            port,
+            len(range(number, args.clients, processes)),
+            args.games,
+            args.spectators,
+            args.seconds,
+            number,
+        )
+        for number in range(processes)
+    ]
+    if processes == 1:
+        results = [await load_test(*tasks[0])]
+    else:
+        loop = asyncio.get_running_loop()
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, client_process, task) for task in tasks)
+            )
+
+    latencies = RollingHistogram(None)
+    for result in results:
+        for latency in result["latencies"]:
+            latencies.add(latency)
+    return {
+        "connections": sum(result["connections"] for result in results),
+        "games": sum(result["games"] for result in results),
+        "moves": latencies.count,
+        "seconds": max(result["seconds"] for result in results),
+        "spectator_deltas": sum(result["spectator_deltas"] for result in results),
+        "latency": latencies.summary(),
+    }
+
+
+async def run(args) -> dict:
+    """start a server unless one was given, then run the load test"""
+
+    if args.port is not None:
+        return await run_clients(args.host, args.port, args)
+
+    server = await asyncio.create_subprocess_exec(
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+        "--port",
+        "0",
+        "--max-games",
+        str(args.clients * args.games + 1),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        # the server prints "serving on host:port" once it is listening
+        line = await server.stdout.readline()
+        host, port = line.decode().split()[-1].rsplit(":", 1)
+        return await run_clients(host, int(port), args)
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="load test server.py")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument(
+        "--port", type=int, help="server to test, by default one is started"
+    )
+    parser.add_argument("--clients", type=int, default=50, help="pairs of players")
+    parser.add_argument(
+        "--games", type=int, default=20, help="games each pair plays at once"
+    )
+    parser.add_argument(
+        "--spectators", type=int, default=0, help="watching connections per pair"
+    )
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="client processes, so the clients are not what limits the server",
+    )
+    args = parser.parse_args()
+
+    stats = asyncio.run(run(args))
+    latency = stats["latency"]
+    print(
+        f"{stats['connections']} connections, {args.clients * args.games} games at once, "
+        f"{stats['games']} games finished"
+    )
+    print(
+        f"{stats['moves']} moves in {stats['seconds']:.1f}s, "
+        f"{stats['moves'] / stats['seconds']:,.0f} moves/s, "
+        f"{stats['spectator_deltas']} deltas to spectators"
+    )
+    if "p99" in latency:
+        print(
+            f"move ack latency p50 {latency['p50']:.2f} ms, "
+            f"p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Monte Carlo Tree Search (UCT) computer player
+
+the search runs on the bitboard Position from bitboard.py. a player is
+any object with a choose_move(position) method returning a
+(subboard, cell) move, GameState asks it for a move whenever it is that
+player's turn. the position passed in must not be modified.
+
+the tree is kept between moves, when the next position is reached
+through moves already in the tree their subtree becomes the new root.
+positions in the opening book, if one is given, are played from the book
+without searching.
+
+usage: python mcts.py [--seconds S | --playouts N]
+reports playouts per second from the opening position
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+
+from bitboard import PLAYERS, Position
+
+EXPLORATION = math.sqrt(2)
+
+
+class Node:
+    """one position in the search tree"""
+
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "wins")
+
+    # the move that led here, None for the root
+    move: tuple[int, int] | None
+    parent: Node | None
+    # the player that played move
+    player: int
+    children: list[Node]
+    # legal moves that do not have a child yet
+    untried: list[tuple[int, int]]
+    visits: int
+    # wins for player, draws count as half
+    wins: float
+
+    def __init__(self, move, parent, player, untried) -> None:
+
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def __repr__(self) -> str:
+        return f"Node {self.move} {self.wins}/{self.visits}"
+
+    def select_child(self, exploration: float) -> Node:
+        """pick the child with the best UCT score"""
+
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+    def find_child(self, move) -> Node | None:
+        """return the child reached by move, None if it was never expanded"""
+
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+
+class MCTSPlayer:
+    """computer player that picks moves with UCT"""
+
+    # search budget, whichever runs out first ends the search
+    seconds: float | None
+    playouts: int | None
+    exploration: float
+    rng: random.Random
+    verbose: bool
+    # an OpeningBook consulted before searching, or None
+    book: object | None
+
+    root: Node | None
+    # the moves from the start of the game to root
+    root_moves: list[tuple[int, int]]
+
+    # statistics of the last search
+    last_playouts: int
+    last_seconds: float
+    reused_visits: int
+
+    def __init__(
+        self,
+        seconds: float | None = 1.0,
+        playouts: int | None = None,
+        exploration: float = EXPLORATION,
+        seed=None,
+        verbose: bool = False,
+        book=None,
+    ) -> None:
+
+        if seconds is None and playouts is None:
+            raise ValueError("MCTSPlayer needs a time or a playout budget")
+
+        self.seconds = seconds
+        self.playouts = playouts
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.book = book
+
+        self.root = None
+        self.root_moves = []
+
+        self.last_playouts = 0
+        self.last_seconds = 0.0
+        self.reused_visits = 0
+
+    @property
+    def playouts_per_second(self) -> float:
+        """playouts per second of the last search"""
+        return self.last_playouts / max(self.last_seconds, 1e-9)
+
+    def report(self) -> str:
+        """describe the last search"""
+
+        return (
+            f"mcts: {self.last_playouts} playouts in {self.last_seconds:.2f}s "
+            f"({self.playouts_per_second:,.0f}/s), "
+            f"{self.reused_visits} visits reused"
+        )
+
+    def find_root(self, position: Position) -> Node:
+        """reuse the subtree for position if the tree already reached it"""
+
+        moves = [entry[0] for entry in position.history]
+        depth = len(self.root_moves)
+
+        node = self.root
+        if node is not None and moves[:depth] == self.root_moves:
+            for move in moves[depth:]:
+                node = node.find_child(move)
+                if node is None:
+                    break
+        else:
+            node = None
+
+        if node is None:
+            node = Node(None, None, position.player ^ 1, position.legal_moves())
+
+        node.parent = None
+        self.root = node
+        self.root_moves = moves
+        return node
+
+    def choose_move(self, position: Position) -> tuple[int, int]:
+        """search from position and return the most visited move"""
+
+        if position.is_over():
+            raise ValueError("the game is already over")
+
+        if self.book is not None:
+            entry = self.book.lookup(position)
+            if entry is not None:
+                if self.verbose:
+                    print(f"mcts: book move {entry.move} scores {entry.score:.1%}")
+                return entry.move
+
+        root = self.find_root(position)
+        self.reused_visits = root.visits
+
+        start = time.perf_counter()
+        deadline = None if self.seconds is None else start + self.seconds
+        playouts = 0
+        while True:
+            # search until the root has a child, even with no budget left, so
+            # there is always a move to pick
+            if root.children:
+                if self.playouts is not None and playouts >= self.playouts:
+                    break
+                # checking the clock is slow enough to only do it every few playouts
+                if deadline is not None and playouts % 16 == 0:
+                    if time.perf_counter() >= deadline:
+                        break
+            self.playout(root, position)
+            playouts += 1
+
+        self.last_playouts = playouts
+        self.last_seconds = time.perf_counter() - start
+
+        best = max(root.children, key=lambda child: child.visits)
+
+        # keep the chosen subtree for the next search
+        best.parent = None
+        self.root = best
+        self.root_moves = self.root_moves + [best.move]
+
+        if self.verbose:
+            print(self.report())
+
+        return best.move
+
+    def playout(self, root: Node, position: Position) -> None:
+        """run one select, expand, simulate and backpropagate step"""
+
+        rng = self.rng
+        position = position.copy()
+        node = root
+
+        # select
+        while not node.untried and node.children:
+            node = node.select_child(self.exploration)
+            position.play(*node.move)
+
+        # expand
+        if node.untried:
+            index = rng.randrange(len(node.untried))
+            move = node.untried[index]
+            node.untried[index] = node.untried[-1]
+            node.untried.pop()
+
+            player = position.player
+            position.play(*move)
+            child = Node(move, node, player, position.legal_moves())
+            node.children.append(child)
+            node = child
+
+        # simulate
+        while not position.is_over():
+            position.play(*rng.choice(position.legal_moves()))
+
+        # backpropagate
+        winner = position.winner
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1.0
+            node = node.parent
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="measure MCTS playouts per second")
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument("--seconds", type=float, help="search time per move")
+    budget.add_argument("--playouts", type=int, help="playouts per move")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seconds = args.seconds
+    if seconds is None and args.playouts is None:
+        seconds = 1.0
+
+    player = MCTSPlayer(seconds=seconds, playouts=args.playouts, seed=args.seed)
+    position = Position()
+    move = player.choose_move(position)
+
+    print(player.report())
+    print(f"best move for {PLAYERS[position.player]}: {move}")
+
+
+if __name__ == "__main__":
+    main()
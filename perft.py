@@ -0,0 +1,67 @@
+"""
+perft benchmark for the bitboard move generator
+
+counts every node of the move tree from the opening position to a fixed
+depth, compares the count with the known value and reports nodes per
+second. a wrong count means move generation or undo_move is broken,
+a drop in nodes per second means it got slower.
+
+usage: python perft.py [depth]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from bitboard import Position, perft
+
+# leaf counts from the opening position, where X must play in subboard (2, 2)
+KNOWN_NODES = {
+    1: 9,
+    2: 80,
+    3: 704,
+    4: 6120,
+    5: 52584,
+    6: 446816,
+}
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "depth", nargs="?", type=int, default=5, help="deepest depth to count"
+    )
+    args = parser.parse_args()
+
+    failed = False
+    for depth in range(1, args.depth + 1):
+        position = Position()
+
+        start = time.perf_counter()
+        nodes = perft(position, depth)
+        seconds = time.perf_counter() - start
+
+        expected = KNOWN_NODES.get(depth)
+        if expected is None:
+            status = "?"
+        elif nodes == expected:
+            status = "ok"
+        else:
+            status = f"FAIL expected {expected}"
+            failed = True
+
+        print(
+            f"depth {depth}: {nodes:>10} nodes {seconds:8.3f}s "
+            f"{nodes / max(seconds, 1e-9):>12,.0f} nodes/s {status}"
+        )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+computer player policies
+
+a player is any object with a choose_move(position) method that returns a
+legal (subboard, cell) move for the bitboard Position it is given and
+does not modify it. POLICIES maps the policy names used on the command
+line to functions that build a player from a seed. the scripted policy
+replays a game given by load_script, a game record file or a move list.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+
+from alphabeta import AlphaBetaPlayer
+from bitboard import CELLS, Position
+from mcts import MCTSPlayer
+from records import read_records
+
+
+class RandomPlayer:
+    """plays a uniformly random legal move"""
+
+    rng: random.Random
+
+    def __init__(self, seed=None) -> None:
+        self.rng = random.Random(seed)
+
+    def choose_move(self, position: Position) -> tuple[int, int]:
+        """pick a random legal move"""
+        return self.rng.choice(position.legal_moves())
+
+
+class ScriptedPlayer:
+    """
+    plays the moves of a scripted game, one per ply, while they are legal,
+    then the first legal move. a script holds both sides' moves so two
+    scripted players replay the whole game
+    """
+
+    script: list[tuple[int, int]]
+
+    def __init__(self, script=()) -> None:
+        self.script = [tuple(move) for move in script]
+
+    def choose_move(self, position: Position) -> tuple[int, int]:
+        """play the script's move for this ply if it is legal"""
+
+        moves = position.legal_moves()
+        ply = len(position.history)
+        if ply < len(self.script) and self.script[ply] in moves:
+            return self.script[ply]
+        return moves[0]
+
+
+def load_script(source: str) -> list[tuple[int, int]]:
+    """
+    the moves of the first game in the record file source, or of a comma
+    separated list of subboard:cell moves like 8:4,4:0, raise ValueError if
+    it is neither
+    """
+
+    if os.path.exists(source):
+        for record in read_records(source):
+            return record.move_list()
+        raise ValueError(f"{source} holds no games")
+
+    script = []
+    for text in source.split(","):
+        try:
+            subboard, cell = (int(part) for part in text.split(":"))
+        except ValueError:
+            raise ValueError(f"bad move {text!r}, expected subboard:cell") from None
+        if not (0 <= subboard < CELLS and 0 <= cell < CELLS):
+            raise ValueError(f"move {text!r} is off the board")
+        script.append((subboard, cell))
+    return script
+
+
+# name -> function(seed, playouts, depth, script) building a fresh player,
+# the searchers use fixed budgets instead of time so results are reproducible
+POLICIES = {
+    "random": lambda seed, playouts, depth, script: RandomPlayer(seed),
+    "scripted": lambda seed, playouts, depth, script: ScriptedPlayer(script),
+    "mcts": lambda seed, playouts, depth, script: MCTSPlayer(
+        seconds=None, playouts=playouts, seed=seed
+    ),
+    "alphabeta": lambda seed, playouts, depth, script: AlphaBetaPlayer(
+        seconds=None, max_depth=depth, megabytes=1
+    ),
+}
+
+
+def create_player(name: str, seed=None, playouts: int = 200, depth: int = 2, script=()):
+    """build the player for policy name, raise ValueError for an unknown name"""
+
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy {name!r}, choose from {', '.join(POLICIES)}")
+    return POLICIES[name](seed, playouts, depth, script)
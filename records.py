@@ -0,0 +1,277 @@
+"""
+compact binary game records
+
+a record file starts with the 4 byte magic b"TTTR" and a version byte,
+then holds any number of games back to back. each game is a 4 byte header
+
+    result        1 byte   0 X won, 1 O won, 2 drawn, 3 unfinished
+    move count    1 byte   at most 81
+    metadata size 2 bytes  little endian
+
+followed by the metadata as UTF-8 JSON (empty for none) and one byte per
+move, subboard index * 9 + cell index, the same as a bitboard bit.
+
+RecordWriter appends games and read_records yields them one at a time, so
+files of any size are read and written in constant memory. replay rebuilds
+a GameState at any ply by playing the moves through its rules.
+
+usage: python records.py FILE [--ply N --game G]
+prints how many games FILE holds and how fast it was read, or the board
+of game G after N moves
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import time
+from typing import BinaryIO, Iterator, NamedTuple
+
+from bitboard import BOARD_SIZE, CELLS, Position
+
+MAGIC = b"TTTR"
+VERSION = 1
+FILE_HEADER = MAGIC + bytes([VERSION])
+# result, move count, metadata size
+RECORD_HEADER = struct.Struct("<BBH")
+# the largest metadata size the header can hold
+MAX_METADATA = 0xFFFF
+
+X_WON = 0
+O_WON = 1
+DRAWN = 2
+UNFINISHED = 3
+RESULT_NAMES = ("X won", "O won", "drawn", "unfinished")
+
+
+def encode_move(move: tuple[int, int]) -> int:
+    """pack a (subboard, cell) move into a byte"""
+    return move[0] * CELLS + move[1]
+
+
+def decode_move(byte: int) -> tuple[int, int]:
+    """unpack a byte into a (subboard, cell) move"""
+    return divmod(byte, CELLS)
+
+
+def position_result(position: Position) -> int:
+    """the result code of position"""
+
+    if position.winner is not None:
+        return position.winner
+    if position.drawn:
+        return DRAWN
+    return UNFINISHED
+
+
+class GameRecord(NamedTuple):
+    """the moves of one game, its result and anything else worth keeping"""
+
+    moves: bytes
+    result: int = UNFINISHED
+    metadata: dict | None = None
+
+    @classmethod
+    def from_position(cls, position: Position, metadata=None) -> GameRecord:
+        """record the moves that led to position"""
+
+        moves = bytes(encode_move(entry[0]) for entry in position.history)
+        return cls(moves, position_result(position), metadata)
+
+    def move_list(self) -> list[tuple[int, int]]:
+        """the moves as (subboard, cell) pairs"""
+        return [decode_move(byte) for byte in self.moves]
+
+    def to_bytes(self) -> bytes:
+        """encode the record the way it is stored in a file, raise ValueError
+        if it does not fit the format"""
+
+        if len(self.moves) > CELLS * CELLS:
+            raise ValueError(f"{len(self.moves)} moves, a game has at most 81")
+        if max(self.moves, default=0) >= CELLS * CELLS:
+            raise ValueError(f"move byte {max(self.moves)} is past the last cell 80")
+        if not 0 <= self.result <= UNFINISHED:
+            raise ValueError(f"unknown result {self.result}")
+        # None is stored as no metadata at all, so an empty dict reads back
+        metadata = b"" if self.metadata is None else json.dumps(self.metadata).encode()
+        if len(metadata) > MAX_METADATA:
+            raise ValueError(
+                f"metadata is {len(metadata)} bytes as JSON, at most {MAX_METADATA}"
+            )
+        return (
+            RECORD_HEADER.pack(self.result, len(self.moves), len(metadata))
+            + metadata
+            + self.moves
+        )
+
+
+class RecordWriter:
+    """appends game records to a file, use it as a context manager"""
+
+    file: BinaryIO
+    games: int
+
+    def __init__(self, path) -> None:
+
+        self.file = open(path, "ab")  # pylint: disable=consider-using-with
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER)
+        self.games = 0
+
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, record: GameRecord) -> None:
+        """append one record"""
+
+        self.file.write(record.to_bytes())
+        self.games += 1
+
+    def write_position(self, position: Position, metadata=None) -> None:
+        """append the game that led to position"""
+        self.write(GameRecord.from_position(position, metadata))
+
+    def close(self) -> None:
+        """flush and close the file"""
+        self.file.close()
+
+
+def read_exactly(file: BinaryIO, size: int) -> bytes:
+    """read size bytes, raise ValueError if the file ends first"""
+
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("truncated game record")
+    return data
+
+
+def read_metadata(data: bytes) -> dict:
+    """decode a record's metadata, raise ValueError if it is not a JSON object"""
+
+    try:
+        metadata = json.loads(data)
+    except ValueError as error:
+        raise ValueError(f"corrupt game record metadata: {error}") from error
+    if not isinstance(metadata, dict):
+        raise ValueError("corrupt game record metadata: not a JSON object")
+    return metadata
+
+
+def read_records(path) -> Iterator[GameRecord]:
+    """yield every record in a file, one at a time"""
+
+    with open(path, "rb") as file:
+        if file.read(len(FILE_HEADER)) != FILE_HEADER:
+            raise ValueError(f"{path} is not a version {VERSION} game record file")
+
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) != RECORD_HEADER.size:
+                raise ValueError("truncated game record")
+
+            result, count, metadata_size = RECORD_HEADER.unpack(header)
+            if result > UNFINISHED or count > CELLS * CELLS:
+                raise ValueError("corrupt game record header")
+            metadata = None
+            if metadata_size:
+                metadata = read_metadata(read_exactly(file, metadata_size))
+            moves = read_exactly(file, count)
+            if max(moves, default=0) >= CELLS * CELLS:
+                raise ValueError(f"corrupt game record, move byte {max(moves)}")
+            yield GameRecord(moves, result, metadata)
+
+
+def format_position(position: Position) -> str:
+    """draw the cells of position as text, north at the top like the window"""
+
+    size = BOARD_SIZE
+    rows = []
+    for row in reversed(range(size * size)):
+        groups = []
+        for board_x in range(size):
+            subboard = board_x * size + row // size
+            groups.append(
+                "".join(
+                    position.cell_owner(subboard, cell_x * size + row % size)
+                    for cell_x in range(size)
+                )
+            )
+        rows.append(" ".join(groups))
+        if row % size == 0 and row:
+            rows.append("")
+    return "\n".join(rows)
+
+
+def replay_position(record: GameRecord, ply: int | None = None) -> Position:
+    """return the bitboard position after the first ply moves of record"""
+
+    position = Position()
+    for move in record.move_list()[:ply]:
+        if not position.is_legal(*move):
+            raise ValueError(f"illegal move {move} in game record")
+        position.apply_move(move)
+    return position
+
+
+def replay(record: GameRecord, ply: int | None = None, **options):
+    """
+    return a GameState after the first ply moves of record, every move goes
+    through GameState.apply_move, options are passed to GameState
+    """
+
+    from tick_tac_tick_tac_toe import (  # pylint: disable=import-outside-toplevel
+        GameState,
+    )
+
+    options.setdefault("headless", True)
+    game_state = GameState(**options)
+    for move in record.move_list()[:ply]:
+        game_state.apply_move(move)
+    return game_state
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="summarise a game record file")
+    parser.add_argument("file")
+    parser.add_argument("--game", type=int, default=0, help="game to replay")
+    parser.add_argument("--ply", type=int, help="show the board after this many moves")
+    args = parser.parse_args()
+
+    if args.ply is not None:
+        for number, record in enumerate(read_records(args.file)):
+            if number == args.game:
+                position = replay_position(record, args.ply)
+                print(
+                    f"game {number}: {RESULT_NAMES[record.result]}, {record.metadata}"
+                )
+                print(f"after {len(position.history)} moves:")
+                print(format_position(position))
+                return
+        parser.error(f"{args.file} has no game {args.game}")
+
+    start = time.perf_counter()
+    games = moves = 0
+    results = [0] * len(RESULT_NAMES)
+    for record in read_records(args.file):
+        games += 1
+        moves += len(record.moves)
+        results[record.result] += 1
+    seconds = time.perf_counter() - start
+
+    print(
+        f"{games} games, {moves} moves read in {seconds:.2f}s "
+        f"({games / max(seconds, 1e-9):,.0f} games/s)"
+    )
+    print(", ".join(f"{name} {count}" for name, count in zip(RESULT_NAMES, results)))
+
+
+if __name__ == "__main__":
+    main()
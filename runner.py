@@ -0,0 +1,305 @@
+"""
+multi-process self-play and tournament runner
+
+every ordered pair of policies plays --games games with each policy as X
+and as O. games are split into chunks that worker processes play with a
+headless GameState, each chunk sends back one tally instead of one
+result per game. every game is seeded from --seed and its number, so
+the results are the same for any number of workers.
+
+the tournament is played once per worker count in --workers to show how
+games/sec scales, then the win/draw/loss matrix and Elo estimates are printed.
+with --record the games of the last run are appended to a game record file.
+the scripted policy replays --script, the first game of a record file or a
+list of subboard:cell moves, then plays the first legal move.
+
+usage: python runner.py --policies random,mcts,alphabeta --games 100 --workers 1,4
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import multiprocessing
+import os
+import time
+
+from players import POLICIES, create_player, load_script
+from records import GameRecord, RecordWriter
+from tick_tac_tick_tac_toe import GameState
+
+ELO_BASE = 1500
+ELO_SCALE = 400
+
+
+def play_game(x_name, o_name, seed, playouts, depth, script=()) -> GameRecord:
+    """play one headless game and return its record"""
+
+    players = {
+        "X": create_player(x_name, 2 * seed, playouts, depth, script),
+        "O": create_player(o_name, 2 * seed + 1, playouts, depth, script),
+    }
+    game = GameState(headless=True, players=players)
+    game.next_turn()
+
+    metadata = {"x": x_name, "o": o_name, "seed": seed}
+    return GameRecord.from_position(game.position, metadata)
+
+
+def play_chunk(task: tuple) -> tuple:
+    """
+    play a chunk of games between two policies, return the tally and,
+    if they are being recorded, the games' records
+    """
+
+    x_name, o_name, first_game, count, seed, playouts, depth, record, script = task
+
+    x_wins = o_wins = draws = moves = 0
+    records = []
+    for game_number in range(first_game, first_game + count):
+        game = play_game(
+            x_name, o_name, seed * 1_000_003 + game_number, playouts, depth, script
+        )
+        if game.result == 0:
+            x_wins += 1
+        elif game.result == 1:
+            o_wins += 1
+        else:
+            draws += 1
+        moves += len(game.moves)
+        if record:
+            records.append(game)
+
+    return (x_name, o_name, x_wins, o_wins, draws, moves), records
+
+
+def make_tasks(
+    policies, games, chunk, seed, playouts, depth, record=False, script=()
+) -> list[tuple]:
+    """split every pairing's games into chunks"""
+
+    tasks = []
+    game_number = 0
+    for x_name in policies:
+        for o_name in policies:
+            if x_name == o_name and len(policies) > 1:
+                continue
+            for first in range(0, games, chunk):
+                count = min(chunk, games - first)
+                tasks.append(
+                    (
+                        x_name,
+                        o_name,
+                        game_number + first,
+                        count,
+                        seed,
+                        playouts,
+                        depth,
+                        record,
+                        script,
+                    )
+                )
+            game_number += games
+    return tasks
+
+
+class Tournament:
+    """tally of the games between every ordered pair of policies"""
+
+    # (x policy, o policy) -> [x wins, o wins, draws, moves]
+    pairs: dict[tuple[str, str], list[int]]
+
+    def __init__(self) -> None:
+        self.pairs = {}
+
+    def add(self, result: tuple) -> None:
+        """add the tally of one chunk"""
+
+        x_name, o_name, *counts = result
+        tally = self.pairs.setdefault((x_name, o_name), [0, 0, 0, 0])
+        for index, count in enumerate(counts):
+            tally[index] += count
+
+    @property
+    def games(self) -> int:
+        """number of games played"""
+        return sum(sum(tally[:3]) for tally in self.pairs.values())
+
+    def record(self, name: str, opponent: str) -> tuple[int, int, int]:
+        """wins, draws and losses of name against opponent with either color"""
+
+        if name == opponent:
+            # self-play, shown as X wins, draws, O wins
+            x_wins, o_wins, draws, _ = self.pairs.get((name, name), (0, 0, 0, 0))
+            return x_wins, draws, o_wins
+
+        wins = draws = losses = 0
+        for (x_name, o_name), (x_wins, o_wins, pair_draws, _) in self.pairs.items():
+            if (x_name, o_name) == (name, opponent):
+                wins += x_wins
+                losses += o_wins
+                draws += pair_draws
+            if (o_name, x_name) == (name, opponent):
+                wins += o_wins
+                losses += x_wins
+                draws += pair_draws
+        return wins, draws, losses
+
+    def matrix(self, names: list[str]) -> str:
+        """format the win-draw-loss matrix, rows are from the row policy's side"""
+
+        width = max(12, *(len(name) + 2 for name in names))
+        lines = [" " * width + "".join(f"{name:>{width}}" for name in names)]
+        for name in names:
+            cells = []
+            for opponent in names:
+                wins, draws, losses = self.record(name, opponent)
+                cells.append(f"{f'{wins}-{draws}-{losses}':>{width}}")
+            lines.append(f"{name:<{width}}" + "".join(cells))
+        return "\n".join(lines)
+
+    def elo(self, names: list[str], iterations: int = 200) -> dict[str, float]:
+        """
+        estimate Elo ratings from every head to head record, one virtual draw
+        is added to each pairing so a policy that never loses still gets a
+        finite rating
+        """
+
+        ratings = dict.fromkeys(names, 0.0)
+        records = {}
+        for name in names:
+            for opponent in names:
+                if name != opponent:
+                    wins, draws, losses = self.record(name, opponent)
+                    records[name, opponent] = (
+                        wins + draws / 2 + 0.5,
+                        wins + draws + losses + 1,
+                    )
+
+        for _ in range(iterations):
+            for name in names:
+                actual = expected = variance = 0.0
+                for opponent in names:
+                    if name == opponent:
+                        continue
+                    points, games = records[name, opponent]
+                    chance = 1 / (
+                        1 + 10 ** ((ratings[opponent] - ratings[name]) / ELO_SCALE)
+                    )
+                    actual += points
+                    expected += games * chance
+                    variance += games * chance * (1 - chance)
+                if variance:
+                    ratings[name] += (
+                        ELO_SCALE / math.log(10) * (actual - expected) / variance
+                    )
+
+        mean = sum(ratings.values()) / max(len(ratings), 1)
+        return {name: ELO_BASE + rating - mean for name, rating in ratings.items()}
+
+
+def run(
+    tasks: list[tuple], workers: int, writer: RecordWriter | None = None
+) -> tuple[Tournament, float]:
+    """
+    play every task on a pool of workers, return the tally and the time taken,
+    records sent back by the tasks are written to writer
+    """
+
+    tournament = Tournament()
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for result, records in pool.imap_unordered(play_chunk, tasks):
+            tournament.add(result)
+            for record in records:
+                writer.write(record)
+    return tournament, time.perf_counter() - start
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="play a self-play tournament")
+    parser.add_argument(
+        "--policies",
+        default="random,mcts",
+        help=f"comma separated policies from {', '.join(POLICIES)}",
+    )
+    parser.add_argument(
+        "--games", type=int, default=20, help="games per pairing and color"
+    )
+    parser.add_argument(
+        "--workers",
+        default=f"1,{os.cpu_count()}",
+        help="comma separated worker counts to time",
+    )
+    parser.add_argument("--chunk", type=int, default=10, help="games per task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--playouts", type=int, default=200, help="mcts playouts per move"
+    )
+    parser.add_argument("--depth", type=int, default=2, help="alphabeta depth")
+    parser.add_argument(
+        "--record", help="append the games of the last run to this game record file"
+    )
+    parser.add_argument(
+        "--script",
+        metavar="FILE_OR_MOVES",
+        help="game record file or moves like 8:4,4:0 for the scripted policy",
+    )
+    args = parser.parse_args()
+
+    names = args.policies.split(",")
+    for name in names:
+        if name not in POLICIES:
+            parser.error(f"unknown policy {name!r}")
+    script = []
+    if args.script is not None:
+        try:
+            script = load_script(args.script)
+        except ValueError as error:
+            parser.error(str(error))
+
+    tournament = None
+    single_rate = None
+    worker_counts = list(dict.fromkeys(int(count) for count in args.workers.split(",")))
+    for workers in worker_counts:
+        # only the last run is recorded so every game is written once
+        record = args.record is not None and workers == worker_counts[-1]
+        tasks = make_tasks(
+            names,
+            args.games,
+            args.chunk,
+            args.seed,
+            args.playouts,
+            args.depth,
+            record,
+            script,
+        )
+        previous = tournament
+        if record:
+            with RecordWriter(args.record) as writer:
+                tournament, seconds = run(tasks, workers, writer)
+        else:
+            tournament, seconds = run(tasks, workers)
+        rate = tournament.games / max(seconds, 1e-9)
+        single_rate = single_rate or rate
+        print(
+            f"{workers:>3} workers: {tournament.games} games in {seconds:.2f}s "
+            f"{rate:,.1f} games/s ({rate / single_rate:.2f}x)"
+        )
+        if previous is not None and previous.pairs != tournament.pairs:
+            print("warning: results changed with the number of workers")
+
+    print()
+    print("wins-draws-losses")
+    print(tournament.matrix(names))
+    print()
+    for name, rating in sorted(
+        tournament.elo(names).items(), key=lambda item: item[1], reverse=True
+    ):
+        print(f"{name:<12} {rating:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+runs the steps of a move one after another without blocking the event loop
+
+a move's animation is a queue of steps, each with a delay in milliseconds.
+instead of sleeping between steps the scheduler asks the window to call
+it back with after(), so Tk keeps handling events while a win is shown.
+
+clicks that arrive while steps are queued are buffered. the click handler
+finishes the queued steps straight away, then runs the buffered clicks in
+the order they came in, so a click always sees the rules state the
+animation ends in and is applied or rejected within the same event.
+
+without a window every step runs straight away, so headless games play
+through without waiting and without recursing once per move.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections import deque
+from typing import Callable
+
+
+class Scheduler:
+    """ordered queue of delayed steps driven by a window's after() timer"""
+
+    # anything with an after(milliseconds, callback) method, None when headless
+    window: object | None
+    # (delay in milliseconds, callback) waiting to run, the first one is next
+    steps: deque[tuple[int, Callable[[], None]]]
+    # clicks that arrived while steps were queued
+    inputs: deque[Callable[[], None]]
+    # bumped whenever a pending timer should be ignored when it fires
+    timer: int
+    # a timer is set for the first step
+    waiting: bool
+    # a step or input is running, so new steps are left for the loop to run
+    running: bool
+
+    def __init__(self, window=None) -> None:
+
+        self.window = window
+        self.steps = deque()
+        self.inputs = deque()
+        self.timer = 0
+        self.waiting = False
+        self.running = False
+
+    @property
+    def busy(self) -> bool:
+        """True while steps are queued, such as a win being shown"""
+        return bool(self.steps)
+
+    def after(self, milliseconds: int, callback: Callable[[], None]) -> None:
+        """run callback milliseconds after every step queued before it has run"""
+
+        self.steps.append((milliseconds, callback))
+        self.run()
+
+    def then(self, milliseconds: int, callback: Callable[[], None]) -> None:
+        """
+        run callback milliseconds after the current step, before the steps
+        already queued, for steps that decide what comes next as they run
+        """
+
+        self.steps.appendleft((milliseconds, callback))
+        self.run()
+
+    def run(self) -> None:
+        """
+        run queued steps and inputs in order until a step has to wait for its
+        timer, steps do not wait while an input is buffered behind them
+        """
+
+        if self.running or self.waiting:
+            return
+
+        self.running = True
+        try:
+            while self.steps or self.inputs:
+                if self.steps:
+                    delay, callback = self.steps[0]
+                    if delay > 0 and self.window is not None and not self.inputs:
+                        self.waiting = True
+                        self.window.after(
+                            delay, functools.partial(self.on_timer, self.timer)
+                        )
+                        return
+                    self.steps.popleft()
+                else:
+                    callback = self.inputs.popleft()
+                callback()
+        finally:
+            self.running = False
+
+    def cancel_timer(self) -> None:
+        """ignore the pending timer when it fires"""
+
+        self.timer += 1
+        self.waiting = False
+
+    def on_timer(self, timer: int) -> None:
+        """run the step the timer was set for and carry on with the rest"""
+
+        if timer != self.timer or not self.waiting:
+            return
+        self.waiting = False
+
+        self.running = True
+        try:
+            _, callback = self.steps.popleft()
+            callback()
+        finally:
+            self.running = False
+        self.run()
+
+    def finish(self) -> None:
+        """run every queued step now without waiting for its timer"""
+
+        if self.running:
+            return
+
+        self.cancel_timer()
+        self.running = True
+        try:
+            while self.steps:
+                _, callback = self.steps.popleft()
+                callback()
+        finally:
+            self.running = False
+        self.run()
+
+    def submit(self, callback: Callable[[], None]) -> None:
+        """
+        run an input callback once the steps queued before it have run,
+        they are finished early instead of making the input wait
+        """
+
+        self.inputs.append(callback)
+        if self.waiting:
+            self.cancel_timer()
+        self.run()
@@ -0,0 +1,360 @@
+"""
+asyncio server hosting many games at once over TCP
+
+every game is a headless GameState, so moves go through the same rules as
+the window: GameState.apply_move checks the subboard with
+check_legal_subboard and the cell is empty, then plays the move and
+update_legal_subboard picks where the next one must go.
+
+messages are JSON objects, one per line, in both directions. a client sends
+
+    {"op": "new"}                                 start a game and sit as X
+    {"op": "join", "game": G, "role": R}          R is "X", "O" or "spectator",
+                                                  without a role take a free seat
+    {"op": "move", "game": G, "move": [S, C], "id": N}
+    {"op": "leave", "game": G}
+
+every request is answered with {"op": "ack", "id": N, ...} or
+{"op": "error", "id": N, "message": ...}, the id is copied from the request.
+joining answers with the moves so far, then every player and spectator of
+the game is sent a delta for each move
+
+    {"op": "delta", "game": G, "ply": P, "move": [S, C], "player": "X",
+     "forced": F, "won": [[subboard, "X"], ...], "winner": W, "drawn": D}
+
+where won lists the subboards this move won, forced is the subboard the
+next move must be played in (None for anywhere) and winner is None until
+the game is over. a delta is encoded once and the same bytes go to
+everyone watching. a client that stops reading is disconnected once
+MAX_BUFFER bytes are waiting for it, so it cannot hold up the others.
+
+usage: python server.py [--host HOST] [--port PORT] [--max-games N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+
+from bitboard import CELLS, PLAYERS
+from tick_tac_tick_tac_toe import GameState
+
+HOST = "127.0.0.1"
+PORT = 7177
+# bytes queued for a slow client before it is disconnected
+MAX_BUFFER = 1 << 20
+# longest request line accepted
+MAX_LINE = 1 << 12
+SPECTATOR = "spectator"
+
+
+class ProtocolError(Exception):
+    """a request that cannot be carried out, sent back to the client as an error"""
+
+
+def encode(message: dict) -> bytes:
+    """a message as one line of JSON"""
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class Connection:
+    """one client, which can play or watch any number of games"""
+
+    writer: asyncio.StreamWriter
+    # game id -> role in that game
+    games: dict[int, str]
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+
+        self.writer = writer
+        self.games = {}
+
+    def send(self, data: bytes) -> None:
+        """queue an encoded message, drop the client if it has stopped reading"""
+
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            self.writer.close()
+            return
+        self.writer.write(data)
+
+
+class Session:
+    """a game and everyone playing or watching it"""
+
+    game_id: int
+    game_state: GameState
+    # symbol -> the connection sitting in that seat
+    seats: dict[str, Connection]
+    spectators: set[Connection]
+
+    def __init__(self, game_id: int) -> None:
+
+        self.game_id = game_id
+        self.game_state = GameState(headless=True)
+        self.seats = {}
+        self.spectators = set()
+
+    def members(self) -> list[Connection]:
+        """every connection that is sent this game's deltas"""
+        return [*self.seats.values(), *self.spectators]
+
+    def is_empty(self) -> bool:
+        """True once everyone has left"""
+        return not self.seats and not self.spectators
+
+    def join(self, connection: Connection, role: str | None) -> str:
+        """sit connection in role, or in the first free seat, return the role taken"""
+
+        if role is None:
+            role = next(
+                (symbol for symbol in PLAYERS if symbol not in self.seats), None
+            )
+            role = role or SPECTATOR
+        if role == SPECTATOR:
+            self.spectators.add(connection)
+        elif role not in PLAYERS:
+            raise ProtocolError(f"unknown role {role!r}")
+        elif self.seats.get(role, connection) is not connection:
+            raise ProtocolError(f"{role} is taken")
+        else:
+            self.seats[role] = connection
+        connection.games[self.game_id] = role
+        return role
+
+    def leave(self, connection: Connection) -> None:
+        """remove connection from the game"""
+
+        role = connection.games.pop(self.game_id, None)
+        if role == SPECTATOR:
+            self.spectators.discard(connection)
+        elif role is not None:
+            self.seats.pop(role, None)
+
+    def snapshot(self) -> dict:
+        """the moves so far and whose turn it is, sent when joining"""
+
+        position = self.game_state.position
+        return {
+            "game": self.game_id,
+            "moves": [list(entry[0]) for entry in position.history],
+            "player": self.game_state.player,
+            "forced": position.forced,
+            "winner": None if position.winner is None else PLAYERS[position.winner],
+            "drawn": position.drawn,
+        }
+
+    def play(self, connection: Connection, move) -> dict:
+        """play move for connection, return the delta it makes"""
+
+        game_state = self.game_state
+        position = game_state.position
+        if position.is_over():
+            raise ProtocolError("the game is over")
+        player = game_state.player
+        if self.seats.get(player) is not connection:
+            raise ProtocolError("it is not your turn")
+        if (
+            not isinstance(move, list)
+            or len(move) != 2
+            or not all(type(index) is int for index in move)  # no bools
+            or not all(0 <= index < CELLS for index in move)
+        ):
+            raise ProtocolError(f"bad move {move!r}")
+
+        won_before = position.boards[0] | position.boards[1]
+        try:
+            game_state.apply_move(tuple(move))
+        except ValueError as error:
+            raise ProtocolError(str(error)) from error
+        won = (position.boards[0] | position.boards[1]) & ~won_before
+
+        return {
+            "op": "delta",
+            "game": self.game_id,
+            "ply": len(position.history),
+            "move": move,
+            "player": player,
+            "forced": position.forced,
+            "won": [
+                [subboard, position.board_owner(subboard)]
+                for subboard in range(CELLS)
+                if won >> subboard & 1
+            ],
+            "winner": None if position.winner is None else PLAYERS[position.winner],
+            "drawn": position.drawn,
+        }
+
+
+class GameServer:
+    """accepts connections and routes their requests to the sessions"""
+
+    sessions: dict[int, Session]
+    max_games: int
+    # moves played since the server started
+    moves: int
+
+    def __init__(self, max_games: int = 10000) -> None:
+
+        self.sessions = {}
+        self.max_games = max_games
+        self.moves = 0
+        self.game_ids = itertools.count(1)
+
+    async def start(self, host: str = HOST, port: int = PORT) -> asyncio.Server:
+        """listen for clients, port 0 picks a free port"""
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """serve one client until it disconnects"""
+
+        connection = Connection(writer)
+        try:
+            while not writer.is_closing():
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # a line over MAX_LINE or the client went away
+                    break
+                if not line:
+                    break
+                self.dispatch(connection, line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in list(connection.games):
+                self.leave(connection, game_id)
+            writer.close()
+
+    def dispatch(self, connection: Connection, line: bytes) -> None:
+        """carry out one request and answer it"""
+
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                raise ProtocolError("requests are one JSON object per line") from error
+            if not isinstance(request, dict):
+                raise ProtocolError("requests are one JSON object per line")
+            request_id = request.get("id")
+
+            operation = request.get("op")
+            # a list or object is not hashable, so only strings are looked up
+            handler = None
+            if isinstance(operation, str):
+                handler = self.handlers.get(operation)
+            if handler is None:
+                raise ProtocolError(f"unknown op {operation!r}")
+            reply = handler(self, connection, request)
+        except ProtocolError as error:
+            connection.send(
+                encode({"op": "error", "id": request_id, "message": str(error)})
+            )
+            return
+
+        connection.send(encode({"op": "ack", "id": request_id, **reply}))
+
+    def session(self, request: dict) -> Session:
+        """the session named by a request"""
+
+        game_id = request.get("game")
+        if type(game_id) is not int:  # no bools, and lists are not hashable
+            raise ProtocolError(f"bad game id {game_id!r}")
+        session = self.sessions.get(game_id)
+        if session is None:
+            raise ProtocolError(f"no game {request.get('game')!r}")
+        return session
+
+    def new_game(self, connection: Connection, request: dict) -> dict:
+        """start a game with connection as X"""
+
+        if len(self.sessions) >= self.max_games:
+            raise ProtocolError("too many games")
+        session = Session(next(self.game_ids))
+        self.sessions[session.game_id] = session
+        role = session.join(connection, PLAYERS[0])
+        return {"role": role, **session.snapshot()}
+
+    def join(self, connection: Connection, request: dict) -> dict:
+        """sit connection in a game"""
+
+        session = self.session(request)
+        if session.game_id in connection.games:
+            raise ProtocolError("already in this game")
+        role = session.join(connection, request.get("role"))
+        return {"role": role, **session.snapshot()}
+
+    def move(self, connection: Connection, request: dict) -> dict:
+        """play a move and send its delta to the whole game"""
+
+        session = self.session(request)
+        delta = session.play(connection, request.get("move"))
+        self.moves += 1
+
+        data = encode(delta)
+        for member in session.members():
+            member.send(data)
+        return {"game": session.game_id, "ply": delta["ply"]}
+
+    def leave(self, connection: Connection, game_id: int) -> None:
+        """take connection out of a game, the game ends when nobody is left"""
+
+        session = self.sessions.get(game_id)
+        if session is None:
+            return
+        session.leave(connection)
+        if session.is_empty():
+            del self.sessions[game_id]
+
+    def leave_request(self, connection: Connection, request: dict) -> dict:
+        """leave the game named by a request"""
+
+        session = self.session(request)
+        self.leave(connection, session.game_id)
+        return {"game": session.game_id}
+
+    handlers = {
+        "new": new_game,
+        "join": join,
+        "move": move,
+        "leave": leave_request,
+    }
+
+
+async def serve(host: str, port: int, max_games: int) -> None:
+    """run a server until it is interrupted"""
+
+    game_server = GameServer(max_games)
+    server = await game_server.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"serving on {address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="host many games over TCP")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--max-games", type=int, default=10000, help="games held at once"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_games))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
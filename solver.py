@@ -0,0 +1,449 @@
+"""
+exact endgame solver using depth-first proof-number search (df-pn)
+
+a proof-number search proves or disproves one yes or no question, here
+"can attacker force a win". the result of a position for the player to
+move takes at most two of them: if they can force a win it is a win, if
+the other player can force a win it is a loss, otherwise it is a draw.
+
+df-pn keeps a proof number and a disproof number for every position it
+has seen in a node table, keyed by Zobrist hash and attacker. it stores
+them as phi and delta, the numbers from the point of view of the player
+to move, so the same code serves both sides: a position's phi is the
+smallest delta of its children and its delta is the sum of their phis. a
+position is solved once one of them reaches 0. children are made with
+FrozenPosition.play, so nothing is copied or undone.
+
+the node table holds at most --megabytes worth of entries. when it is
+full the unsolved entries that took the least work to find are thrown
+away first, since they are the cheapest to find again.
+
+solved entries that took at least CACHE_MIN_WORK nodes can be kept in a
+cache file, which is loaded into the table before the next search and
+appended to after it, so a later run starts from everything proven
+before. with each solved entry the table keeps how many moves the proof
+takes to reach the end of the game, so a win is reported as a forced win
+in N moves. the proof df-pn finds first is not always the quickest, so
+the winner can always win within N moves but sometimes sooner.
+
+usage: python solver.py [--moves M] [--seed S] [--megabytes MB] [--cache FILE]
+plays M random moves and solves the position they reach
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import struct
+import time
+from typing import NamedTuple
+
+from bitboard import CELLS, PLAYERS, Position
+from frozen import FrozenPosition
+
+# larger than any proof or disproof number a search can reach
+INFINITY = 1 << 40
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+RESULT_NAMES = {WIN: "win", DRAW: "draw", LOSS: "loss"}
+
+# rough size of one table entry, a dict slot and a tuple of small ints in CPython
+ENTRY_BYTES = 160
+# fraction of the table kept when it is garbage collected
+GC_KEEP = 0.75
+
+CACHE_MAGIC = b"TTTS"
+CACHE_VERSION = 1
+# hash, attacker, proven, moves to the end of the proof
+CACHE_ENTRY = struct.Struct("<QBBH")
+# solved entries that took fewer nodes than this are not worth writing
+CACHE_MIN_WORK = 64
+
+
+class Solution(NamedTuple):
+    """the exact result of a position for the player to move"""
+
+    result: int
+    # moves from the position to the end of the game along the proof, the
+    # winner's moves and the loser's longest defence against them
+    plies: int
+    # a move that keeps the result, None if the game is already over or
+    # the node limit ran out before one was found
+    move: tuple[int, int] | None
+
+    def describe(self, player: int) -> str:
+        """say what the result means for player, the player to move"""
+
+        if self.result == DRAW:
+            return "drawn" if self.plies == 0 else "drawn with best play"
+        winner = player if self.result == WIN else player ^ 1
+        if self.plies == 0:
+            return f"{PLAYERS[winner]} has won"
+        moves = (self.plies + 1) // 2 if self.result == WIN else self.plies // 2
+        return f"{PLAYERS[winner]} has a forced win in {max(moves, 1)}"
+
+
+class DfpnSolver:
+    """df-pn search with a bounded node table and an optional cache file"""
+
+    # key -> (phi, delta, plies, work), key is hash * 2 + attacker
+    table: dict[int, tuple[int, int, int, int]]
+    capacity: int
+    cache_path: str | None
+    # keys loaded from or already written to the cache file
+    cached: set[int]
+
+    # counters of the last solve
+    nodes: int
+    collections: int
+    seconds: float
+
+    def __init__(self, megabytes: float = 64, cache_path=None) -> None:
+
+        self.table = {}
+        self.capacity = max(1024, int(megabytes * 2**20 / ENTRY_BYTES))
+        self.cache_path = cache_path
+        self.cached = set()
+        self.nodes = 0
+        self.collections = 0
+        self.seconds = 0.0
+        self.node_limit = None
+        if cache_path is not None and os.path.exists(cache_path):
+            self.load_cache()
+
+    # the cache file
+    def load_cache(self) -> None:
+        """put every entry of the cache file into the table"""
+
+        with open(self.cache_path, "rb") as file:
+            header = file.read(len(CACHE_MAGIC) + 1)
+            if header != CACHE_MAGIC + bytes([CACHE_VERSION]):
+                raise ValueError(f"{self.cache_path} is not a solver cache")
+            data = file.read()
+
+        # a run killed while appending can leave half an entry at the end
+        usable = len(data) - len(data) % CACHE_ENTRY.size
+        for key, attacker, proven, plies in CACHE_ENTRY.iter_unpack(data[:usable]):
+            key = key * 2 + attacker
+            # loaded entries are never the first to be collected
+            self.table[key] = self.solved_entry(proven, plies, INFINITY)
+            self.cached.add(key)
+
+    @staticmethod
+    def solved_entry(proven_for_mover: bool, plies: int, work: int) -> tuple:
+        """the table entry of a position solved one way or the other"""
+
+        if proven_for_mover:
+            return (0, INFINITY, plies, work)
+        return (INFINITY, 0, plies, work)
+
+    def save_cache(self) -> int:
+        """append the solved entries worth keeping, return how many were written"""
+
+        if self.cache_path is None:
+            return 0
+
+        entries = []
+        for key, (phi, delta, plies, work) in self.table.items():
+            if key in self.cached or work < CACHE_MIN_WORK or (phi and delta):
+                continue
+            # proven is whether the player to move reaches the goal, like phi == 0
+            entries.append(CACHE_ENTRY.pack(key >> 1, key & 1, phi == 0, plies))
+            self.cached.add(key)
+
+        new_file = not os.path.exists(self.cache_path)
+        with open(self.cache_path, "ab") as file:
+            if new_file:
+                file.write(CACHE_MAGIC + bytes([CACHE_VERSION]))
+            file.write(b"".join(entries))
+        return len(entries)
+
+    # the node table
+    @property
+    def occupancy(self) -> float:
+        """fraction of the table's capacity in use"""
+        return len(self.table) / self.capacity
+
+    def collect(self) -> None:
+        """drop the entries that were cheapest to find until the table has room"""
+
+        self.collections += 1
+        keep = int(self.capacity * GC_KEEP)
+        # unsolved entries go first, then solved ones, cheapest first
+        ranked = sorted(
+            self.table.items(),
+            key=lambda item: (item[1][0] == 0 or item[1][1] == 0, item[1][3]),
+        )
+        for key, _ in ranked[: len(self.table) - keep]:
+            del self.table[key]
+
+    # the search
+    def terminal(self, position: FrozenPosition, attacker: int) -> tuple:
+        """phi and delta of a finished game for the player to move"""
+
+        # the player to move attacks if they are the attacker, otherwise defends
+        attacker_won = position.winner == attacker
+        return self.solved_entry(attacker_won == (position.player == attacker), 0, 0)
+
+    def mid(
+        self, position: FrozenPosition, attacker: int, phi_limit: int, delta_limit: int
+    ) -> tuple:
+        """
+        search below position until its phi or delta reaches its limit,
+        return and store its new table entry
+        """
+
+        self.nodes += 1
+        key = position.hash * 2 + attacker
+        # work counts the nodes of every visit, not just this one
+        start = self.nodes - self.table.get(key, (0, 0, 0, 0))[3]
+
+        # (child, key, entry used when the table has none)
+        children = []
+        for move in position.legal_moves():
+            child = position.play(*move)
+            unknown = self.terminal(child, attacker) if child.is_over() else (1, 1)
+            children.append((child, child.hash * 2 + attacker, unknown))
+
+        table = self.table
+        while True:
+            # phi is the smallest child delta, delta the sum of the child phis
+            delta = 0
+            best = None
+            best_delta = second_delta = INFINITY
+            for entry in children:
+                values = table.get(entry[1], entry[2])
+                delta = min(delta + values[0], INFINITY)
+                if values[1] < best_delta:
+                    second_delta = best_delta
+                    best, best_delta = entry, values[1]
+                elif values[1] < second_delta:
+                    second_delta = values[1]
+            phi = best_delta
+
+            solved = phi == 0 or delta == 0
+            if (
+                solved
+                or phi >= phi_limit
+                or delta >= delta_limit
+                or (self.node_limit is not None and self.nodes >= self.node_limit)
+            ):
+                plies = self.proof_plies(children, phi == 0) if solved else 0
+                values = (phi, delta, plies, self.nodes - start + 1)
+                table[key] = values
+                if len(table) > self.capacity:
+                    self.collect()
+                return values
+
+            child, child_key, unknown = best
+            child_phi = table.get(child_key, unknown)[0]
+            self.mid(
+                child,
+                attacker,
+                # the child's phi counts towards this position's delta
+                min(delta_limit - delta + child_phi, INFINITY),
+                min(phi_limit, second_delta + 1),
+            )
+
+    def proof_plies(self, children: list, proven: bool) -> int:
+        """
+        moves to the end of the game along the proof, the quickest win when
+        the player to move succeeded, the longest defence when they failed
+        """
+
+        lengths = []
+        for child, child_key, unknown in children:
+            values = self.table.get(child_key)
+            if values is None and child.is_over():
+                values = unknown
+            if values is None:
+                continue
+            if proven and values[1] == 0:
+                lengths.append(values[2])
+            elif not proven and values[0] == 0:
+                lengths.append(values[2])
+        if not lengths:
+            return 1
+        return 1 + (min(lengths) if proven else max(lengths))
+
+    def prove(self, position: FrozenPosition, attacker: int) -> bool | None:
+        """
+        return True if attacker can force a win from position, False if
+        they cannot, None if the node limit ran out first
+        """
+
+        if position.is_over():
+            return position.winner == attacker
+
+        key = position.hash * 2 + attacker
+        values = self.table.get(key)
+        while values is None or (values[0] and values[1]):
+            if self.node_limit is not None and self.nodes >= self.node_limit:
+                return None
+            values = self.mid(position, attacker, INFINITY - 1, INFINITY - 1)
+        # phi is 0 when the player to move reached their goal
+        return (values[0] == 0) == (position.player == attacker)
+
+    def best_move(self, position: FrozenPosition, attacker: int, proven: bool):
+        """
+        the move that leads to the quickest end of a solved search, proven
+        is whether the player to move reached their goal
+        """
+
+        best = None
+        best_plies = None
+        # look in the table first, only search the children that are missing,
+        # collected or never searched because the result came from the cache,
+        # when none of the others will do
+        for search in (False, True):
+            for move in position.legal_moves():
+                child = position.play(*move)
+                key = child.hash * 2 + attacker
+                if child.is_over():
+                    values = self.terminal(child, attacker)
+                else:
+                    if search and key not in self.table:
+                        self.prove(child, attacker)
+                    values = self.table.get(key)
+                    if values is None:
+                        continue
+                # the child's player to move fails exactly when the move keeps the result
+                if proven and values[1] != 0:
+                    continue
+                if not proven and values[0] != 0:
+                    continue
+                if best_plies is None or (values[2] < best_plies) == proven:
+                    best, best_plies = move, values[2]
+            if best is not None:
+                break
+        return best
+
+    def solve(self, position, node_limit: int | None = None) -> Solution | None:
+        """
+        solve position, a Position, FrozenPosition or GameState, for the
+        player to move, return None if node_limit nodes were not enough
+        """
+
+        if hasattr(position, "position"):
+            position = position.position
+        if isinstance(position, Position):
+            position = FrozenPosition.from_position(position)
+
+        self.nodes = 0
+        self.collections = 0
+        self.node_limit = node_limit
+        start = time.perf_counter()
+        try:
+            solution = self._solve(position)
+        finally:
+            self.seconds = time.perf_counter() - start
+        # saving scans the whole table, so a search run a slice of nodes at a
+        # time only saves once it is solved, callers that give up call save_cache
+        if solution is not None:
+            self.save_cache()
+        return solution
+
+    def close(self) -> None:
+        """save anything solved since the last save, call when done with the solver"""
+        self.save_cache()
+
+    def _solve(self, position: FrozenPosition) -> Solution | None:
+        """solve without resetting the counters"""
+
+        player = position.player
+        if position.is_over():
+            if position.winner is None:
+                return Solution(DRAW, 0, None)
+            return Solution(WIN if position.winner == player else LOSS, 0, None)
+
+        wins = self.prove(position, player)
+        if wins is None:
+            return None
+        if wins:
+            plies = self.table[position.hash * 2 + player][2]
+            return Solution(WIN, plies, self.best_move(position, player, True))
+
+        loses = self.prove(position, player ^ 1)
+        if loses is None:
+            return None
+        key = position.hash * 2 + (player ^ 1)
+        if loses:
+            return Solution(
+                LOSS, self.table[key][2], self.best_move(position, player ^ 1, False)
+            )
+        # the other player cannot force a win, so any move that keeps that is a draw
+        return Solution(
+            DRAW, self.table[key][2], self.best_move(position, player ^ 1, True)
+        )
+
+    def report(self) -> str:
+        """describe the last solve"""
+
+        return (
+            f"df-pn: {self.nodes:,} nodes in {self.seconds:.2f}s "
+            f"({self.nodes / max(self.seconds, 1e-9):,.0f} nodes/s), "
+            f"table {len(self.table):,}/{self.capacity:,} "
+            f"({self.occupancy:.1%}), {self.collections} collections"
+        )
+
+
+def empty_cells(position) -> int:
+    """the number of cells nobody has played in yet"""
+    return CELLS * CELLS - bin(position.cells[0] | position.cells[1]).count("1")
+
+
+def late_position(moves: int, seed: int) -> FrozenPosition:
+    """the position after up to moves random moves"""
+
+    rng = random.Random(seed)
+    position = Position()
+    for _ in range(moves):
+        if position.is_over():
+            break
+        position.apply_move(rng.choice(position.legal_moves()))
+    return FrozenPosition.from_position(position)
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="solve a position exactly")
+    parser.add_argument(
+        "--moves", type=int, default=50, help="random moves played before solving"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--positions", type=int, default=1, help="solve this many, seeds counting up"
+    )
+    parser.add_argument(
+        "--megabytes", type=float, default=64, help="memory for the node table"
+    )
+    parser.add_argument("--cache", help="file of solved positions to load and extend")
+    parser.add_argument(
+        "--nodes", type=int, help="give up on a position after this many nodes"
+    )
+    args = parser.parse_args()
+
+    solver = DfpnSolver(args.megabytes, args.cache)
+    for seed in range(args.seed, args.seed + args.positions):
+        position = late_position(args.moves, seed)
+        empty = empty_cells(position)
+        solution = solver.solve(position, args.nodes)
+        if solution is None:
+            solver.save_cache()
+            print(f"seed {seed}: {empty} empty cells, not solved")
+        else:
+            print(
+                f"seed {seed}: {empty} empty cells, {PLAYERS[position.player]} to move, "
+                f"{RESULT_NAMES[solution.result]}, "
+                f"{solution.describe(position.player)}, play {solution.move}"
+            )
+        print(f"  {solver.report()}")
+    solver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+the 8 symmetries of the board and canonical positions
+
+a symmetry of the square (4 rotations and 4 reflections) is applied to
+the top board and to every subboard at once: the cell at cell index c of
+subboard s moves to cell PERMUTATIONS[t][c] of subboard PERMUTATIONS[t][s].
+the forced subboard moves the same way, so the rules are unchanged.
+
+every transform is a table, PERMUTATIONS for single indexes and
+MASK_PERMUTATIONS for 9 bit masks, so transforming an 81 bit cell mask is
+9 table lookups. the canonical form of a position is the transform with
+the smallest (X cells, O cells, forced) and canonicalize returns which
+transform that was, so a move found for the canonical position can be
+mapped back with transform_move(move, INVERSE[transform]).
+
+positions that are the same up to symmetry share a canonical hash, which
+is the Zobrist hash the canonical position would have.
+
+usage: python symmetry.py [--depth D]
+counts the positions within D plies of the opening with and without symmetry
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from bitboard import (
+    BOARD_SIZE,
+    CELLS,
+    FULL_BOARD,
+    ZOBRIST_CELLS,
+    ZOBRIST_PLAYER,
+    Position,
+    index_to_location,
+    location_to_index,
+    zobrist_forced,
+)
+from frozen import OPENING
+
+LAST = BOARD_SIZE - 1
+
+# where each transform sends (x, y), the first is the identity
+TRANSFORMS = (
+    lambda x, y: (x, y),
+    lambda x, y: (y, LAST - x),
+    lambda x, y: (LAST - x, LAST - y),
+    lambda x, y: (LAST - y, x),
+    lambda x, y: (LAST - x, y),
+    lambda x, y: (x, LAST - y),
+    lambda x, y: (y, x),
+    lambda x, y: (LAST - y, LAST - x),
+)
+IDENTITY = 0
+
+# PERMUTATIONS[t][index] is where transform t sends index
+PERMUTATIONS = tuple(
+    tuple(
+        location_to_index(transform(*index_to_location(index)))
+        for index in range(CELLS)
+    )
+    for transform in TRANSFORMS
+)
+
+# INVERSE[t] is the transform that undoes t
+INVERSE = tuple(
+    next(
+        other
+        for other, undo in enumerate(PERMUTATIONS)
+        if all(undo[permutation[index]] == index for index in range(CELLS))
+    )
+    for permutation in PERMUTATIONS
+)
+
+
+def _permute_mask(permutation: tuple[int, ...], mask: int) -> int:
+    """move every set bit of a 9 bit mask to where permutation sends it"""
+
+    permuted = 0
+    for index in range(CELLS):
+        if mask >> index & 1:
+            permuted |= 1 << permutation[index]
+    return permuted
+
+
+# MASK_PERMUTATIONS[t][mask] is the 9 bit mask transformed by t
+MASK_PERMUTATIONS = tuple(
+    tuple(_permute_mask(permutation, mask) for mask in range(FULL_BOARD + 1))
+    for permutation in PERMUTATIONS
+)
+
+
+def _zobrist_mask(keys: tuple[int, ...], subboard: int, mask: int) -> int:
+    """xor the keys of the cells of subboard set in a 9 bit mask"""
+
+    key = 0
+    for cell in range(CELLS):
+        if mask >> cell & 1:
+            key ^= keys[subboard * CELLS + cell]
+    return key
+
+
+# ZOBRIST_MASKS[player][subboard][mask] is the xor of the keys of those cells
+ZOBRIST_MASKS = tuple(
+    tuple(
+        tuple(_zobrist_mask(keys, subboard, mask) for mask in range(FULL_BOARD + 1))
+        for subboard in range(CELLS)
+    )
+    for keys in ZOBRIST_CELLS
+)
+# forced subboard in the sort key, playing anywhere sorts last
+ANYWHERE = CELLS
+
+# bit offset of each subboard in an 81 bit cell mask, and where each
+# transform moves it to
+SUBBOARD_SHIFTS = tuple(subboard * CELLS for subboard in range(CELLS))
+TRANSFORMED_SHIFTS = tuple(
+    tuple(permutation[subboard] * CELLS for subboard in range(CELLS))
+    for permutation in PERMUTATIONS
+)
+
+
+def split_cells(cells: int) -> list[int]:
+    """split an 81 bit cell mask into the 9 bit mask of each subboard"""
+    return [cells >> shift & FULL_BOARD for shift in SUBBOARD_SHIFTS]
+
+
+def join_cells(masks: list[int], transform: int) -> int:
+    """transform the subboard masks from split_cells and join them again"""
+
+    permuted = MASK_PERMUTATIONS[transform]
+    shifts = TRANSFORMED_SHIFTS[transform]
+    cells = 0
+    for subboard, mask in enumerate(masks):
+        if mask:
+            cells |= permuted[mask] << shifts[subboard]
+    return cells
+
+
+def transform_cells(cells: int, transform: int) -> int:
+    """transform an 81 bit cell mask"""
+
+    return join_cells(split_cells(cells), transform)
+
+
+def transform_forced(forced: int | None, transform: int) -> int | None:
+    """transform the forced subboard, None stays None"""
+    return None if forced is None else PERMUTATIONS[transform][forced]
+
+
+def transform_move(move: tuple[int, int], transform: int) -> tuple[int, int]:
+    """transform a (subboard, cell) move"""
+
+    permutation = PERMUTATIONS[transform]
+    return permutation[move[0]], permutation[move[1]]
+
+
+def cells_hash(cells: tuple[int, int] | list[int], forced, player: int) -> int:
+    """the Zobrist hash of a position with these cells, forced subboard and player"""
+
+    key = zobrist_forced(forced)
+    if player:
+        key ^= ZOBRIST_PLAYER
+    for owner, keys in zip(cells, ZOBRIST_MASKS):
+        for subboard, mask in enumerate(split_cells(owner)):
+            if mask:
+                key ^= keys[subboard][mask]
+    return key
+
+
+def canonical_transform(position: Position) -> tuple[int, tuple]:
+    """
+    return the transform that takes position to its canonical form, and
+    the canonical (X cells, O cells, forced) it gives
+    """
+
+    x_masks = split_cells(position.cells[0])
+    o_masks = split_cells(position.cells[1])
+    forced = position.forced
+
+    # O's cells and the forced subboard only matter between transforms
+    # that give X the same cells, so they are only worked out for those
+    best = None
+    best_transform = IDENTITY
+    for transform in range(len(PERMUTATIONS)):
+        x_cells = join_cells(x_masks, transform)
+        if best is not None and x_cells > best[0]:
+            continue
+        key = (
+            x_cells,
+            join_cells(o_masks, transform),
+            ANYWHERE if forced is None else PERMUTATIONS[transform][forced],
+        )
+        if best is None or key < best:
+            best = key
+            best_transform = transform
+    return best_transform, best
+
+
+def canonical_hash(position: Position) -> tuple[int, int]:
+    """return the hash of the canonical form of position and the transform to it"""
+
+    transform, (x_cells, o_cells, forced) = canonical_transform(position)
+    forced = None if forced == ANYWHERE else forced
+    return cells_hash((x_cells, o_cells), forced, position.player), transform
+
+
+def transform_position(position: Position, transform: int) -> Position:
+    """return a transformed copy of position, without its history"""
+
+    masks = MASK_PERMUTATIONS[transform]
+    transformed = position.copy()
+    transformed.cells = [transform_cells(cells, transform) for cells in position.cells]
+    transformed.boards = [masks[boards] for boards in position.boards]
+    transformed.dead = [masks[dead] for dead in position.dead]
+    transformed.full = masks[position.full]
+    transformed.forced = transform_forced(position.forced, transform)
+    transformed.history = []
+    transformed.hash = cells_hash(
+        transformed.cells, transformed.forced, transformed.player
+    )
+    return transformed
+
+
+def canonicalize(position: Position) -> tuple[Position, int]:
+    """return the canonical form of position and the transform that gives it"""
+
+    transform, _ = canonical_transform(position)
+    return transform_position(position, transform), transform
+
+
+def count_positions(depth: int) -> tuple[int, int]:
+    """count the distinct positions within depth plies, then the canonical ones"""
+
+    seen = set()
+    canonical = set()
+    frontier = [OPENING]
+    for ply in range(depth + 1):
+        next_frontier = []
+        for position in frontier:
+            if position in seen:
+                continue
+            seen.add(position)
+            canonical.add(canonical_hash(position)[0])
+            if ply == depth or position.is_over():
+                continue
+            next_frontier.extend(
+                position.play(*move) for move in position.legal_moves()
+            )
+        frontier = next_frontier
+    return len(seen), len(canonical)
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="count positions up to symmetry")
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+
+    for depth in range(args.depth + 1):
+        positions, canonical = count_positions(depth)
+        print(
+            f"depth {depth}: {positions} positions, {canonical} up to symmetry "
+            f"({positions / canonical:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+tests for the NumPy batch simulator, replaying its games through Position
+
+usage: python -m pytest -q test_batch_sim.py
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from bitboard import CELLS, Position
+
+pytest.importorskip("numpy")
+
+# pylint: disable=wrong-import-position
+from batch_sim import DRAW, O, X, BatchSimulator, simulate
+
+
+def test_games_follow_the_rules():
+    simulator = BatchSimulator(300, seed=0, record_moves=True)
+    stats = simulator.run()
+
+    for game in range(simulator.games):
+        position = Position()
+        length = int(simulator.length[game])
+        for move in simulator.moves[game, :length]:
+            subboard, cell = divmod(int(move), CELLS)
+            assert position.is_legal(subboard, cell)
+            position.apply_move((subboard, cell))
+        assert position.is_over()
+        assert (simulator.moves[game, length:] == -1).all()
+
+        result = simulator.result[game]
+        if position.winner is None:
+            assert result == DRAW
+        else:
+            assert result == (X, O)[position.winner]
+
+    assert stats.games == 300
+    assert stats.x_wins + stats.o_wins + stats.draws == 300
+    assert stats.lengths.sum() == 300
+
+
+def test_batches_add_up():
+    stats = simulate(25, batch=10, seed=1)
+    assert stats.games == 25
+    assert stats.x_wins + stats.o_wins + stats.draws == 25
+    assert "25 games" in stats.report()
+
+
+def test_no_games():
+    stats = simulate(0)
+    assert stats.games == 0
+    assert stats.report().startswith("0 games")
+
+
+def test_batch_must_hold_a_game():
+    with pytest.raises(ValueError):
+        simulate(10, batch=0)
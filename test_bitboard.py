@@ -0,0 +1,196 @@
+"""
+tests for the bitboard rules engine and its move generator
+
+usage: python -m pytest -q test_bitboard.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import (
+    CELLS,
+    DRAWN_TABLE,
+    FULL_BOARD,
+    OPENING_SUBBOARD,
+    WIN_LINES,
+    WON_TABLE,
+    Position,
+    perft,
+)
+from perft import KNOWN_NODES
+
+# the rows, columns and diagonals of a 3x3 board as index lists
+LINES = [
+    [x * 3 + y for x, y in line]
+    for line in (
+        *([(x, y) for y in range(3)] for x in range(3)),
+        *([(x, y) for x in range(3)] for y in range(3)),
+        [(0, 0), (1, 1), (2, 2)],
+        [(0, 2), (1, 1), (2, 0)],
+    )
+]
+
+
+def random_positions(games: int, seed: int = 0):
+    """yield every position, with the move about to be played, of random games"""
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Position()
+        while not position.is_over():
+            move = rng.choice(position.legal_moves())
+            yield position, move
+            position.apply_move(move)
+        yield position, None
+
+
+def state(position: Position) -> tuple:
+    """every field of position but its history, copied"""
+
+    return tuple(
+        list(value) if isinstance(value, list) else value
+        for value in (getattr(position, name) for name in Position.__slots__)
+        if value is not position.history
+    )
+
+
+def decide_boards(x_boards, o_boards) -> Position:
+    """
+    a position where X has won x_boards and O has won o_boards, each by a
+    line through cells 0, 1 and 2 after the loser played cells 3 and 4
+    """
+
+    boards = {**dict.fromkeys(x_boards, 0), **dict.fromkeys(o_boards, 1)}
+    moves = ([], [])
+    for subboard, winner in boards.items():
+        moves[winner ^ 1].extend((subboard, cell) for cell in (3, 4))
+    for subboard, winner in boards.items():
+        moves[winner].extend((subboard, cell) for cell in (0, 1, 2))
+
+    position = Position(forced=None)
+    while moves[position.player]:
+        position.play(*moves[position.player].pop(0))
+    # the side with fewer moves left over passes
+    for move in moves[position.player ^ 1]:
+        position.swap_player()
+        position.play(*move)
+    return position
+
+
+def naive_can_win(free: list[bool]) -> bool:
+    """
+    scan for a line of a 3x3 board a player could still complete,
+    free[i] is True if nothing of the other player's is at i
+    """
+    return any(all(free[i] for i in line) for line in LINES)
+
+
+def rescan(position: Position) -> tuple:
+    """work out dead, full and drawn from the cells and won subboards alone"""
+
+    def owns(player: int, subboard: int, cell: int) -> bool:
+        return bool(position.cells[player] >> (subboard * CELLS + cell) & 1)
+
+    dead = [0, 0]
+    full = 0
+    for subboard in range(CELLS):
+        for player in (0, 1):
+            free = [not owns(player ^ 1, subboard, cell) for cell in range(CELLS)]
+            if not naive_can_win(free):
+                dead[player] |= 1 << subboard
+        if all(
+            owns(0, subboard, cell) or owns(1, subboard, cell) for cell in range(CELLS)
+        ):
+            full |= 1 << subboard
+
+    def winnable(player: int, subboard: int) -> bool:
+        return not (
+            position.boards[player ^ 1] >> subboard & 1 or dead[player] >> subboard & 1
+        )
+
+    drawn = position.winner is None and not any(
+        naive_can_win([winnable(player, subboard) for subboard in range(CELLS)])
+        for player in (0, 1)
+    )
+    return dead, full, drawn
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3, 4])
+def test_perft(depth):
+    assert perft(Position(), depth) == KNOWN_NODES[depth]
+
+
+def test_opening_is_forced():
+    assert Position().legal_moves() == [(OPENING_SUBBOARD, cell) for cell in range(9)]
+
+
+def test_out_of_range_moves_are_illegal():
+    position = Position(forced=None)
+    for move in [(8, 9), (9, 0), (-1, 0), (0, -1)]:
+        assert not position.is_legal(*move)
+
+
+def test_legal_moves_match_is_legal():
+    for position, _ in random_positions(50):
+        every_move = [
+            (subboard, cell) for subboard in range(CELLS) for cell in range(CELLS)
+        ]
+        legal = [move for move in every_move if position.is_legal(*move)]
+        assert position.legal_moves() == legal
+
+
+def test_undo_restores_the_position():
+    for position, move in random_positions(20, seed=1):
+        if move is None:
+            continue
+        before = state(position)
+        position.apply_move(move)
+        assert position.undo_move() == move
+        assert state(position) == before
+
+
+def test_win_lines():
+    assert sorted(WIN_LINES) == sorted(
+        sum(1 << index for index in line) for line in LINES
+    )
+
+
+def test_tables_match_a_scan():
+    for mask in range(FULL_BOARD + 1):
+        owned = [mask >> index & 1 for index in range(CELLS)]
+        assert WON_TABLE[mask] == any(all(owned[i] for i in line) for line in LINES)
+        # mask is the blocked cells, drawn once every line has one
+        assert DRAWN_TABLE[mask] == all(any(owned[i] for i in line) for line in LINES)
+
+
+def test_won_top_board():
+    position = decide_boards([0, 1, 2], [3, 4])
+    assert position.winner == 0
+    assert position.top_owner() == "X"
+    assert not position.drawn
+    assert position.legal_moves() == []
+
+
+def test_drawn_top_board():
+    # X O X / X O O / O X X has no line for either player
+    position = decide_boards([0, 2, 3, 7, 8], [1, 4, 5, 6])
+    assert position.winner is None
+    assert position.drawn
+    assert position.is_over()
+    assert position.legal_moves() == []
+
+
+def test_early_draw():
+    # X O X / O . X / O X O is drawn while the centre can still be played
+    position = decide_boards([0, 2, 5, 7], [1, 3, 6, 8])
+    assert position.drawn
+    assert position.legal_moves() == []
+    assert not position.full >> 4 & 1
+
+
+def test_draws_match_a_rescan():
+    for position, _ in random_positions(200, seed=2):
+        assert rescan(position) == (position.dead, position.full, position.drawn)
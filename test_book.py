@@ -0,0 +1,126 @@
+"""
+tests for the memory-mapped opening book, a move looked up from any
+symmetric copy of a position must lead to the position the book stored
+
+usage: python -m pytest -q test_book.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import Position
+from book import (
+    BOOK_ENTRY,
+    BOOK_HEADER,
+    MAGIC,
+    VERSION,
+    BookEntry,
+    OpeningBook,
+    analyse_position,
+    book_positions,
+    write_book,
+)
+from symmetry import PERMUTATIONS, canonical_hash, canonicalize, transform_position
+
+
+def after(position: Position, move: tuple[int, int]) -> int:
+    """the canonical hash of the position move leads to"""
+
+    child = position.copy()
+    child.apply_move(move)
+    return canonical_hash(child)[0]
+
+
+def random_book(path, positions: list[Position], seed: int) -> dict[int, int]:
+    """
+    write a book with a random move for each position, return the
+    canonical hash each book move leads to, keyed by the book's keys
+    """
+
+    rng = random.Random(seed)
+    entries = {}
+    children = {}
+    for visits, position in enumerate(positions, 1):
+        canonical, _ = canonicalize(position)
+        key, _ = canonical_hash(position)
+        move = rng.choice(canonical.legal_moves())
+        entries[key] = BookEntry(move, visits, visits / 2)
+        children[key] = after(canonical, move)
+    write_book(path, entries)
+    return children
+
+
+def test_lookup_from_every_symmetry(tmp_path):
+    path = tmp_path / "book.bin"
+    positions = book_positions(2)
+    children = random_book(path, positions, 0)
+
+    with OpeningBook(path) as book:
+        assert len(book) == len(positions)
+        for position in positions:
+            key, _ = canonical_hash(position)
+            for transform in range(len(PERMUTATIONS)):
+                copy = transform_position(position, transform)
+                entry = book.lookup(copy)
+                assert copy.is_legal(*entry.move)
+                assert after(copy, entry.move) == children[key]
+
+
+def test_positions_are_distinct_up_to_symmetry():
+    positions = book_positions(2)
+    keys = {canonical_hash(position)[0] for position in positions}
+    assert len(keys) == len(positions)
+    assert all(not position.is_over() for position in positions)
+    assert len(book_positions(0)) == 1
+
+
+def test_missing_positions(tmp_path):
+    path = tmp_path / "book.bin"
+    shallow = book_positions(1)
+    random_book(path, shallow, 1)
+    keys = {canonical_hash(position)[0] for position in shallow}
+    deeper = [
+        position
+        for position in book_positions(2)
+        if canonical_hash(position)[0] not in keys
+    ]
+    assert deeper
+    with OpeningBook(path) as book:
+        assert all(book.lookup(position) is None for position in deeper)
+
+
+def test_analysed_moves_are_legal():
+    position = book_positions(0)[0]
+    key, entry = analyse_position((position, 50, 0))
+    canonical, _ = canonicalize(position)
+    assert key == canonical_hash(position)[0]
+    assert canonical.is_legal(*entry.move)
+    assert 0 <= entry.score <= 1
+
+
+def test_entries_round_trip(tmp_path):
+    path = tmp_path / "book.bin"
+    write_book(path, {7: BookEntry((4, 8), 100, 62.5), 3: BookEntry((0, 0), 1, 0)})
+    with OpeningBook(path) as book:
+        assert book.find(7) == BookEntry((4, 8), 100, 62.5)
+        assert book.find(3) == BookEntry((0, 0), 1, 0)
+        assert book.find(5) is None
+        assert book.find(2**64 - 1) is None
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        BOOK_HEADER.pack(b"XXXX", VERSION, 0),
+        BOOK_HEADER.pack(MAGIC, VERSION + 1, 0),
+        BOOK_HEADER.pack(MAGIC, VERSION, 2) + bytes(BOOK_ENTRY.size),
+    ],
+)
+def test_bad_files(tmp_path, data):
+    path = tmp_path / "book.bin"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        OpeningBook(path)
@@ -0,0 +1,47 @@
+"""
+tests for the retained-mode Tk canvas renderer, skipped without a display
+
+usage: python -m pytest -q test_canvas.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from tick_tac_tick_tac_toe import GameState
+
+tkinter = pytest.importorskip("tkinter")
+
+# a shade, 81 heatmap squares, 40 grid lines and an X and an O for each of
+# the 81 cells, 9 subboards and the top board
+ITEMS = 1 + 81 + 4 + 9 * 4 + 2 * (81 + 9 + 1)
+
+
+@pytest.fixture
+def canvas_game():
+    """a GameState drawn on a canvas window"""
+
+    try:
+        game_state = GameState(renderer="canvas")
+    except tkinter.TclError as error:
+        pytest.skip(f"no display: {error}")
+    yield game_state
+    game_state.window.root.destroy()
+
+
+def test_items_are_created_once(canvas_game):
+    window = canvas_game.window
+    assert window.item_count() == ITEMS
+
+    rng = random.Random(0)
+    while True:
+        canvas_game.scheduler.finish()
+        if canvas_game.position.is_over():
+            break
+        canvas_game.apply_move(rng.choice(canvas_game.position.legal_moves()))
+        assert window.item_count() == ITEMS
+
+    window.draw_all()
+    assert window.item_count() == ITEMS
@@ -0,0 +1,128 @@
+"""
+tests for the training-data export, the planes made for a whole batch at
+once must match encoding each position cell by cell
+
+usage: python -m pytest -q test_dataset.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import CELLS, Position
+from records import DRAWN, UNFINISHED, GameRecord, RecordWriter
+from symmetry import canonicalize, transform_move
+
+np = pytest.importorskip("numpy")
+
+# pylint: disable=wrong-import-position
+from dataset import PLANES, SIDE, Batch, game_examples, load_shard, write_shards
+
+
+def square(move: tuple[int, int]) -> tuple[int, int]:
+    """the (x, y) of a move on the whole 9x9 grid"""
+
+    board_x, board_y = divmod(move[0], 3)
+    cell_x, cell_y = divmod(move[1], 3)
+    return board_x * 3 + cell_x, board_y * 3 + cell_y
+
+
+def naive_planes(position: Position) -> np.ndarray:
+    """encode position one cell at a time with the read only rules"""
+
+    planes = np.zeros((len(PLANES), SIDE, SIDE), np.uint8)
+    legal = set(position.legal_moves())
+    for subboard in range(CELLS):
+        for cell in range(CELLS):
+            x, y = square((subboard, cell))  # pylint: disable=invalid-name
+            owner = position.cell_owner(subboard, cell)
+            planes[:, x, y] = (
+                owner == "X",
+                owner == "O",
+                position.boards[0] >> subboard & 1,
+                position.boards[1] >> subboard & 1,
+                (subboard, cell) in legal,
+                position.player,
+            )
+    return planes
+
+
+def random_records(games: int, seed: int = 0) -> list[GameRecord]:
+    """records of random games, every third one stopped before its end"""
+
+    rng = random.Random(seed)
+    records = []
+    for game in range(games):
+        position = Position()
+        while not position.is_over() and (game % 3 or len(position.history) < 20):
+            position.apply_move(rng.choice(position.legal_moves()))
+        records.append(GameRecord.from_position(position))
+    return records
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_planes_match_a_naive_encoding(canonical):
+    expected = []
+    batch = Batch(97)
+    got = []
+    for record in random_records(30):
+        for position, outcome, visits in game_examples(record):
+            (move,) = visits
+            copy = position.copy()
+            if canonical:
+                copy, transform = canonicalize(copy)
+                move = transform_move(move, transform)
+            expected.append((naive_planes(copy), outcome, square(move)))
+
+            batch.add(position, outcome, visits, canonical)
+            if batch.is_full():
+                got.extend(zip(*[array.copy() for array in batch.finish()]))
+                batch.clear()
+    got.extend(zip(*[array.copy() for array in batch.finish()]))
+
+    assert len(got) == len(expected) > 97
+    for (planes, outcome, visits), (naive, naive_outcome, move) in zip(got, expected):
+        assert (planes == naive).all()
+        assert outcome == naive_outcome
+        assert visits.sum() == 1
+        assert visits[move] == 1
+
+
+def test_outcomes_follow_the_result():
+    for record in random_records(30):
+        examples = [
+            (position.player, outcome) for position, outcome, _ in game_examples(record)
+        ]
+        if record.result == UNFINISHED:
+            assert examples == []
+        elif record.result == DRAWN:
+            assert {outcome for _, outcome in examples} == {0}
+        else:
+            for player, outcome in examples:
+                assert outcome == (1 if player == record.result else -1)
+
+
+def test_shards_round_trip(tmp_path):
+    path = tmp_path / "games.ttr"
+    records = random_records(12, seed=2)
+    with RecordWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    examples = sum(len(list(game_examples(record))) for record in records)
+
+    stats = write_shards(path, tmp_path / "shards", 50)
+    assert stats["examples"] == examples
+    assert stats["shards"] == -(-examples // 50)
+
+    loaded = [
+        load_shard(tmp_path / "shards", number) for number in range(stats["shards"])
+    ]
+    planes = np.concatenate([shard[0] for shard in loaded])
+    outcomes = np.concatenate([shard[1] for shard in loaded])
+    visits = np.concatenate([shard[2] for shard in loaded])
+    assert planes.shape == (examples, len(PLANES), SIDE, SIDE)
+    assert outcomes.shape == (examples,)
+    assert (visits.sum(axis=(1, 2)) == 1).all()
+    assert isinstance(loaded[0][0], np.memmap)
@@ -0,0 +1,72 @@
+"""
+tests for immutable positions, a frozen game must stay equal to the same
+game played on a Position
+
+usage: python -m pytest -q test_frozen.py
+"""
+
+from __future__ import annotations
+
+import random
+
+from bitboard import CELLS, Position
+from frozen import OPENING, FrozenPosition
+
+
+def random_games(games: int, seed: int = 0):
+    """yield every position of random games, with the move about to be played"""
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Position()
+        while not position.is_over():
+            move = rng.choice(position.legal_moves())
+            yield position, move
+            position.apply_move(move)
+        yield position, None
+
+
+def test_play_matches_position():
+    frozen = OPENING
+    for position, move in random_games(100):
+        if not position.history:
+            frozen = OPENING
+        assert frozen == FrozenPosition.from_position(position)
+        assert frozen.legal_moves() == position.legal_moves()
+        assert frozen.is_over() == position.is_over()
+        assert frozen.thaw().legal_moves() == position.legal_moves()
+        if move is not None:
+            frozen = frozen.play(*move)
+
+
+def test_read_only_rules_match_position():
+    for position, _ in random_games(10, seed=1):
+        frozen = FrozenPosition.from_position(position)
+        assert frozen.top_owner() == position.top_owner()
+        for subboard in range(CELLS):
+            assert frozen.board_owner(subboard) == position.board_owner(subboard)
+            for cell in range(CELLS):
+                assert frozen.is_legal(subboard, cell) == position.is_legal(
+                    subboard, cell
+                )
+                assert frozen.cell_owner(subboard, cell) == position.cell_owner(
+                    subboard, cell
+                )
+
+
+def test_branches_share_their_parent():
+    child = OPENING.play(8, 4)
+    other = OPENING.play(8, 0)
+    assert OPENING == FrozenPosition.from_position(Position())
+    assert child != other
+    assert child.cells[1] is OPENING.cells[1]
+    assert {OPENING, child, other, OPENING.play(8, 4)} == {OPENING, child, other}
+
+
+def test_thaw_has_its_own_state():
+    frozen = OPENING.play(8, 4)
+    position = frozen.thaw()
+    position.apply_move((4, 0))
+    assert position.undo_move() == (4, 0)
+    assert FrozenPosition.from_position(position) == frozen
+    assert frozen.thaw().history == []
@@ -0,0 +1,99 @@
+"""
+tests for the headless GameState, which plays every move through the rules
+
+usage: python -m pytest -q test_game_state.py
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from frozen import FrozenPosition
+from tick_tac_tick_tac_toe import GameState
+
+
+def imported_by(module: str) -> set[str]:
+    """the modules a fresh interpreter has loaded after importing module"""
+
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sys.modules)"],
+        capture_output=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        text=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_headless_never_imports_tk():
+    modules = imported_by("tick_tac_tick_tac_toe")
+    assert not modules & {"turtle", "tkinter", "_tkinter"}
+
+    game_state = GameState(headless=True)
+    game_state.apply_move((8, 4))
+    assert game_state.window is None
+
+
+def test_searchers_are_imported_when_used():
+    modules = imported_by("tick_tac_tick_tac_toe")
+    assert not modules & {"alphabeta", "analysis", "book", "mcts", "concurrent.futures"}
+
+
+def test_rejects_illegal_moves():
+    game_state = GameState(headless=True)
+    for move in [(0, 0), (8, 9), (9, 0)]:
+        with pytest.raises(ValueError):
+            game_state.apply_move(move)
+    game_state.apply_move((8, 4))
+    with pytest.raises(ValueError):
+        game_state.apply_move((8, 4))
+    assert len(game_state.position.history) == 1
+
+
+def test_undo_without_moves():
+    game_state = GameState(headless=True)
+    assert game_state.undo_move() is None
+    assert game_state.legal_moves() == game_state.position.legal_moves()
+
+
+def test_undo_and_redo_a_whole_game():
+    game_state = GameState(headless=True)
+    rng = random.Random(0)
+    states = []
+    while not game_state.position.is_over():
+        states.append(FrozenPosition.from_position(game_state.position))
+        game_state.apply_move(rng.choice(game_state.legal_moves()))
+    final = FrozenPosition.from_position(game_state.position)
+    moves = list(game_state.position.history)
+
+    while states:
+        game_state.undo_move()
+        assert FrozenPosition.from_position(game_state.position) == states.pop()
+    assert game_state.undo_move() is None
+    assert game_state.player == "X"
+
+    while game_state.redo_move() is not None:
+        pass
+    assert FrozenPosition.from_position(game_state.position) == final
+    assert game_state.position.history == moves
+    assert game_state.redo_moves == []
+
+
+def test_a_new_move_drops_the_redo_moves():
+    game_state = GameState(headless=True)
+    game_state.apply_move((8, 4))
+    game_state.apply_move((4, 0))
+    game_state.undo_move()
+    game_state.undo_move()
+    assert game_state.redo_moves == [(4, 0), (8, 4)]
+
+    game_state.apply_move((8, 4))
+    assert game_state.redo_moves == [(4, 0)]
+    game_state.apply_move((4, 8))
+    assert game_state.redo_moves == []
+    assert game_state.redo_move() is None
@@ -0,0 +1,100 @@
+"""
+tests for the layout geometry, the arithmetic hit test must agree with
+walking the board tree's hitboxes
+
+usage: python -m pytest -q test_layout.py
+"""
+
+from __future__ import annotations
+
+import random
+
+from bitboard import location_to_index
+from layout import MISS, Hit, Hitbox, divide_hitbox, get_layout, shrink_hitbox
+from tick_tac_tick_tac_toe import (
+    BOARD_OFFSET_FACTOR,
+    BOARD_SIZE,
+    CELL_OFFSET_FACTOR,
+    LAYOUT,
+    OUTER_BOARD_OFFSET_FACTOR,
+    SIZE,
+    GameState,
+)
+
+
+def tree_hit(board, location) -> Hit:
+    """hit test location the slow way, through get_clicked_board"""
+
+    subboard = board.get_clicked_board(location)
+    if subboard is None:
+        return MISS
+    cell = subboard.get_clicked_board(location)
+    return Hit(
+        location_to_index(subboard.location),
+        None if cell is None else location_to_index(cell.location),
+    )
+
+
+def test_hit_test_matches_the_board_tree():
+    board = GameState(headless=True).board
+    rng = random.Random(0)
+    half = SIZE / 2
+    hits = 0
+    for _ in range(20_000):
+        location = (rng.uniform(-half, half), rng.uniform(-half, half))
+        hit = LAYOUT.hit_test(location)
+        assert hit == tree_hit(board, location)
+        hits += hit.is_cell
+    # most clicks land in a cell, the rest in the gutters
+    assert hits > 10_000
+
+
+def test_cell_centers():
+    for subboard, cells in enumerate(LAYOUT.cell_hitboxes):
+        for cell, hitbox in enumerate(cells):
+            center = ((hitbox.w + hitbox.e) / 2, (hitbox.n + hitbox.s) / 2)
+            assert LAYOUT.hit_test(center) == Hit(subboard, cell)
+
+
+def test_outside_the_board():
+    top = LAYOUT.top_hitbox
+    for location in [(top.w - 1, 0), (0, top.n + 1), (SIZE, SIZE), (top.w, top.s)]:
+        assert LAYOUT.hit_test(location) == MISS
+
+
+def test_hitboxes_match_dividing_the_window():
+    half = SIZE / 2
+    window = Hitbox(e=half, w=-half, n=half, s=-half, size=SIZE)
+    top = shrink_hitbox(window, OUTER_BOARD_OFFSET_FACTOR)
+    assert LAYOUT.top_hitbox == top
+
+    board = GameState(headless=True).board
+    assert board.hitbox == top
+    for x in range(BOARD_SIZE):  # pylint: disable=invalid-name
+        for y in range(BOARD_SIZE):  # pylint: disable=invalid-name
+            subboard = board.get_cell(x, y)
+            hitbox = divide_hitbox(top, x, y, BOARD_SIZE, BOARD_OFFSET_FACTOR)
+            assert subboard.hitbox is LAYOUT.subboard_hitboxes[subboard.index]
+            assert subboard.hitbox == hitbox
+            for cell in subboard.get_all_cells():
+                cell_hitbox = divide_hitbox(
+                    hitbox, *cell.location, BOARD_SIZE, CELL_OFFSET_FACTOR
+                )
+                assert cell.hitbox is LAYOUT.cell_hitboxes[subboard.index][cell.index]
+                assert cell.hitbox == cell_hitbox
+
+
+def test_layout_is_computed_once():
+    assert LAYOUT is get_layout(
+        SIZE,
+        BOARD_SIZE,
+        OUTER_BOARD_OFFSET_FACTOR,
+        BOARD_OFFSET_FACTOR,
+        CELL_OFFSET_FACTOR,
+    )
+
+
+def test_cells_have_slots():
+    board = GameState(headless=True).board
+    for cell in [board, board.get_cell(0, 0), board.get_cell(0, 0).get_cell(1, 2)]:
+        assert not hasattr(cell, "__dict__")
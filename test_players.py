@@ -0,0 +1,200 @@
+"""
+tests for the computer players, every policy must return a legal move and
+leave the position it is given alone
+
+usage: python -m pytest -q test_players.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from alphabeta import (
+    WIN_SCORE,
+    AlphaBetaPlayer,
+    AlphaBetaSearcher,
+    TranspositionTable,
+    evaluate,
+)
+from bitboard import Position
+from mcts import MCTSPlayer
+from players import POLICIES, ScriptedPlayer, create_player, load_script
+from records import RecordWriter
+from runner import Tournament, make_tasks, play_game, run
+
+
+def win_in_one() -> Position:
+    """
+    X to move and forced into subboard 2, having won subboards 0 and 1 and
+    holding cells 0 and 1 of subboard 2, so (2, 2) wins the game
+    """
+
+    x_moves = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1)]
+    o_moves = [(3, 0), (3, 1), (4, 0), (4, 1), (5, 0), (5, 1), (6, 3), (6, 2)]
+    position = Position(forced=None)
+    for x_move, o_move in zip(x_moves, o_moves):
+        position.play(*x_move)
+        position.play(*o_move)
+    return position
+
+
+def random_position(plies: int, seed: int = 0) -> Position:
+    """the position after plies random moves"""
+
+    rng = random.Random(seed)
+    position = Position()
+    for _ in range(plies):
+        position.apply_move(rng.choice(position.legal_moves()))
+    return position
+
+
+def test_win_in_one():
+    position = win_in_one()
+    assert position.forced == 2
+    position.play(2, 2)
+    assert position.winner == 0
+
+
+def test_mcts_takes_the_win():
+    player = MCTSPlayer(seconds=None, playouts=500, seed=0)
+    assert player.choose_move(win_in_one()) == (2, 2)
+
+
+@pytest.mark.parametrize("budget", [{"seconds": 0}, {"seconds": None, "playouts": 0}])
+def test_mcts_always_has_a_move(budget):
+    position = random_position(10)
+    moves = position.legal_moves()
+    assert MCTSPlayer(seed=0, **budget).choose_move(position) in moves
+
+
+def test_mcts_reuses_its_tree():
+    player = MCTSPlayer(seconds=None, playouts=300, seed=1)
+    position = random_position(4, seed=1)
+    before = position.copy()
+    move = player.choose_move(position)
+    assert position.cells == before.cells and position.history == before.history
+
+    position.apply_move(move)
+    position.apply_move(position.legal_moves()[0])
+    player.choose_move(position)
+    assert player.reused_visits > 0
+
+
+def test_mcts_refuses_a_finished_game():
+    position = win_in_one()
+    position.play(2, 2)
+    with pytest.raises(ValueError):
+        MCTSPlayer(seconds=None, playouts=10).choose_move(position)
+
+
+def negamax(position: Position, depth: int, ply: int = 0) -> int:
+    """the alpha-beta score without pruning or a table"""
+
+    if position.winner is not None:
+        return ply - WIN_SCORE
+    if position.drawn:
+        return 0
+    if depth <= 0:
+        return evaluate(position)
+    best = -WIN_SCORE - 1
+    for move in position.legal_moves():
+        position.apply_move(move)
+        best = max(best, -negamax(position, depth - 1, ply + 1))
+        position.undo_move()
+    return best
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_alphabeta_matches_negamax(canonical):
+    searcher = AlphaBetaSearcher(megabytes=1, canonical=canonical)
+    for seed in range(6):
+        position = random_position(12 + seed * 7, seed)
+        if position.is_over():
+            continue
+        searcher.search(position, max_depth=3)
+        # the search stops early once it finds a forced result
+        assert searcher.score == negamax(position, searcher.depth)
+
+
+def test_alphabeta_takes_the_win():
+    position = win_in_one()
+    assert AlphaBetaPlayer(seconds=None, max_depth=4).choose_move(position) == (2, 2)
+    assert position.winner is None and position.forced == 2
+
+
+def test_alphabeta_runs_out_of_time():
+    position = random_position(6)
+    move = AlphaBetaPlayer(seconds=0, megabytes=1).choose_move(position)
+    assert move in position.legal_moves()
+
+
+def test_table_keeps_entries():
+    table = TranspositionTable(megabytes=1)
+    table.store(12345, 3, 17, 0, (4, 5))
+    entry = table.probe(12345)
+    assert entry is not None and entry[:5] == (12345, 3, 17, 0, (4, 5))
+    assert table.probe(54321) is None
+
+
+@pytest.mark.parametrize("name", sorted(POLICIES))
+def test_policies_play_legal_moves(name):
+    player = create_player(name, seed=0, playouts=20, depth=1)
+    position = random_position(5)
+    before = position.history[:]
+    assert player.choose_move(position) in position.legal_moves()
+    assert position.history == before
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        create_player("perfect")
+
+
+def test_scripted_players_replay_a_game(tmp_path):
+    game = play_game("random", "random", 7, 0, 0)
+    path = tmp_path / "game.ttr"
+    with RecordWriter(path) as writer:
+        writer.write(game)
+
+    script = load_script(str(path))
+    assert script == game.move_list()
+    replayed = play_game("scripted", "scripted", 8, 0, 0, script)
+    assert replayed.moves == game.moves
+
+
+def test_scripted_player_falls_back():
+    player = ScriptedPlayer(load_script("8:4,0:0"))
+    position = Position()
+    assert player.choose_move(position) == (8, 4)
+    position.apply_move((8, 4))
+    # (0, 0) is outside the forced subboard 4
+    assert player.choose_move(position) == position.legal_moves()[0]
+
+
+@pytest.mark.parametrize("text", ["", "8", "8:4:1", "x:1", "9:0", "8:-1"])
+def test_bad_scripts(text):
+    with pytest.raises(ValueError):
+        load_script(text)
+
+
+def test_results_do_not_depend_on_workers():
+    tasks = make_tasks(["random", "scripted"], 6, 4, 3, 0, 0)
+    one, _ = run(tasks, 1)
+    two, _ = run(tasks, 2)
+    assert one.pairs == two.pairs
+    # two ordered pairings, a policy only plays itself when it is alone
+    assert one.games == 2 * 6
+
+
+def test_tournament_records():
+    tournament = Tournament()
+    tournament.add(("a", "b", 3, 1, 2, 100))
+    tournament.add(("b", "a", 2, 2, 0, 80))
+    assert tournament.games == 10
+    assert tournament.record("a", "b") == (5, 2, 3)
+    assert tournament.record("b", "a") == (3, 2, 5)
+    ratings = tournament.elo(["a", "b"])
+    assert ratings["a"] > ratings["b"]
+    assert sum(ratings.values()) == pytest.approx(2 * 1500)
@@ -0,0 +1,115 @@
+"""
+tests for the binary game record format
+
+usage: python -m pytest -q test_records.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import Position
+from records import (
+    FILE_HEADER,
+    RECORD_HEADER,
+    UNFINISHED,
+    GameRecord,
+    RecordWriter,
+    read_records,
+    replay,
+    replay_position,
+)
+
+
+def random_game(seed: int, plies: int | None = None) -> Position:
+    """a random game, stopped after plies moves if it lasts that long"""
+
+    rng = random.Random(seed)
+    position = Position()
+    while not position.is_over() and len(position.history) != plies:
+        position.apply_move(rng.choice(position.legal_moves()))
+    return position
+
+
+def write_bytes(path, *records: bytes) -> None:
+    """write a record file holding the given encoded records"""
+    path.write_bytes(FILE_HEADER + b"".join(records))
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "games.ttr"
+    records = [
+        GameRecord.from_position(random_game(seed, plies), metadata)
+        for seed, plies, metadata in [
+            (0, None, {"seed": 0, "names": ["x", "o"]}),
+            (1, 10, {}),
+            (2, 0, None),
+            (3, None, None),
+        ]
+    ]
+    with RecordWriter(path) as writer:
+        for record in records[:2]:
+            writer.write(record)
+    # a second writer appends without another file header
+    with RecordWriter(path) as writer:
+        for record in records[2:]:
+            writer.write(record)
+
+    assert list(read_records(path)) == records
+    assert records[1].result == UNFINISHED
+
+
+def test_replay_matches_the_game():
+    position = random_game(4)
+    record = GameRecord.from_position(position)
+
+    replayed = replay_position(record)
+    assert replayed.cells == position.cells
+    assert replayed.winner == position.winner
+    assert replay(record).position.cells == position.cells
+    assert replay_position(record, 5).history == position.history[:5]
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        GameRecord(bytes([81])),
+        GameRecord(bytes(82)),
+        GameRecord(b"", 7),
+        GameRecord(b"", metadata={"text": "x" * 70_000}),
+    ],
+)
+def test_unwritable_records(record):
+    with pytest.raises(ValueError):
+        record.to_bytes()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"TTTR\x02",
+        FILE_HEADER + RECORD_HEADER.pack(0, 2, 0) + b"\x00",
+        FILE_HEADER + RECORD_HEADER.pack(7, 0, 0),
+        # the header is checked before the metadata is decoded
+        FILE_HEADER + RECORD_HEADER.pack(7, 0, 3) + b"{{{",
+        FILE_HEADER + RECORD_HEADER.pack(0, 90, 0) + bytes(90),
+        FILE_HEADER + RECORD_HEADER.pack(0, 0, 3) + b"{{{",
+        FILE_HEADER + RECORD_HEADER.pack(0, 0, 2) + b"[]",
+        FILE_HEADER + RECORD_HEADER.pack(0, 1, 0) + bytes([81]),
+    ],
+)
+def test_corrupt_files(tmp_path, data):
+    path = tmp_path / "corrupt.ttr"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        list(read_records(path))
+
+
+def test_header_errors_come_first(tmp_path):
+    path = tmp_path / "corrupt.ttr"
+    write_bytes(path, RECORD_HEADER.pack(7, 0, 3) + b"{{{")
+    with pytest.raises(ValueError, match="header"):
+        list(read_records(path))
@@ -0,0 +1,121 @@
+"""
+tests for the step scheduler, driven by a fake window whose timers fire
+only when the test says so
+
+usage: python -m pytest -q test_scheduler.py
+"""
+
+from __future__ import annotations
+
+from scheduler import Scheduler
+
+
+class FakeWindow:
+    """records after() calls instead of running a Tk event loop"""
+
+    timers: list
+
+    def __init__(self) -> None:
+        self.timers = []
+
+    def after(self, milliseconds, callback) -> None:
+        """remember a timer, fire() runs it"""
+        self.timers.append((milliseconds, callback))
+
+    def fire(self) -> None:
+        """run the timers set so far, as if their delays had passed"""
+        timers, self.timers = self.timers, []
+        for _, callback in timers:
+            callback()
+
+
+def test_headless_steps_run_straight_away():
+    log = []
+    scheduler = Scheduler()
+    scheduler.after(500, lambda: log.append(1))
+    scheduler.after(0, lambda: log.append(2))
+    assert log == [1, 2]
+    assert not scheduler.busy
+
+
+def test_steps_wait_for_their_timers():
+    log = []
+    window = FakeWindow()
+    scheduler = Scheduler(window)
+    scheduler.after(0, lambda: log.append("move"))
+    scheduler.after(500, lambda: log.append("win"))
+    scheduler.after(0, lambda: log.append("next"))
+    assert log == ["move"]
+    assert scheduler.busy
+    assert [delay for delay, _ in window.timers] == [500]
+
+    window.fire()
+    assert log == ["move", "win", "next"]
+    assert not scheduler.busy
+
+
+def test_then_runs_before_queued_steps():
+    log = []
+    window = FakeWindow()
+    scheduler = Scheduler(window)
+
+    def win():
+        log.append("win")
+        scheduler.then(300, lambda: log.append("redraw"))
+
+    scheduler.after(200, win)
+    scheduler.after(0, lambda: log.append("next"))
+    window.fire()
+    assert log == ["win"]
+    window.fire()
+    assert log == ["win", "redraw", "next"]
+
+
+def test_inputs_are_buffered_in_order():
+    log = []
+    window = FakeWindow()
+    scheduler = Scheduler(window)
+    scheduler.after(500, lambda: log.append("win"))
+    scheduler.after(0, lambda: log.append("next"))
+    assert log == []
+
+    # a click finishes the animation first, then runs in the order it came
+    scheduler.submit(lambda: log.append("click 1"))
+    assert log == ["win", "next", "click 1"]
+    scheduler.submit(lambda: log.append("click 2"))
+    assert log == ["win", "next", "click 1", "click 2"]
+
+    # the timer set before the clicks is stale and does nothing
+    window.fire()
+    assert log == ["win", "next", "click 1", "click 2"]
+
+
+def test_steps_queued_by_an_input_run_after_it():
+    log = []
+    window = FakeWindow()
+    scheduler = Scheduler(window)
+
+    def click(name):
+        log.append(name)
+        scheduler.after(500, lambda: log.append(f"{name} animated"))
+
+    scheduler.submit(lambda: click("a"))
+    scheduler.submit(lambda: click("b"))
+    assert log == ["a", "a animated", "b"]
+    assert scheduler.busy
+
+    window.fire()
+    assert log == ["a", "a animated", "b", "b animated"]
+
+
+def test_finish_runs_every_step():
+    log = []
+    window = FakeWindow()
+    scheduler = Scheduler(window)
+    for step in range(3):
+        scheduler.after(100, lambda step=step: log.append(step))
+    scheduler.finish()
+    assert log == [0, 1, 2]
+    assert not scheduler.busy
+    window.fire()
+    assert log == [0, 1, 2]
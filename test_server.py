@@ -0,0 +1,121 @@
+"""
+tests for the game server and the load-test client
+
+usage: python -m pytest -q test_server.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from loadtest import Client, load_test
+from server import HOST, Connection, GameServer
+
+
+class FakeTransport:
+    """stands in for an asyncio transport with nothing waiting to be sent"""
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+
+class FakeWriter:
+    """collects what the server sends instead of writing to a socket"""
+
+    def __init__(self) -> None:
+        self.transport = FakeTransport()
+        self.messages = []
+
+    def is_closing(self) -> bool:
+        return False
+
+    def write(self, data: bytes) -> None:
+        self.messages.extend(json.loads(line) for line in data.splitlines())
+
+
+def request(server, connection, **message) -> dict:
+    """dispatch message and return the server's answer to it"""
+
+    writer = connection.writer
+    writer.messages.clear()
+    server.dispatch(connection, json.dumps(message).encode())
+    return next(reply for reply in writer.messages if reply["op"] != "delta")
+
+
+def test_server_validates_moves():
+    server = GameServer()
+    x_player = Connection(FakeWriter())
+    o_player = Connection(FakeWriter())
+    game = request(server, x_player, op="new", id=1)["game"]
+    assert request(server, o_player, op="join", game=game)["role"] == "O"
+
+    bad_requests = [
+        (x_player, {"move": [0, 0]}),  # not the forced subboard
+        (x_player, {"move": [8, 9]}),
+        (x_player, {"move": [8]}),
+        (x_player, {"move": [True, 4]}),
+        (x_player, {"move": "8,4"}),
+        (o_player, {"move": [8, 4]}),  # not O's turn
+        (x_player, {"game": [game], "move": [8, 4]}),
+        (x_player, {"game": game + 1, "move": [8, 4]}),
+    ]
+    for connection, fields in bad_requests:
+        reply = request(server, connection, op="move", id=2, **{"game": game, **fields})
+        assert reply["op"] == "error", fields
+    assert server.sessions[game].game_state.position.history == []
+
+    reply = request(server, x_player, op="move", id=3, game=game, move=[8, 4])
+    assert reply == {"op": "ack", "id": 3, "game": game, "ply": 1}
+    delta = o_player.writer.messages[-1]
+    assert delta["op"] == "delta"
+    assert (delta["move"], delta["forced"]) == ([8, 4], 4)
+
+    reply = request(server, x_player, op="move", id=4, game=game, move=[4, 0])
+    assert reply["op"] == "error"
+
+
+def test_server_rejects_malformed_requests():
+    server = GameServer()
+    connection = Connection(FakeWriter())
+    for line in [b"[", b"[]", b'{"op": ["new"]}', b'{"op": "fly"}']:
+        connection.writer.messages.clear()
+        server.dispatch(connection, line)
+        assert connection.writer.messages[-1]["op"] == "error"
+
+
+async def serve(test) -> None:
+    """run test(port) against a server listening on a free port"""
+
+    listener = await GameServer().start(HOST, 0)
+    async with listener:
+        await test(listener.sockets[0].getsockname()[1])
+
+
+def test_load_test_plays_games():
+    async def test(port):
+        stats = await load_test(HOST, port, 2, 2, 1, 0.2)
+        assert stats["games"] >= 4
+        assert stats["spectator_deltas"] > 0
+        assert len(stats["latencies"]) > 0
+
+    asyncio.run(serve(test))
+
+
+def test_load_test_client_fails_on_errors():
+    async def test(port):
+        client = await Client.connect(HOST, port, random.Random(0))
+        game = await client.sit(None, "X")
+        # an error reply ends the client instead of leaving it waiting forever
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(client.request({"op": "fly"}), 5)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(client.finished[game], 5)
+        with pytest.raises(RuntimeError):
+            await client.request({"op": "new"})
+        await client.close()
+
+    asyncio.run(serve(test))
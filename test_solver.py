@@ -0,0 +1,119 @@
+"""
+tests for the df-pn endgame solver, its results must match a plain
+negamax over the few moves left at the end of random games
+
+usage: python -m pytest -q test_solver.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import Position
+from frozen import FrozenPosition
+from solver import CACHE_MAGIC, DRAW, LOSS, WIN, DfpnSolver, late_position
+
+# positions negamax cannot solve within this many nodes are skipped
+NEGAMAX_NODES = 5000
+
+
+class OutOfNodes(Exception):
+    """negamax ran out of nodes"""
+
+
+def negamax(position: FrozenPosition, nodes: list[int]) -> int:
+    """the exact result for the player to move, nodes[0] is the budget left"""
+
+    nodes[0] -= 1
+    if nodes[0] < 0:
+        raise OutOfNodes
+    if position.is_over():
+        if position.winner is None:
+            return DRAW
+        return WIN if position.winner == position.player else LOSS
+    best = LOSS
+    for move in position.legal_moves():
+        best = max(best, -negamax(position.play(*move), nodes))
+        if best == WIN:
+            break
+    return best
+
+
+def endgames(games: int, plies: int, seed: int = 0):
+    """
+    yield the positions plies moves before the end of random games that
+    negamax can solve, with their result
+    """
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Position()
+        frozen = [FrozenPosition.from_position(position)]
+        while not position.is_over():
+            position.apply_move(rng.choice(position.legal_moves()))
+            frozen.append(FrozenPosition.from_position(position))
+        endgame = frozen[max(len(frozen) - 1 - plies, 0)]
+        try:
+            yield endgame, negamax(endgame, [NEGAMAX_NODES])
+        except OutOfNodes:
+            continue
+
+
+@pytest.mark.parametrize("plies", [0, 1, 2, 4, 6])
+def test_results_match_negamax(plies):
+    solver = DfpnSolver(4)
+    solved = 0
+    for position, result in endgames(40, plies, seed=plies):
+        solution = solver.solve(position)
+        assert solution.result == result
+        if position.is_over():
+            assert solution == (result, 0, None)
+            continue
+        assert solution.plies > 0
+        assert position.is_legal(*solution.move)
+        child = position.play(*solution.move)
+        assert -negamax(child, [NEGAMAX_NODES]) == result
+        solved += 1
+    assert solved or plies == 0
+
+
+def test_collection_keeps_results():
+    position = late_position(50, 1)
+    expected = DfpnSolver(64).solve(position)
+    # the smallest table holds 1024 entries, fewer than this search needs
+    solver = DfpnSolver(0)
+    assert solver.solve(position) == expected
+    assert solver.collections > 0
+    assert len(solver.table) <= solver.capacity
+
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / "solver.cache"
+    positions = [late_position(50, seed) for seed in (0, 1, 4)]
+    first = DfpnSolver(16, path)
+    solutions = []
+    work = 0
+    for position in positions:
+        solutions.append(first.solve(position))
+        work += first.nodes
+    assert path.read_bytes().startswith(CACHE_MAGIC)
+
+    # half an entry left by a run killed while appending is ignored
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02")
+    second = DfpnSolver(16, path)
+    assert second.cached
+    for position, solution in zip(positions, solutions):
+        assert second.solve(position).result == solution.result
+        work -= second.nodes
+    # the cached proofs are not searched again
+    assert work > 0
+
+
+def test_not_a_cache(tmp_path):
+    path = tmp_path / "solver.cache"
+    path.write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        DfpnSolver(1, path)
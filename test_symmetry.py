@@ -0,0 +1,110 @@
+"""
+tests for symmetry canonicalization, a transformed position must be the
+position reached by playing the transformed moves
+
+usage: python -m pytest -q test_symmetry.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import Position, index_to_location, location_to_index
+from symmetry import (
+    INVERSE,
+    PERMUTATIONS,
+    TRANSFORMS,
+    canonical_hash,
+    canonicalize,
+    count_positions,
+    transform_move,
+    transform_position,
+)
+
+
+def moved(move: tuple[int, int], transform: int) -> tuple[int, int]:
+    """transform a move through the (x, y) locations of its subboard and cell"""
+
+    return tuple(
+        location_to_index(TRANSFORMS[transform](*index_to_location(index)))
+        for index in move
+    )
+
+
+def random_game(seed: int, forced: int | None) -> list[tuple[int, int]]:
+    """the moves of a random game"""
+
+    rng = random.Random(seed)
+    position = Position(forced)
+    moves = []
+    while not position.is_over():
+        moves.append(rng.choice(position.legal_moves()))
+        position.apply_move(moves[-1])
+    return moves
+
+
+def fields(position: Position) -> tuple:
+    """every field of position but its history"""
+
+    return (
+        position.cells,
+        position.boards,
+        position.dead,
+        position.full,
+        position.forced,
+        position.player,
+        position.winner,
+        position.drawn,
+        position.hash,
+    )
+
+
+@pytest.mark.parametrize("forced", [4, None])
+def test_transformed_positions_match_transformed_games(forced):
+    for seed in range(20):
+        moves = random_game(seed, forced)
+        transformed = [Position(forced) for _ in TRANSFORMS]
+        position = Position(forced)
+        for move in moves:
+            position.apply_move(move)
+            for transform, copy in enumerate(transformed):
+                copy.apply_move(moved(move, transform))
+                assert fields(transform_position(position, transform)) == fields(copy)
+
+
+def test_permutations_match_the_transforms():
+    for transform in range(len(TRANSFORMS)):
+        for subboard in range(9):
+            for cell in range(9):
+                move = (subboard, cell)
+                assert transform_move(move, transform) == moved(move, transform)
+                assert (
+                    transform_move(moved(move, transform), INVERSE[transform]) == move
+                )
+
+
+def test_canonical_form_is_shared():
+    rng = random.Random(1)
+    for seed in range(20):
+        moves = random_game(seed, None)
+        position = Position(None)
+        for move in moves[: rng.randrange(len(moves))]:
+            position.apply_move(move)
+
+        canonical, transform = canonicalize(position)
+        key, _ = canonical_hash(position)
+        assert key == canonical.hash
+        assert fields(canonical) == fields(transform_position(position, transform))
+        for other in range(len(PERMUTATIONS)):
+            copy = transform_position(position, other)
+            assert canonical_hash(copy)[0] == key
+            assert fields(canonicalize(copy)[0]) == fields(canonical)
+
+
+def test_count_positions():
+    # the opening forces play in a corner subboard, only the reflection
+    # through that corner keeps it, so the 9 first moves pair up into 6
+    assert count_positions(0) == (1, 1)
+    assert count_positions(1) == (10, 7)
@@ -0,0 +1,91 @@
+"""
+tests for the rules engine of larger and deeper boards, the normal game
+played through it must match Position
+
+usage: python -m pytest -q test_variants.py
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from bitboard import PLAYERS, Position
+from perft import KNOWN_NODES
+from variants import NestedPosition, perft
+
+
+def state(position: NestedPosition) -> tuple:
+    """everything undo_move has to restore, copied"""
+
+    return (
+        [[list(boards) for boards in level] for level in position.owned],
+        [list(level) for level in position.closed],
+        [[list(boards) for boards in level] for level in position.dead],
+        position.forced,
+        position.player,
+        position.winner,
+        position.drawn,
+    )
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3, 4])
+def test_perft_matches_position(depth):
+    assert perft(NestedPosition(), depth) == KNOWN_NODES[depth]
+
+
+def test_anywhere_opening():
+    assert len(NestedPosition(forced=()).legal_moves()) == 81
+    assert len(NestedPosition(size=4).legal_moves()) == 16
+
+
+def test_random_games_match_position():
+    rng = random.Random(0)
+    for _ in range(100):
+        nested = NestedPosition()
+        position = Position()
+        while not position.is_over():
+            moves = position.legal_moves()
+            assert sorted(nested.legal_moves()) == sorted(moves)
+            for move in moves:
+                assert nested.is_legal(move)
+            move = rng.choice(moves)
+            nested.apply_move(move)
+            position.apply_move(move)
+
+            for subboard in range(9):
+                assert nested.owner((subboard,)) == position.board_owner(subboard)
+            assert nested.forced_path() == (
+                () if position.forced is None else (position.forced,)
+            )
+        assert nested.is_over()
+        assert nested.winner == position.winner
+        assert nested.drawn == position.drawn
+        assert nested.owner(()) == (
+            "*" if position.winner is None else PLAYERS[position.winner]
+        )
+
+
+@pytest.mark.parametrize("size, depth", [(3, 2), (4, 2), (3, 3), (5, 2)])
+def test_undo_restores_the_position(size, depth):
+    rng = random.Random(size * 10 + depth)
+    position = NestedPosition(size, depth)
+    snapshots = []
+    while not position.is_over():
+        snapshots.append(state(position))
+        position.apply_move(rng.choice(position.legal_moves()))
+
+    while snapshots:
+        position.undo_move()
+        assert state(position) == snapshots.pop()
+    assert position.history == []
+
+
+def test_illegal_moves():
+    position = NestedPosition()
+    assert not position.is_legal((0, 0))  # outside the opening sub-board
+    assert not position.is_legal((8,))
+    assert not position.is_legal((8, 9))
+    position.apply_move((8, 4))
+    assert not position.is_legal((8, 4))
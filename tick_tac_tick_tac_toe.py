@@ -25,7 +25,6 @@ the game is won by the winner of the big board.
 # display something like 'you must go in shaded reagon' when the player 
 #      clicks outside the shaded reagon
 # display a you win message when a player wins
-# detect a cats-game on the main board
 # display rules on game start
 # upgrade from trutle to a more profesional graphics library
 
@@ -33,10 +32,21 @@ the game is won by the winner of the big board.
 
 from __future__ import annotations
 
-import random
-import time  # pylint: disable=unused-import
-import tkinter  # pylint: disable=unused-import
-import turtle
+import argparse
+import functools
+import time
+from typing import TYPE_CHECKING
+
+from instrument import TIMINGS
+from bitboard import (
+    OPENING_SUBBOARD,
+    PLAYERS,
+    Position,
+    index_to_location,
+    location_to_index,
+)
+from layout import Hitbox, divide_hitbox, get_layout, shrink_hitbox
+from scheduler import Scheduler
 
 SIZE = 600
 WIDTH = SIZE
@@ -53,15 +63,47 @@ BOARD_OFFSET_FACTOR = 0.9
 OUTER_BOARD_OFFSET_FACTOR = 0.9
 BACKGROUND_COLOR = "lightgray"
 SHADED_COLOR = "darkgray"
+# how long a won subboard, top board or drawn game is shown before the next step
+WIN_ANIMATION_MS = 1000
+# how often the analysis worker's estimates are checked for
+ANALYSIS_POLL_MS = 100
+# how often a computer player's search is checked for its move
+THINK_POLL_MS = 20
+# size of a heatmap square compared to its cell
+HEATMAP_FACTOR = 0.5
+# the analysis adds the solver's result to the window title late in a game
+TITLE = "Tick Tac Tick Tac Toe"
+
+LAYOUT = get_layout(
+    SIZE,
+    BOARD_SIZE,
+    OUTER_BOARD_OFFSET_FACTOR,
+    BOARD_OFFSET_FACTOR,
+    CELL_OFFSET_FACTOR,
+)
+
+# check every hitbox is well formed as cells are created, slow
+VALIDATE_HITBOXES = False
 
 DEBUG_SHOW_HITBOXES = False
 # DEBUG_SHOW_HITBOXES = True
 DEBUG_SHOW_TURTLE = False
 # DEBUG_SHOW_TURTLE = True
+DEBUG_SHOW_FRAME_TIMES = False
+# DEBUG_SHOW_FRAME_TIMES = True
 
-# print(dir(screen._canvas))
+# turtle and tkinter are only imported once a Window or CanvasWindow is
+# created, so headless games never pay for starting Tk or need a display.
+# the searchers, the analysis and the thread pool are imported where they
+# are used for the same reason
+if TYPE_CHECKING:
+    import concurrent.futures
+    import tkinter
+    import turtle
+
+    from analysis import Analysis
 
-# random.seed("woo")
+# print(dir(screen._canvas))
 
 
 class Window:
@@ -69,14 +111,27 @@ class Window:
 
     screen: turtle._Screen
     pen: turtle.Turtle
+    # draws only the analysis heatmap, so it can be cleared on its own
+    heat_pen: turtle.Turtle
     game_state: GameState
 
+    # what is on the screen as of the last frame, see snapshot
+    drawn: tuple | None
+    # seconds spent drawing each frame, and what each frame redrew
+    frame_times: list[float]
+    frame_regions: list[str]
+
     def __init__(self, game_state) -> None:
+        import turtle  # pylint: disable=import-outside-toplevel,redefined-outer-name
 
         self.game_state = game_state
+        self.drawn = None
+        self.frame_times = []
+        self.frame_regions = []
 
         self.screen = turtle.Screen()
         self.screen.setup(width=WIDTH, height=HEIGHT)
+        self.screen.title(TITLE)
         # screen.screensize(canvwidth=int(width), canvheight=int(height),bg='red')
         self.screen.screensize(bg="lightgray")
 
@@ -95,32 +150,25 @@ class Window:
 
             self.pen.hideturtle()
 
-    def create_window_hitbox(self) -> dict[int]:
-        """create the hitbox for the top level board"""
-        size = SIZE / 2
-        hitbox = dict(
-            e=+size,
-            w=-size,
-            n=+size,
-            s=-size,
-            size=2 * size,
-        )
-
-        hitbox = Board.shrink_hitbox(None, hitbox, OUTER_BOARD_OFFSET_FACTOR)
+        self.heat_pen = turtle.Turtle(visible=False)
+        self.heat_pen.penup()
+        self.heat_pen.speed(0)
 
-        return hitbox
+    def create_window_hitbox(self) -> Hitbox:
+        """create the hitbox for the top level board"""
+        return create_window_hitbox()
 
     def outline_hitbox(self, hitbox) -> None:
         """debug function to outline a hitbox"""
 
         self.pen.color("purple")
-        self.pen.goto(hitbox["w"], hitbox["s"])
+        self.pen.goto(hitbox.w, hitbox.s)
         self.pen.pendown()
 
-        self.pen.goto(hitbox["w"], hitbox["n"])
-        self.pen.goto(hitbox["e"], hitbox["n"])
-        self.pen.goto(hitbox["e"], hitbox["s"])
-        self.pen.goto(hitbox["w"], hitbox["s"])
+        self.pen.goto(hitbox.w, hitbox.n)
+        self.pen.goto(hitbox.e, hitbox.n)
+        self.pen.goto(hitbox.e, hitbox.s)
+        self.pen.goto(hitbox.w, hitbox.s)
 
         self.pen.penup()
         self.pen.color(PEN_COLOR)
@@ -130,9 +178,9 @@ class Window:
         self.pen.goto(location)
         self.pen.dot(LINE_WIDTH_THICK)
 
-    def center_size_to_hitbox(self, center, size) -> dict[int]:
+    def center_size_to_hitbox(self, center, size) -> Hitbox:
         """take a center and size and return a hitbox"""
-        hitbox = dict(
+        hitbox = Hitbox(
             e=center[0] + size / 2,
             w=center[0] - size / 2,
             n=center[1] + size / 2,
@@ -142,8 +190,8 @@ class Window:
 
         # self.outline_hitbox(hitbox)
 
-        # self.draw_point([hitbox['w'], hitbox['s']])
-        # self.draw_point([hitbox['e'], hitbox['n']])
+        # self.draw_point([hitbox.w, hitbox.s])
+        # self.draw_point([hitbox.e, hitbox.n])
 
         return hitbox
 
@@ -152,10 +200,12 @@ class Window:
 
         self.draw_square((-SIZE / 2, -SIZE / 2), SIZE, shade_color=BACKGROUND_COLOR)
 
-    def draw_square(self, bottom_left, size, *, pen_color=None, shade_color=None):
+    def draw_square(
+        self, bottom_left, size, *, pen_color=None, shade_color=None, pen=None
+    ):
         """draw a shaded square"""
 
-        pen = self.pen
+        pen = pen or self.pen
 
         pen.goto(bottom_left)
         pen.seth(90)
@@ -184,24 +234,24 @@ class Window:
 
         # hitbox = self.center_size_to_hitbox(center, size)
 
-        gap_width = hitbox["size"] / board_size
+        gap_width = hitbox.size / board_size
 
         # draw horisantal lines
         for i in range(1, board_size):
 
-            self.pen.goto(hitbox["w"], hitbox["s"] + i * gap_width)
+            self.pen.goto(hitbox.w, hitbox.s + i * gap_width)
             self.pen.down()
 
-            self.pen.goto(hitbox["e"], hitbox["s"] + i * gap_width)
+            self.pen.goto(hitbox.e, hitbox.s + i * gap_width)
             self.pen.up()
 
         # draw horisantal lines
         for i in range(1, board_size):
 
-            self.pen.goto(hitbox["w"] + i * gap_width, hitbox["s"])
+            self.pen.goto(hitbox.w + i * gap_width, hitbox.s)
             self.pen.down()
 
-            self.pen.goto(hitbox["w"] + i * gap_width, hitbox["n"])
+            self.pen.goto(hitbox.w + i * gap_width, hitbox.n)
             self.pen.up()
 
     def draw_x(self, hitbox) -> None:
@@ -216,14 +266,14 @@ class Window:
         self.pen.color(color)
         self.pen.seth(0)
 
-        self.pen.goto(hitbox["w"] + offset, hitbox["s"] + offset)
+        self.pen.goto(hitbox.w + offset, hitbox.s + offset)
         self.pen.down()
-        self.pen.goto(hitbox["e"] - offset, hitbox["n"] - offset)
+        self.pen.goto(hitbox.e - offset, hitbox.n - offset)
         self.pen.up()
 
-        self.pen.goto(hitbox["w"] + offset, hitbox["n"] - offset)
+        self.pen.goto(hitbox.w + offset, hitbox.n - offset)
         self.pen.down()
-        self.pen.goto(hitbox["e"] - offset, hitbox["s"] + offset)
+        self.pen.goto(hitbox.e - offset, hitbox.s + offset)
         self.pen.up()
 
         self.pen.pensize(LINE_WIDTH_THIN)
@@ -235,15 +285,15 @@ class Window:
         # hitbox = self.center_size_to_hitbox(center, size)
 
         color = O_COLOR
-        radius = hitbox["size"] / 2 - LINE_WIDTH_THICK / 2
+        radius = hitbox.size / 2 - LINE_WIDTH_THICK / 2
 
         self.pen.pensize(LINE_WIDTH_THICK)
         self.pen.color(color)
         self.pen.seth(0)
 
         self.pen.goto(
-            hitbox["w"] + hitbox["size"] / 2,
-            hitbox["s"] + LINE_WIDTH_THICK / 2,
+            hitbox.w + hitbox.size / 2,
+            hitbox.s + LINE_WIDTH_THICK / 2,
         )
 
         self.pen.down()
@@ -298,23 +348,166 @@ class Window:
             subboard = self.game_state.board
         hitbox = subboard.hitbox
         self.draw_square(
-            bottom_left=(hitbox["w"], hitbox["s"]),
-            size=hitbox["size"],
+            bottom_left=(hitbox.w, hitbox.s),
+            size=hitbox.size,
             shade_color=SHADED_COLOR,
         )
 
     def draw_all(self) -> None:
         """draw everything"""
 
+        start = time.perf_counter()
+        self.redraw_all()
+        self.end_frame(start, "everything")
+
+    def redraw_all(self) -> None:
+        """wipe the screen and draw everything without updating it"""
+
         game_state = self.game_state
         board = game_state.board
 
         self.wipe_screen()
-        if self.game_state.board.owner == "*":
+        if not self.game_state.position.is_over():
             self.shade_playable_subboard()
         self.draw_board(board)
 
-        game_state.window.screen.update()
+        self.drawn = self.snapshot()
+
+    def snapshot(self) -> tuple:
+        """
+        describe everything draw_all would draw, the shaded region is the
+        forced subboard index, 'all' to play anywhere or None once the game is over
+        """
+
+        position = self.game_state.position
+        cells = self.game_state.board_size**2
+
+        if position.is_over():
+            shaded = None
+        elif position.forced is None:
+            shaded = "all"
+        else:
+            shaded = position.forced
+
+        return (
+            position.top_owner(),
+            shaded,
+            tuple(position.board_owner(subboard) for subboard in range(cells)),
+            tuple(
+                position.cell_owner(subboard, cell)
+                for subboard in range(cells)
+                for cell in range(cells)
+            ),
+        )
+
+    def draw_changes(self) -> None:
+        """only redraw the cells, subboards and shading that changed since the last frame"""
+
+        start = time.perf_counter()
+        old = self.drawn
+        new = self.snapshot()
+
+        # shading all of the board, or none of it, covers the gutters as
+        # well as the subboards so the whole screen has to be redrawn
+        if old is None or old[0] != new[0] or "all" in (old[1], new[1]):
+            self.redraw_all()
+            self.end_frame(start, "everything")
+            return
+        if old == new:
+            return
+
+        cells = self.game_state.board_size**2
+        _, old_shaded, old_boards, old_cells = old
+        _, shaded, boards, new_cells = new
+
+        # subboards that have to be wiped, the rest only gain new marks
+        dirty = set()
+        if old_shaded != shaded:
+            dirty.update(index for index in (old_shaded, shaded) if index is not None)
+        marks = []
+        for subboard in range(cells):
+            if old_boards[subboard] != boards[subboard]:
+                dirty.add(subboard)
+                continue
+            for cell in range(cells):
+                index = subboard * cells + cell
+                if old_cells[index] == new_cells[index]:
+                    continue
+                if old_cells[index] == "*":
+                    marks.append((subboard, cell))
+                else:
+                    # a mark was taken back
+                    dirty.add(subboard)
+
+        board = self.game_state.board
+        for subboard_index in dirty:
+            subboard = board.get_cell_by_index(index_to_location(subboard_index))
+            hitbox = subboard.hitbox
+            self.draw_square(
+                bottom_left=(hitbox.w, hitbox.s),
+                size=hitbox.size,
+                shade_color=(
+                    SHADED_COLOR if subboard_index == shaded else BACKGROUND_COLOR
+                ),
+            )
+            self.draw_board(subboard)
+
+        for subboard_index, cell_index in marks:
+            if subboard_index not in dirty:
+                subboard = board.get_cell_by_index(index_to_location(subboard_index))
+                cell = subboard.get_cell_by_index(index_to_location(cell_index))
+                self.draw_board(cell)
+
+        self.drawn = new
+        self.end_frame(start, f"{len(dirty)} subboards, {len(marks)} marks")
+
+    def draw_heatmap(self, estimates: dict) -> None:
+        """shade a square in every analysed cell by the chance the move wins"""
+        from analysis import heat_color  # pylint: disable=import-outside-toplevel
+
+        start = time.perf_counter()
+        self.heat_pen.clear()
+        for (subboard, cell), (chance, _) in estimates.items():
+            hitbox = shrink_hitbox(LAYOUT.cell_hitboxes[subboard][cell], HEATMAP_FACTOR)
+            self.draw_square(
+                (hitbox.w, hitbox.s),
+                hitbox.size,
+                shade_color=heat_color(chance),
+                pen=self.heat_pen,
+            )
+        self.end_frame(start, f"{len(estimates)} heatmap squares")
+
+    def end_frame(self, start: float, regions: str) -> None:
+        """show the frame and record how long it took to draw"""
+
+        painted = time.perf_counter()
+        with TIMINGS.phase("screen_update"):
+            self.screen.update()
+        TIMINGS.record("paint", painted - start)
+
+        seconds = time.perf_counter() - start
+        self.frame_times.append(seconds)
+        self.frame_regions.append(regions)
+        if DEBUG_SHOW_FRAME_TIMES:
+            print(f"frame {len(self.frame_times)}: {regions} in {seconds * 1000:.1f}ms")
+
+    def after(self, milliseconds: int, callback) -> None:
+        """call callback from the event loop after milliseconds"""
+        self.screen.ontimer(callback, milliseconds)
+
+    def mainloop(self) -> None:
+        """run the event loop until the window is closed"""
+        self.screen.mainloop()
+
+    def show_status(self, status: str | None) -> None:
+        """put status after the window title, None for the title alone"""
+        self.screen.title(TITLE if status is None else f"{TITLE} - {status}")
+
+    def bind_key(self, key: str, callback) -> None:
+        """call callback with no arguments when key is pressed"""
+
+        self.screen.onkeypress(callback, key)
+        self.screen.listen()
 
     def on_mouse_click(self, x, y) -> None:  # pylint: disable=invalid-name
         """called when the user clicks on the screen"""
@@ -322,31 +515,330 @@ class Window:
         # time.sleep(1)
 
         # self.draw_point([x, y])
-        self.game_state.game_loop((x, y))
+        with TIMINGS.phase("click"):
+            self.game_state.game_loop((x, y))
+
+
+class CanvasWindow:
+    """
+    draws to a Tk Canvas in retained mode, every grid line, mark and the
+    shaded region is one canvas item created up front, moves only show,
+    hide or move items so the item count stays the same all game
+    """
+
+    root: tkinter.Tk
+    canvas: tkinter.Canvas
+    game_state: GameState
+
+    # canvas item ids, see create_items
+    shade: int
+    top_grid: list[int]
+    top_marks: dict[str, int]
+    board_grids: list[list[int]]
+    board_marks: list[dict[str, int]]
+    cell_marks: list[list[dict[str, int]]]
+    # analysis heatmap squares, indexed by subboard then cell
+    heat_squares: list[list[int]]
+
+    # item id -> True if it is on the screen
+    shown: dict[int, bool]
+    # heatmap square id -> its color, None while it is hidden
+    heat_colors: dict[int, str | None]
+    shade_coords: tuple | None
+    frame_times: list[float]
+    frame_regions: list[str]
+
+    def __init__(self, game_state) -> None:
+        import tkinter  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        self.game_state = game_state
+
+        self.root = tkinter.Tk()
+        self.root.title(TITLE)
+        self.canvas = tkinter.Canvas(
+            self.root,
+            width=WIDTH,
+            height=HEIGHT,
+            background=BACKGROUND_COLOR,
+            highlightthickness=0,
+        )
+        self.canvas.pack()
+        self.canvas.bind("<Button-1>", self.on_mouse_click)
+
+        self.shown = {}
+        self.heat_colors = {}
+        self.shade_coords = None
+        self.frame_times = []
+        self.frame_regions = []
+
+        self.create_items()
+
+    def to_canvas(self, x, y) -> tuple[float, float]:  # pylint: disable=invalid-name
+        """convert turtle style coordinates, centered with y up, to canvas ones"""
+        return x + WIDTH / 2, HEIGHT / 2 - y
+
+    def from_canvas(self, x, y) -> tuple[float, float]:  # pylint: disable=invalid-name
+        """convert canvas coordinates to turtle style ones"""
+        return x - WIDTH / 2, HEIGHT / 2 - y
+
+    def hitbox_coords(self, hitbox: Hitbox, inset: float = 0) -> tuple:
+        """return the canvas bounding box of a hitbox, shrunk by inset on every side"""
+
+        west, north = self.to_canvas(hitbox.w + inset, hitbox.n - inset)
+        east, south = self.to_canvas(hitbox.e - inset, hitbox.s + inset)
+        return west, north, east, south
+
+    def create_grid(self, hitbox: Hitbox, board_size: int) -> list[int]:
+        """create the hidden lines of a grid"""
+
+        gap_width = hitbox.size / board_size
+        ends = []
+        for i in range(1, board_size):
+            # horisantal then vertical line
+            height = hitbox.s + i * gap_width
+            ends.append(((hitbox.w, height), (hitbox.e, height)))
+            across = hitbox.w + i * gap_width
+            ends.append(((across, hitbox.s), (across, hitbox.n)))
+
+        return [
+            self.canvas.create_line(
+                *self.to_canvas(*start),
+                *self.to_canvas(*end),
+                fill=PEN_COLOR,
+                width=LINE_WIDTH_THIN,
+                state="hidden",
+            )
+            for start, end in ends
+        ]
+
+    def create_marks(self, hitbox: Hitbox) -> dict[str, int]:
+        """create a hidden X and O for a hitbox"""
+
+        inset = LINE_WIDTH_THICK / 2
+        west, north, east, south = self.hitbox_coords(hitbox, inset)
+        center_x = (west + east) / 2
+        center_y = (north + south) / 2
+
+        # one line through both diagonals, going back to the center between them
+        points = (west, south, east, north, center_x, center_y)
+        points += (west, north, east, south)
+        x_mark = self.canvas.create_line(
+            *points,
+            fill=X_COLOR,
+            width=LINE_WIDTH_THICK,
+            joinstyle="round",
+            state="hidden",
+        )
+        o_mark = self.canvas.create_oval(
+            west,
+            north,
+            east,
+            south,
+            outline=O_COLOR,
+            width=LINE_WIDTH_THICK,
+            state="hidden",
+        )
+        return {"X": x_mark, "O": o_mark}
+
+    def create_items(self) -> None:
+        """create every canvas item the game will ever need"""
+
+        board = self.game_state.board
+
+        # created first so it is below everything else
+        self.shade = self.canvas.create_rectangle(
+            0, 0, 0, 0, fill=SHADED_COLOR, outline="", state="hidden"
+        )
+        # above the shading and below the grids and marks
+        self.heat_squares = [
+            [
+                self.canvas.create_rectangle(
+                    *self.hitbox_coords(shrink_hitbox(hitbox, HEATMAP_FACTOR)),
+                    outline="",
+                    state="hidden",
+                )
+                for hitbox in cells
+            ]
+            for cells in LAYOUT.cell_hitboxes
+        ]
+
+        self.top_grid = self.create_grid(board.hitbox, board.board_size)
+        self.board_grids = []
+        self.cell_marks = []
+        for subboard in board.get_all_cells():
+            self.board_grids.append(
+                self.create_grid(subboard.hitbox, subboard.board_size)
+            )
+            self.cell_marks.append(
+                [self.create_marks(cell.hitbox) for cell in subboard.get_all_cells()]
+            )
+        self.board_marks = [
+            self.create_marks(subboard.hitbox) for subboard in board.get_all_cells()
+        ]
+        self.top_marks = self.create_marks(board.hitbox)
+
+    def item_count(self) -> int:
+        """number of items on the canvas"""
+        return len(self.canvas.find_all())
+
+    def wanted_items(self) -> dict[int, bool]:
+        """work out which items should be on the screen, the same things draw_board draws"""
+
+        position = self.game_state.position
+        top_owner = position.top_owner()
+        wanted = {}
+
+        for symbol, item in self.top_marks.items():
+            wanted[item] = top_owner == symbol
+        for item in self.top_grid:
+            wanted[item] = top_owner == "*"
+
+        for subboard, grid in enumerate(self.board_grids):
+            owner = position.board_owner(subboard) if top_owner == "*" else None
+            for symbol, item in self.board_marks[subboard].items():
+                wanted[item] = owner == symbol
+            for item in grid:
+                wanted[item] = owner == "*"
+            for cell, marks in enumerate(self.cell_marks[subboard]):
+                if owner == "*":
+                    cell_owner = position.cell_owner(subboard, cell)
+                else:
+                    cell_owner = None
+                for symbol, item in marks.items():
+                    wanted[item] = cell_owner == symbol
+
+        return wanted
+
+    def shaded_hitbox(self) -> Hitbox | None:
+        """the area shade_playable_subboard would shade, None once the game is over"""
+
+        game_state = self.game_state
+        if game_state.position.is_over():
+            return None
+        if game_state.playable_subboard is None:
+            return game_state.board.hitbox
+        return game_state.board.get_cell_by_index(game_state.playable_subboard).hitbox
+
+    def sync(self, force: bool = False) -> int:
+        """show, hide and move items to match the game, return how many changed"""
+
+        changed = 0
+        for item, visible in self.wanted_items().items():
+            if force or self.shown.get(item) != visible:
+                self.canvas.itemconfigure(item, state="normal" if visible else "hidden")
+                self.shown[item] = visible
+                changed += 1
+
+        hitbox = self.shaded_hitbox()
+        coords = None if hitbox is None else self.hitbox_coords(hitbox)
+        if force or coords != self.shade_coords:
+            if coords is None:
+                self.canvas.itemconfigure(self.shade, state="hidden")
+            else:
+                self.canvas.coords(self.shade, *coords)
+                self.canvas.itemconfigure(self.shade, state="normal")
+            self.shade_coords = coords
+            changed += 1
+
+        return changed
+
+    def draw_all(self) -> None:
+        """bring every item up to date"""
+
+        start = time.perf_counter()
+        changed = self.sync(force=True)
+        self.end_frame(start, f"{changed} items")
+
+    def draw_changes(self) -> None:
+        """only touch the items that changed since the last frame"""
+
+        start = time.perf_counter()
+        changed = self.sync()
+        self.end_frame(start, f"{changed} items")
+
+    def draw_heatmap(self, estimates: dict) -> None:
+        """color the square in every analysed cell by the chance the move wins"""
+        from analysis import heat_color  # pylint: disable=import-outside-toplevel
+
+        start = time.perf_counter()
+        changed = 0
+        for subboard, squares in enumerate(self.heat_squares):
+            for cell, item in enumerate(squares):
+                estimate = estimates.get((subboard, cell))
+                color = None if estimate is None else heat_color(estimate[0])
+                if self.heat_colors.get(item) == color:
+                    continue
+                if color is None:
+                    self.canvas.itemconfigure(item, state="hidden")
+                else:
+                    self.canvas.itemconfigure(item, fill=color, state="normal")
+                self.heat_colors[item] = color
+                changed += 1
+        self.end_frame(start, f"{changed} heatmap squares")
+
+    def end_frame(self, start: float, regions: str) -> None:
+        """show the frame and record how long it took to draw"""
+
+        painted = time.perf_counter()
+        with TIMINGS.phase("screen_update"):
+            self.root.update_idletasks()
+        TIMINGS.record("paint", painted - start)
+
+        seconds = time.perf_counter() - start
+        self.frame_times.append(seconds)
+        self.frame_regions.append(regions)
+        if DEBUG_SHOW_FRAME_TIMES:
+            print(
+                f"frame {len(self.frame_times)}: {regions} in {seconds * 1000:.1f}ms, "
+                f"{self.item_count()} canvas items"
+            )
+
+    def outline_hitbox(self, hitbox) -> None:
+        """debug function to outline a hitbox"""
+        self.canvas.create_rectangle(*self.hitbox_coords(hitbox), outline="purple")
+
+    def after(self, milliseconds: int, callback) -> None:
+        """call callback from the event loop after milliseconds"""
+        self.root.after(milliseconds, callback)
+
+    def mainloop(self) -> None:
+        """run the event loop until the window is closed"""
+        self.root.mainloop()
+
+    def show_status(self, status: str | None) -> None:
+        """put status after the window title, None for the title alone"""
+        self.root.title(TITLE if status is None else f"{TITLE} - {status}")
+
+    def bind_key(self, key: str, callback) -> None:
+        """call callback with no arguments when key is pressed"""
+        self.root.bind(f"<KeyPress-{key}>", lambda event: callback())
+
+    def on_mouse_click(self, event) -> None:
+        """called when the user clicks on the canvas"""
+
+        with TIMINGS.phase("click"):
+            self.game_state.game_loop(self.from_canvas(event.x, event.y))
 
 
 class Cell:
     """contains information and mothods for a single cell, primarly managing its hitbox"""
 
-    hitbox: dict
-    owner = "*"
+    __slots__ = ("hitbox", "parent", "game_state", "location", "index")
+
+    hitbox: Hitbox
     parent: Board | None
     game_state: GameState
     location: None | tuple[int]
+    # location as an index into the bitboard, None for the top board
+    index: int | None
 
     def __init__(self, game_state, parent, hitbox, location) -> None:
 
         self.game_state = game_state
         self.parent = parent
-        self.hitbox = self.validate_hitbox(hitbox)
+        self.hitbox = self.validate_hitbox(hitbox) if VALIDATE_HITBOXES else hitbox
         self.location = location
-
-        if DEBUG_SHOW_HITBOXES:
-            self.game_state.window.outline_hitbox(hitbox)
-
-        # symbols = ["X", "O", "*"]
-        # self.owner = random.choice(symbols)
-        self.owner = random.choice("*")
+        self.index = None if location is None else location_to_index(location)
 
     def __str__(self) -> str:
         return f"Cell {self.location} in board {self.parent.location} is a {self.owner}"
@@ -354,14 +846,17 @@ class Cell:
     def __repr__(self) -> str:
         return str(self)
 
+    @property
+    def owner(self) -> str:
+        """the owner of this cell, read from the game's bitboard"""
+        return self.game_state.position.cell_owner(self.parent.index, self.index)
+
     def apply_owner(self, new_owner) -> bool:
         """
         apply owner to this cell, return True if sucsesful return False if cell was already full"""
-        if self.owner == "*":
-            self.owner = new_owner
-            return True
-        else:
-            return False
+        return self.game_state.position.place(
+            self.parent.index, self.index, PLAYERS.index(new_owner)
+        )
 
     def is_playable(self) -> bool:
         """return true if a move can be played, return false if there is no leagal move"""
@@ -372,40 +867,36 @@ class Cell:
     def in_hitbox(self, location) -> bool:
         """return true if the given location is inside the hitbox for this object"""
         if (
-            location[0] > self.hitbox["w"]
-            and location[0] < self.hitbox["e"]
-            and location[1] > self.hitbox["s"]
-            and location[1] < self.hitbox["n"]
+            location[0] > self.hitbox.w
+            and location[0] < self.hitbox.e
+            and location[1] > self.hitbox.s
+            and location[1] < self.hitbox.n
         ):
             return True
         else:
             return False
 
-    def validate_hitbox(self, hitbox: dict) -> dict[int]:
+    def validate_hitbox(self, hitbox: Hitbox) -> Hitbox:
         """validate a hitbox is not malformed then return it, error otherwise"""
 
         # check all members exist
-        assert "e" in hitbox, "hitbox does not have member 'e' (for east)"
-        assert "w" in hitbox, "hitbox does not have member 'w' (for west)"
-        assert "n" in hitbox, "hitbox does not have member 'n' (for north)"
-        assert "s" in hitbox, "hitbox does not have member 's' (for south)"
-        assert "size" in hitbox, "hitbox does not have member 'size'"
+        assert isinstance(hitbox, Hitbox), "hitbox is not a Hitbox"
 
         # check all members are numberic
         # the "" at the end of the messages are required for black to auto format it properly
-        assert isinstance(hitbox["e"], (int, float)), (
+        assert isinstance(hitbox.e, (int, float)), (
             "hitbox member 'e' (for east) is not numeric" ""
         )
-        assert isinstance(hitbox["w"], (int, float)), (
+        assert isinstance(hitbox.w, (int, float)), (
             "hitbox member 'w' (for west) is not numeric" ""
         )
-        assert isinstance(hitbox["n"], (int, float)), (
+        assert isinstance(hitbox.n, (int, float)), (
             "hitbox member 'n' (for north) is not numeric" ""
         )
-        assert isinstance(hitbox["s"], (int, float)), (
+        assert isinstance(hitbox.s, (int, float)), (
             "hitbox member 's' (for south) is not numeric" ""
         )
-        assert isinstance(hitbox["size"], (int, float)), (
+        assert isinstance(hitbox.size, (int, float)), (
             "hitbox member 'size' is not numeric" ""
         )
 
@@ -416,56 +907,32 @@ class Cell:
         # checks if they are within elsilon to avoid floating point errors
         epislon = 0.001
         assert (
-            abs((hitbox["e"] - hitbox["w"]) - (hitbox["n"] - hitbox["s"])) < epislon
+            abs((hitbox.e - hitbox.w) - (hitbox.n - hitbox.s)) < epislon
         ), "hitbox is not square"
         assert (
-            abs(hitbox["size"] - (hitbox["e"] - hitbox["w"])) < epislon
+            abs(hitbox.size - (hitbox.e - hitbox.w)) < epislon
         ), "hitbox 'size' field does not match the real size of the hitbox"
 
         return hitbox
 
-    def shrink_hitbox(self, old_hitbox: dict[int], shrink_factor) -> dict[int]:
+    def shrink_hitbox(self, old_hitbox: Hitbox, shrink_factor) -> Hitbox:
         """shrink a hitbox by shrink_factor so it remains centered"""
-
-        center_x = (old_hitbox["w"] + old_hitbox["e"]) / 2
-        center_y = (old_hitbox["n"] + old_hitbox["s"]) / 2
-
-        new_size = old_hitbox["size"] * shrink_factor
-
-        new_hitbox = dict(
-            e=center_x + new_size / 2,
-            w=center_x - new_size / 2,
-            n=center_y + new_size / 2,
-            s=center_y - new_size / 2,
-            size=new_size,
-        )
-
-        return new_hitbox
+        return shrink_hitbox(old_hitbox, shrink_factor)
 
     def divide_hitbox(
         self, x, y, shrink_factor  # pylint: disable=invalid-name
-    ) -> dict[int]:
+    ) -> Hitbox:
         """find the hitbox of a smaller board at x,y"""
-
-        old_hitbox = self.hitbox
-        board_size = self.game_state.board_size
-        stride = old_hitbox["size"] / board_size
-
-        hitbox = dict(
-            w=old_hitbox["w"] + x * stride,
-            e=old_hitbox["w"] + (x + 1) * stride,
-            s=old_hitbox["s"] + y * stride,
-            n=old_hitbox["s"] + (y + 1) * stride,
-            size=old_hitbox["size"] / board_size,
+        return divide_hitbox(
+            self.hitbox, x, y, self.game_state.board_size, shrink_factor
         )
-        hitbox = self.shrink_hitbox(hitbox, shrink_factor)
-
-        return hitbox
 
 
 class Board(Cell):
     """a the game logic of a game board or a single sub board"""
 
+    __slots__ = ("cell_array", "board_size", "is_top")
+
     # a square array of boards obects
     cell_array: list[list[Board]]
     board_size: int
@@ -479,30 +946,23 @@ class Board(Cell):
         self.board_size = board_size
         self.is_top = is_top
 
+        # the hitboxes are precomputed by the layout, indexed x * board_size + y
+        if is_top:
+            hitboxes = LAYOUT.subboard_hitboxes
+        else:
+            hitboxes = LAYOUT.cell_hitboxes[self.index]
+
         self.cell_array = []
         for x in range(board_size):  # pylint: disable=invalid-name
             self.cell_array.append([])
             for y in range(board_size):  # pylint: disable=invalid-name
+                hitbox = hitboxes[x * board_size + y]
                 if is_top:
                     self.cell_array[x].append(
-                        Board(
-                            game_state,
-                            self,
-                            self.divide_hitbox(x, y, BOARD_OFFSET_FACTOR),
-                            (x, y),
-                            board_size,
-                            False,
-                        )
+                        Board(game_state, self, hitbox, (x, y), board_size, False)
                     )
                 else:
-                    self.cell_array[x].append(
-                        Cell(
-                            game_state,
-                            self,
-                            self.divide_hitbox(x, y, CELL_OFFSET_FACTOR),
-                            (x, y),
-                        )
-                    )
+                    self.cell_array[x].append(Cell(game_state, self, hitbox, (x, y)))
 
     def __str__(self) -> str:
         if self.is_top:
@@ -510,6 +970,14 @@ class Board(Cell):
         else:
             return f"Subboard {self.location}"
 
+    @property
+    def owner(self) -> str:
+        """the owner of this board, read from the game's bitboard"""
+        position = self.game_state.position
+        if self.is_top:
+            return position.top_owner()
+        return position.board_owner(self.index)
+
     def get_cell(self, x, y) -> Board:  # pylint: disable=invalid-name
         """get the cell located at x,y"""
         return self.cell_array[x][y]
@@ -526,16 +994,13 @@ class Board(Cell):
     def is_playable(self) -> bool:
         """return true if a move can be played, return false if there is no leagal move"""
 
-        if self.owner != "*":
-            return False
-
-        # make sure there is at least one playable cell
-        playable = False
-        for cell in self.get_all_cells():
-            if cell.is_playable():
-                playable = True
+        position = self.game_state.position
+        if not self.is_top:
+            return position.is_playable(self.index)
 
-        return playable
+        if position.is_over():
+            return False
+        return position.playable_boards() != 0
 
     def get_cell_by_index(self, board_index):
         """return the subboard at board_index"""
@@ -573,48 +1038,29 @@ class Board(Cell):
     def find_board_winner(self) -> str | None:
         """find the winner if the game"""
 
-        # print("here at find_board_winner")
-
-        if self.owner != "*":
-            return self.owner
-
-        cell_array = self.cell_array
-
-        winner = None
-        # test rows
-        for row in cell_array:
-            # is there a winner for this row, if so the board is theirs
-            winner = self.all_same_owner(row) or winner
-
-        # test columns
-        for column in zip(*cell_array):
-            # is there a winner for this row, if so the board is theirs
-            winner = self.all_same_owner(column) or winner
-
-        # test diagonals
-        diagonal1 = []
-        diagonal2 = []
-        for i in range(len(cell_array)):  # pylint: disable=consider-using-enumerate
-            diagonal1 += [cell_array[i][i]]
-            diagonal2 += [cell_array[i][len(cell_array) - i - 1]]
-
-        # is there a winner for this row, if so the board is theirs
-        winner = self.all_same_owner(diagonal1) or winner
-        winner = self.all_same_owner(diagonal2) or winner
+        position = self.game_state.position
+        if self.is_top:
+            winner = position.find_winner()
+        else:
+            winner = position.find_board_winner(self.index)
 
-        # print("winner", winner)
-        return winner
+        return None if winner is None else PLAYERS[winner]
 
     def apply_board_winner(self) -> str | None:
         """find and apply the winner of the board"""
 
-        # print(self)
+        position = self.game_state.position
+        if self.is_top:
+            winner = position.apply_winner()
+        else:
+            winner = position.apply_board_winner(self.index)
+
+        return None if winner is None else PLAYERS[winner]
 
-        winner = self.find_board_winner()
 
-        if winner:
-            self.owner = winner
-        return winner
+def create_window_hitbox() -> Hitbox:
+    """create the hitbox for the top level board"""
+    return LAYOUT.top_hitbox
 
 
 class GameState:
@@ -622,31 +1068,106 @@ class GameState:
 
     board_size = BOARD_SIZE
     board: Board
-    window: Window
-    playable_subboard: tuple[int] | None
-    player = "X"
+    # None when running headless
+    window: Window | CanvasWindow | None
+    # the bitboard the board tree reads and writes its owners through
+    position: Position
+    # computer players by symbol, anything with a choose_move(position) method
+    players: dict
+    # runs the steps of a move on the window's timer and buffers clicks
+    scheduler: Scheduler
+    # background analysis shown as a heatmap, None when it is off
+    analysis: Analysis | None
+    # moves taken back with undo_move, the next one to redo is last
+    redo_moves: list[tuple[int, int]]
+    # runs computer players' searches off the Tk thread, None until one is needed
+    think_pool: concurrent.futures.ThreadPoolExecutor | None
+    # the search for the move being waited on, None when nobody is thinking
+    thinking: concurrent.futures.Future | None
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        headless: bool = False,
+        players: dict | None = None,
+        renderer: str = "turtle",
+        analysis: Analysis | None = None,
+    ) -> None:
 
-        self.window = Window(self)
+        self.players = players or {}
+        self.analysis = analysis
+        self.think_pool = None
+        self.thinking = None
 
+        # the canvas window creates its items from the board, so the board
+        # is built before there is a window
+        self.window = None
         self.board = Board(
-            self, None, self.window.create_window_hitbox(), None, self.board_size, True
+            self, None, create_window_hitbox(), None, self.board_size, True
         )
 
-        self.playable_subboard = (2, 2)
+        if not headless:
+            self.window = CanvasWindow(self) if renderer == "canvas" else Window(self)
+        self.scheduler = Scheduler(self.window)
+        if DEBUG_SHOW_HITBOXES and self.window:
+            self.outline_hitboxes(self.board)
+
+        self.reset()
+
+        if self.analysis is not None and self.window:
+            self.window.after(ANALYSIS_POLL_MS, self.poll_analysis)
+        if self.window:
+            self.window.bind_key("Left", self.undo_turn)
+            self.window.bind_key("Right", self.redo_turn)
+
+    def outline_hitboxes(self, cell) -> None:
+        """outline the hitbox of cell and of everything in it, for debugging"""
+
+        self.window.outline_hitbox(cell.hitbox)
+        if isinstance(cell, Board):
+            for child in cell.get_all_cells():
+                self.outline_hitboxes(child)
+
+    def reset(self) -> None:
+        """start a new game, the board and window are reused as they hold no game state"""
+
+        self.scheduler.finish()
+        self.position = Position()
+        self.redo_moves = []
+        self.thinking = None
+        self.playable_subboard = index_to_location(OPENING_SUBBOARD)
         self.player = "X"
+        self.start_analysis()
+
+    @property
+    def player(self) -> str:
+        """the player to move, 'X' or 'O'"""
+        return PLAYERS[self.position.player]
+
+    @player.setter
+    def player(self, player: str) -> None:
+        if PLAYERS.index(player) != self.position.player:
+            self.position.swap_player()
+
+    @property
+    def playable_subboard(self) -> tuple[int] | None:
+        """the location of the subboard that must be played in, None to play anywhere"""
+        forced = self.position.forced
+        return None if forced is None else index_to_location(forced)
+
+    @playable_subboard.setter
+    def playable_subboard(self, location: tuple[int] | None) -> None:
+        self.position.set_forced(
+            None if location is None else location_to_index(location)
+        )
 
     def draw(self) -> None:
-        """draw gameboard as it exists now"""
-        self.window.draw_all()
+        """draw what changed on the gameboard, does nothing when headless"""
+        if self.window:
+            self.window.draw_changes()
 
     def swap_player(self) -> str:
         """swap the player between X and O"""
-        if self.player == "X":
-            self.player = "O"
-        else:
-            self.player = "X"
+        self.position.swap_player()
 
         return self.player
 
@@ -654,66 +1175,359 @@ class GameState:
         """
         check if the clicked subboard is a legal move, return True if it is and False otherwise"""
 
-        if self.playable_subboard is None:
-            return True
-        return subboard.location == self.playable_subboard
+        return self.position.check_legal_subboard(subboard.index)
 
     def update_legal_subboard(self, cell: Cell) -> None:
         """update where the next subboard is allowed"""
 
-        location = cell.location
-        next_subboard = self.board.cell_array[location[0]][location[1]]
-        if next_subboard.is_playable():
-            self.playable_subboard = location
+        self.position.update_legal_subboard(cell.index)
+
+    def legal_moves(self) -> list[tuple[int, int]]:
+        """return every legal move as a (subboard index, cell index) pair"""
+        return self.position.legal_moves()
+
+    def apply_move(self, move: tuple[int, int]) -> None:
+        """play a (subboard index, cell index) move, raise ValueError if it is not legal"""
+
+        # the last move's wins must be applied before this one is checked
+        self.scheduler.finish()
+        if not self.position.is_legal(*move):
+            raise ValueError(f"illegal move {move}")
+
+        subboard = self.board.get_cell_by_index(index_to_location(move[0]))
+        cell = subboard.get_cell_by_index(index_to_location(move[1]))
+        self.play_cell(subboard, cell)
+
+    def undo_move(self) -> tuple[int, int] | None:
+        """take back the last move and return it, None if there is none"""
+
+        self.scheduler.finish()
+        if not self.position.history:
+            return None
+        move = self.position.undo_move()
+        self.redo_moves.append(move)
+        # a search started before the undo is for the wrong position
+        self.thinking = None
+        self.draw()
+        self.start_analysis()
+        return move
+
+    def redo_move(self) -> tuple[int, int] | None:
+        """play the last move taken back again and return it, None if there is none"""
+
+        self.scheduler.finish()
+        if not self.redo_moves:
+            return None
+        move = self.redo_moves[-1]
+        self.apply_move(move)
+        return move
+
+    def undo_turn(self) -> None:
+        """take back moves until it is a person's turn, bound to the left arrow"""
+
+        if not self.position.history:
+            return
+        self.undo_move()
+        while self.position.history and self.player in self.players:
+            self.undo_move()
+        # a computer player to move with nothing left to undo plays again
+        self.next_turn()
+
+    def redo_turn(self) -> None:
+        """redo moves until it is a person's turn again, bound to the right arrow"""
+
+        if self.redo_move() is None:
+            return
+        while self.redo_moves and self.player in self.players:
+            self.redo_move()
+
+    def start_analysis(self) -> None:
+        """analyse the position from scratch, only clear the heatmap once the game is over"""
+
+        if self.analysis is None:
+            return
+        if self.position.is_over():
+            self.analysis.cancel()
         else:
-            self.playable_subboard = None
+            self.analysis.start(self.position)
+        self.draw_heatmap()
+
+    def poll_analysis(self) -> None:
+        """show any new estimates and check again in a moment, runs in the event loop"""
+
+        if self.analysis.poll():
+            self.draw_heatmap()
+        self.window.after(ANALYSIS_POLL_MS, self.poll_analysis)
+
+    def draw_heatmap(self) -> None:
+        """show the analysis estimates and any exact result, does nothing when headless"""
+
+        if self.window and self.analysis is not None:
+            self.window.draw_heatmap(self.analysis.estimates)
+            solution = self.analysis.solution
+            self.window.show_status(
+                None if solution is None else solution.describe(self.position.player)
+            )
 
     def game_loop(self, location) -> None:  # pylint: disable=invalid-name
-        """called when the user clicks on the screen"""
+        """
+        called when the user clicks on the screen, a click during an
+        animation is buffered and handled in order once it has finished
+        """
+
+        self.scheduler.submit(functools.partial(self.handle_click, location))
+
+    def handle_click(self, location) -> None:
+        """play the clicked cell if it is a legal move"""
+
+        # no moves once the top board is won or drawn
+        if self.position.is_over():
+            return
+
+        # ignore clicks while a computer player is thinking
+        if self.player in self.players:
+            return
 
-        try:
-            # determine if the player clicked something
-            subboard = self.board.get_clicked_board(location)
-            if not self.check_legal_subboard(subboard):
-                raise AttributeError
-            cell = subboard.get_clicked_board(location)
-            if cell.owner != "*":
-                # raise Exception("ExistingOwner")
-                raise AttributeError
-        except AttributeError:
-            # attribute error will occer if there is no cell at the click location
-            # the first raise will occer if the chosen subboard is not leagal
-            # the 2nd raise will occer if there is alreadly a piece at that loction
+        # determine if the player clicked a cell, clicks in the gutters miss
+        with TIMINGS.phase("hit_test"):
+            hit = LAYOUT.hit_test(location)
+        if not hit.is_cell:
             return
+
+        # the subboard must be the legal one and the cell must be empty
+        if not self.position.is_legal(hit.subboard, hit.cell):
+            return
+
+        subboard = self.board.get_cell_by_index(index_to_location(hit.subboard))
+        cell = subboard.get_cell_by_index(index_to_location(hit.cell))
+        self.play_cell(subboard, cell)
+
+    def play_cell(self, subboard: Board, cell: Cell) -> None:
+        """play the current player at cell and apply any wins, the move must be legal"""
+
+        move = (subboard.index, cell.index)
+        # whatever a computer player was thinking about is out of date
+        self.thinking = None
+        # playing the move that would be redone next keeps the rest of the redo list
+        if self.redo_moves and self.redo_moves[-1] == move:
+            self.redo_moves.pop()
+        else:
+            self.redo_moves.clear()
+
+        self.position.record_move(move)
+        # the estimates were for the position before this move
+        if self.analysis is not None:
+            self.analysis.cancel()
+            self.draw_heatmap()
+
         # if the cell was placed, then swap the players
+        with TIMINGS.phase("rules"):
+            cell.apply_owner(self.player)
+            self.swap_player()
+            self.update_legal_subboard(cell)
+        self.draw()
+
+        with TIMINGS.phase("winner"):
+            subboard_won = subboard.find_board_winner()
+
+        # wins are shown a moment apart on the window's timer instead of
+        # sleeping, so clicks keep arriving while they are on the screen
+        if subboard_won:
+            self.scheduler.after(
+                WIN_ANIMATION_MS,
+                functools.partial(self.show_subboard_winner, subboard, cell),
+            )
+        else:
+            self.scheduler.after(0, self.show_draw)
+        self.scheduler.after(0, self.start_analysis)
+        self.scheduler.after(0, self.next_turn)
+
+    def show_subboard_winner(self, subboard: Board, cell: Cell) -> None:
+        """apply and draw the winner of subboard, then queue the top board's"""
 
-        cell.apply_owner(self.player)
-        self.swap_player()
-        self.update_legal_subboard(cell)
+        with TIMINGS.phase("winner"):
+            subboard.apply_board_winner()
+            self.update_legal_subboard(cell)
+            top_won = self.board.find_board_winner()
         self.draw()
 
-        # print("draw1")
-        # if the sub board has a winner, wait 1 sec then draw it
-        if subboard.apply_board_winner():
-            # print("redrawing")
+        if top_won:
+            self.scheduler.then(
+                WIN_ANIMATION_MS, functools.partial(self.show_winner, cell)
+            )
+        else:
+            self.scheduler.then(0, self.show_draw)
+
+    def show_winner(self, cell: Cell) -> None:
+        """apply and draw the winner of the top board"""
+
+        with TIMINGS.phase("winner"):
+            self.board.apply_board_winner()
             self.update_legal_subboard(cell)
-            time.sleep(1)
-            self.draw()
+        self.draw()
+
+    def show_draw(self) -> None:
+        """a cat's game on the top board ends the game early"""
+
+        with TIMINGS.phase("draw_check"):
+            drawn = self.position.apply_draw()
+        if drawn:
+            self.scheduler.then(WIN_ANIMATION_MS, self.draw)
+
+    def next_turn(self) -> None:
+        """let the computer player move if it is their turn"""
+
+        if self.position.is_over() or self.player not in self.players:
+            return
+
+        if self.window:
+            # give tk a chance to show the last move before thinking
+            self.window.after(0, self.play_computer_move)
+        else:
+            self.play_computer_move()
+
+    def play_computer_move(self) -> None:
+        """
+        ask the computer player for their move and play it, with a window
+        the search runs on another thread so clicks and redraws are still
+        handled, and clicks made meanwhile are ignored by handle_click
+        """
+
+        player = self.players.get(self.player)
+        if player is None or self.position.is_over() or self.thinking is not None:
+            return
+
+        if not self.window:
+            self.apply_move(player.choose_move(self.position))
+            return
+
+        if self.think_pool is None:
+            import concurrent.futures  # pylint: disable=import-outside-toplevel
+
+            self.think_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        # a copy, so undoing while the search runs cannot change its position
+        self.thinking = self.think_pool.submit(player.choose_move, self.position.copy())
+        self.window.after(
+            THINK_POLL_MS, functools.partial(self.poll_computer_move, self.thinking)
+        )
 
-            if self.board.apply_board_winner():
-                self.update_legal_subboard(cell)
-                time.sleep(1)
-                self.draw()
+    def poll_computer_move(self, search: concurrent.futures.Future) -> None:
+        """play the move once search has found it, runs in the event loop"""
+
+        # the game moved on, was undone or reset while it was searching
+        if search is not self.thinking:
+            return
+        if not search.done():
+            self.window.after(
+                THINK_POLL_MS, functools.partial(self.poll_computer_move, search)
+            )
+            return
+
+        self.thinking = None
+        self.apply_move(search.result())
 
 
 def main() -> None:
     "main"
 
-    game_state = GameState()
+    parser = argparse.ArgumentParser(
+        description="A 2 player game of Tick Tac Tick Tac Toe"
+    )
+    parser.add_argument(
+        "--ai",
+        choices=PLAYERS,
+        action="append",
+        default=[],
+        help="let the computer play X or O, can be given twice",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("mcts", "alphabeta"),
+        default="mcts",
+        help="how the computer picks its moves",
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="computer thinking time per move"
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=("turtle", "canvas"),
+        default="turtle",
+        help="draw with turtle pen strokes or with retained Tk Canvas items",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="shade every legal move by its win chance, estimated in the background",
+    )
+    parser.add_argument(
+        "--book", help="opening book built by book.py for the computer and analysis"
+    )
+    parser.add_argument(
+        "--solver-cache",
+        metavar="FILE",
+        help="positions the analysis has solved exactly, loaded and added to",
+    )
+    parser.add_argument(
+        "--instrument",
+        metavar="FILE",
+        help="time every phase of a move, print the percentiles and write them to FILE",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="cProfile capture written to FILE, toggle with p",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        metavar="FILE",
+        help="tracemalloc capture of the largest allocations written to FILE, toggle with p",
+    )
+    args = parser.parse_args()
+
+    # pylint: disable=import-outside-toplevel
+    from alphabeta import AlphaBetaPlayer
+    from analysis import Analysis
+    from book import OpeningBook
+    from mcts import MCTSPlayer
+
+    if args.instrument or args.profile or args.trace_memory:
+        TIMINGS.enable(args.profile, args.trace_memory)
+
+    book = None if args.book is None else OpeningBook(args.book)
+    engine = MCTSPlayer if args.engine == "mcts" else AlphaBetaPlayer
+    players = {
+        symbol: engine(seconds=args.seconds, verbose=True, book=book)
+        for symbol in args.ai
+    }
+
+    analysis = (
+        Analysis(book_path=args.book, solver_cache=args.solver_cache)
+        if args.analyze
+        else None
+    )
+    game_state = GameState(players=players, renderer=args.renderer, analysis=analysis)
+
+    if args.profile or args.trace_memory:
+        game_state.window.bind_key(
+            "p",
+            lambda: print(
+                "capture started" if TIMINGS.toggle_capture() else "capture written"
+            ),
+        )
 
     game_state.draw()
+    game_state.next_turn()
+
+    game_state.window.mainloop()
+    if analysis is not None:
+        analysis.close()
 
-    turtle.done()
+    if TIMINGS.enabled:
+        TIMINGS.stop_capture()
+        print(TIMINGS.report())
+        if args.instrument:
+            TIMINGS.export(args.instrument)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,582 @@
+"""
+rules engine for any board size and any number of nested levels
+
+the game is played on a tree of boards. every board is size x size,
+the boards on the lowest level hold cells and every other board holds
+boards. a board is won by a line of won children, and it is closed once it
+is won or every child is closed. 3 x 3 with 2 levels is the normal game,
+size 4 with 2 levels is 4x4-of-4x4 and size 3 with 3 levels is
+ultimate-ultimate.
+
+a move is a path of child indexes from the top board down to a cell, one
+per level, each x * size + y like bitboard.location_to_index, so for the
+normal game a move is the same (subboard, cell) pair Position uses. the
+path after its first step names the board the next move must be played
+in: the deepest board along it that is still open, the top board (playing
+anywhere) if none is. like Position the first move is forced into the last
+child of the top board, (size - 1, size - 1), which is sub-board (2, 2) of
+the normal game; pass forced=() or --anywhere to open anywhere instead.
+
+like bitboard.py every board is a few masks of one bit per child: the
+children each player won, the closed ones, and the ones each player can no
+longer win because every line through them is blocked. they are kept in a
+flat list per level, the children of board b on one level are boards
+b * cells ... b * cells + cells - 1 on the next. a move only updates the
+masks of the boards above its cell, and stops as soon as a board's status
+did not change, so a move costs at most one step per level.
+
+the lines of each size are precomputed as masks by get_geometry, with
+tables for whether a mask holds a line and whether every line is blocked
+for sizes up to 4 x 4. larger sizes only test the lines through the child
+that changed, so a move costs the same however large the boards are.
+
+usage: python variants.py [--size N] [--depth D] [--perft P] [--games G] [--seed S]
+                          [--play] [--anywhere]
+counts the move tree and times random games, --play opens a window
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import random
+import time
+
+from bitboard import EMPTY, PLAYERS
+from layout import NestedLayout, get_nested_layout, shrink_hitbox
+
+# masks of at most this many bits get lookup tables
+TABLE_BITS = 16
+# size of a board or cell compared to its slot in the window
+VARIANT_OFFSET_FACTOR = 0.9
+
+
+class Geometry:
+    """the lines of a size x size board, computed once per size"""
+
+    size: int
+    cells: int
+    # mask with a bit for every child
+    full: int
+    # every row, column and both diagonals as masks
+    lines: tuple[int, ...]
+    # the lines through each child
+    lines_through: tuple[tuple[int, ...], ...]
+    # mask -> holds a complete line, and mask -> every line has a bit of
+    # mask, None for sizes too large to tabulate
+    won_table: bytes | None
+    blocked_table: bytes | None
+
+    def __init__(self, size: int) -> None:
+
+        self.size = size
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        def bit(x, y):  # pylint: disable=invalid-name
+            return 1 << (x * size + y)
+
+        lines = []
+        for x in range(size):  # pylint: disable=invalid-name
+            lines.append(sum(bit(x, y) for y in range(size)))
+        for y in range(size):  # pylint: disable=invalid-name
+            lines.append(sum(bit(x, y) for x in range(size)))
+        lines.append(sum(bit(i, i) for i in range(size)))
+        lines.append(sum(bit(i, size - 1 - i) for i in range(size)))
+        self.lines = tuple(lines)
+        self.lines_through = tuple(
+            tuple(line for line in self.lines if line >> index & 1)
+            for index in range(self.cells)
+        )
+
+        self.won_table = None
+        self.blocked_table = None
+        if self.cells <= TABLE_BITS:
+            self.won_table = bytes(
+                any(mask & line == line for line in self.lines)
+                for mask in range(self.full + 1)
+            )
+            self.blocked_table = bytes(
+                all(mask & line for line in self.lines) for mask in range(self.full + 1)
+            )
+
+    def is_won(self, mask: int, index: int) -> bool:
+        """True if mask holds a line, only the lines through index are new"""
+
+        if self.won_table is not None:
+            return bool(self.won_table[mask])
+        return any(mask & line == line for line in self.lines_through[index])
+
+    def is_blocked(self, mask: int) -> bool:
+        """True if every line has at least one bit of mask"""
+
+        if self.blocked_table is not None:
+            return bool(self.blocked_table[mask])
+        return all(mask & line for line in self.lines)
+
+
+@functools.lru_cache(maxsize=None)
+def get_geometry(size: int) -> Geometry:
+    """return the geometry of size, it is only computed the first time"""
+    return Geometry(size)
+
+
+class NestedPosition:
+    """a position of a game with depth levels of size x size boards"""
+
+    __slots__ = (
+        "geometry",
+        "depth",
+        "owned",
+        "closed",
+        "dead",
+        "forced",
+        "player",
+        "winner",
+        "drawn",
+        "history",
+    )
+
+    geometry: Geometry
+    # levels of boards, 2 for the normal game
+    depth: int
+    # per level, per player, per board: mask of the children the player won,
+    # or took for the lowest level. level 0 is a board above the top board
+    # whose only child is the top board, so the top board's status is kept
+    # the same way as every other board's
+    owned: list[tuple[list[int], list[int]]]
+    # per level, per board: mask of the closed children
+    closed: list[list[int]]
+    # per level, per player, per board: mask of the children the player can
+    # no longer win
+    dead: list[tuple[list[int], list[int]]]
+    # (level, board) that must be played in, the top board to play anywhere
+    forced: tuple[int, int]
+    player: int
+    winner: int | None
+    drawn: bool
+    # what undo_move needs to restore, one entry per applied move
+    history: list[tuple]
+
+    def __init__(self, size: int = 3, depth: int = 2, forced=None) -> None:
+
+        self.geometry = get_geometry(size)
+        self.depth = depth
+        cells = self.geometry.cells
+
+        counts = [1] + [cells**level for level in range(depth)]
+        self.owned = [([0] * count, [0] * count) for count in counts]
+        self.closed = [[0] * count for count in counts]
+        self.dead = [([0] * count, [0] * count) for count in counts]
+
+        # forced is the path to the first move's board, () to play anywhere,
+        # by default the last child like bitboard.OPENING_SUBBOARD
+        if forced is None:
+            forced = (cells - 1,)
+        self.forced = self.board_at(forced)
+        self.player = 0
+        self.winner = None
+        self.drawn = False
+        self.history = []
+
+    def __repr__(self) -> str:
+        size = self.geometry.size
+        return (
+            f"NestedPosition(size={size}, depth={self.depth}, "
+            f"moves={len(self.history)}, player={PLAYERS[self.player]})"
+        )
+
+    # paths
+    def board_at(self, path) -> tuple[int, int]:
+        """the (level, board) reached by following path down from the top board"""
+
+        board = 0
+        for index in path:
+            board = board * self.geometry.cells + index
+        return len(path) + 1, board
+
+    def path_of(self, level: int, board: int) -> tuple[int, ...]:
+        """the path from the top board to board on level"""
+
+        path = []
+        for _ in range(level - 1):
+            board, index = divmod(board, self.geometry.cells)
+            path.append(index)
+        return tuple(reversed(path))
+
+    def forced_path(self) -> tuple[int, ...]:
+        """the path to the board that must be played in, () to play anywhere"""
+        return self.path_of(*self.forced)
+
+    # owners
+    def owner(self, path) -> str:
+        """the owner of the board or cell at path as 'X', 'O' or '*'"""
+
+        if not path:
+            return EMPTY if self.winner is None else PLAYERS[self.winner]
+        level, board = self.board_at(path[:-1])
+        for player in (0, 1):
+            if self.owned[level][player][board] >> path[-1] & 1:
+                return PLAYERS[player]
+        return EMPTY
+
+    def is_closed(self, path) -> bool:
+        """True if the board or cell at path is won, full or taken"""
+
+        level, board = self.board_at(path[:-1])
+        return bool(self.closed[level][board] >> path[-1] & 1)
+
+    # rules
+    def is_over(self) -> bool:
+        """return True if the top board is won or drawn"""
+        return self.winner is not None or self.drawn
+
+    def is_legal(self, move) -> bool:
+        """return True if the player to move may play the cell at path move"""
+
+        if self.is_over() or len(move) != self.depth:
+            return False
+        forced_path = self.forced_path()
+        if tuple(move[: len(forced_path)]) != forced_path:
+            return False
+        level = 1
+        board = 0
+        for index in move:
+            if not 0 <= index < self.geometry.cells:
+                return False
+            if self.closed[level][board] >> index & 1:
+                return False
+            level += 1
+            board = board * self.geometry.cells + index
+        return True
+
+    def legal_moves(self) -> list[tuple[int, ...]]:
+        """return every legal move as a path from the top board"""
+
+        if self.is_over():
+            return []
+        moves = []
+        level, board = self.forced
+        self._open_cells(level, board, self.forced_path(), moves)
+        return moves
+
+    def _open_cells(self, level: int, board: int, path: tuple, moves: list) -> None:
+        """add the path of every open cell below board on level to moves"""
+
+        cells = self.geometry.cells
+        free = self.geometry.full & ~self.closed[level][board]
+        while free:
+            bit = free & -free
+            index = bit.bit_length() - 1
+            free ^= bit
+            if level == self.depth:
+                moves.append((*path, index))
+            else:
+                self._open_cells(
+                    level + 1, board * cells + index, (*path, index), moves
+                )
+
+    def apply_move(self, move) -> int | None:
+        """
+        play a legal move for the player to move so it can be undone with
+        undo_move, return the winner of the top board
+        """
+
+        geometry = self.geometry
+        cells = geometry.cells
+        player = self.player
+        other = player ^ 1
+        changes = []
+        self.history.append((move, self.forced, self.winner, self.drawn, changes))
+
+        level, board = self.board_at(move[:-1])
+        child = move[-1]
+        # what the child just became: won by player, closed, and so dead for other
+        won = closed = dead = True
+        # level 0 only records the top board's status
+        while level >= 0 and (won or closed or dead):
+            bit = 1 << child
+            parent = board // cells
+            parent_bit = 1 << board % cells
+
+            if won:
+                masks = self.owned[level][player]
+                changes.append((masks, board, masks[board]))
+                masks[board] |= bit
+                won = geometry.is_won(masks[board], child)
+            if closed:
+                masks = self.closed[level]
+                changes.append((masks, board, masks[board]))
+                masks[board] |= bit
+                closed = won or masks[board] == geometry.full
+            if dead:
+                masks = self.dead[level][other]
+                changes.append((masks, board, masks[board]))
+                masks[board] |= bit
+                dead = geometry.is_blocked(masks[board])
+            # winning a board also makes it dead for other, even when the
+            # child that won it was already dead for them
+            dead = dead or won
+            # a board already dead for other changes nothing above it
+            if dead and level:
+                dead = not self.dead[level - 1][other][parent] & parent_bit
+
+            level -= 1
+            child = board % cells
+            board = parent
+
+        if self.owned[0][player][0]:
+            self.winner = player
+        elif self.dead[0][0][0] and self.dead[0][1][0]:
+            self.drawn = True
+
+        # send the next player to the deepest open board along the move's path
+        level, board = 1, 0
+        for index in move[1:]:
+            if self.closed[level][board] >> index & 1:
+                break
+            level += 1
+            board = board * cells + index
+        self.forced = (level, board)
+        self.player = other
+        return self.winner
+
+    def undo_move(self):
+        """take back the last move played with apply_move and return it"""
+
+        move, self.forced, self.winner, self.drawn, changes = self.history.pop()
+        for masks, board, old in reversed(changes):
+            masks[board] = old
+        self.player ^= 1
+        return move
+
+
+def perft(position: NestedPosition, depth: int) -> int:
+    """count the leaf nodes of the move tree depth moves below position"""
+
+    moves = position.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        position.apply_move(move)
+        nodes += perft(position, depth - 1)
+        position.undo_move()
+    return nodes
+
+
+def random_games(
+    size: int, depth: int, games: int, seed: int = 0, forced=None
+) -> tuple[float, int]:
+    """play games random games, return the seconds taken and the moves played"""
+
+    rng = random.Random(seed)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        position = NestedPosition(size, depth, forced)
+        while not position.is_over():
+            position.apply_move(rng.choice(position.legal_moves()))
+        moves += len(position.history)
+    return time.perf_counter() - start, moves
+
+
+class VariantWindow:
+    """a Tk Canvas to play any variant on, redrawn after every move"""
+
+    position: NestedPosition
+    layout: NestedLayout
+
+    def __init__(self, position: NestedPosition) -> None:
+        import tkinter  # pylint: disable=import-outside-toplevel
+
+        # the window's look is the normal game's
+        from tick_tac_tick_tac_toe import (  # pylint: disable=import-outside-toplevel
+            BACKGROUND_COLOR,
+            OUTER_BOARD_OFFSET_FACTOR,
+            SIZE,
+        )
+
+        self.position = position
+        self.size = SIZE
+        self.layout = get_nested_layout(
+            SIZE,
+            position.geometry.size,
+            position.depth,
+            OUTER_BOARD_OFFSET_FACTOR,
+            VARIANT_OFFSET_FACTOR,
+        )
+
+        self.root = tkinter.Tk()
+        self.root.title(
+            f"Tick Tac Toe {position.geometry.size}x{position.geometry.size}"
+            f", {position.depth} levels"
+        )
+        self.canvas = tkinter.Canvas(
+            self.root,
+            width=SIZE,
+            height=SIZE,
+            background=BACKGROUND_COLOR,
+            highlightthickness=0,
+        )
+        self.canvas.pack()
+        self.canvas.bind("<Button-1>", self.on_mouse_click)
+        self.root.bind("<KeyPress-Left>", lambda event: self.undo())
+
+    def to_canvas(self, x, y) -> tuple[float, float]:  # pylint: disable=invalid-name
+        """convert centered, y up coordinates to canvas coordinates"""
+        return x + self.size / 2, self.size / 2 - y
+
+    def from_canvas(self, x, y) -> tuple[float, float]:  # pylint: disable=invalid-name
+        """convert canvas coordinates to centered, y up coordinates"""
+        return x - self.size / 2, self.size / 2 - y
+
+    def box(self, hitbox, factor: float = 1.0) -> tuple[float, ...]:
+        """the canvas corners of a hitbox shrunk by factor"""
+
+        hitbox = shrink_hitbox(hitbox, factor)
+        return (
+            *self.to_canvas(hitbox.w, hitbox.n),
+            *self.to_canvas(hitbox.e, hitbox.s),
+        )
+
+    def draw_mark(self, hitbox, owner: str, width: float) -> None:
+        """draw an X or an O filling hitbox"""
+
+        from tick_tac_tick_tac_toe import (  # pylint: disable=import-outside-toplevel
+            CELL_OFFSET_FACTOR,
+            O_COLOR,
+            X_COLOR,
+        )
+
+        west, north, east, south = self.box(hitbox, CELL_OFFSET_FACTOR)
+        if owner == PLAYERS[0]:
+            self.canvas.create_line(west, north, east, south, fill=X_COLOR, width=width)
+            self.canvas.create_line(west, south, east, north, fill=X_COLOR, width=width)
+        else:
+            self.canvas.create_oval(
+                west, north, east, south, outline=O_COLOR, width=width
+            )
+
+    def draw(self) -> None:
+        """redraw the whole position"""
+
+        from tick_tac_tick_tac_toe import (  # pylint: disable=import-outside-toplevel
+            LINE_WIDTH_THICK,
+            LINE_WIDTH_THIN,
+            PEN_COLOR,
+            SHADED_COLOR,
+        )
+
+        position = self.position
+        layout = self.layout
+        size = position.geometry.size
+        self.canvas.delete("all")
+
+        if not position.is_over():
+            forced = layout.hitbox(position.forced_path())
+            self.canvas.create_rectangle(
+                *self.box(forced), fill=SHADED_COLOR, outline=""
+            )
+
+        # grids, the higher the board the thicker its lines
+        for level in range(1, position.depth + 1):
+            width = LINE_WIDTH_THIN * (position.depth - level + 1)
+            for hitbox in layout.hitboxes[level]:
+                stride = hitbox.size / size
+                for step in range(1, size):
+                    offset = step * stride
+                    self.canvas.create_line(
+                        *self.to_canvas(hitbox.w + offset, hitbox.n),
+                        *self.to_canvas(hitbox.w + offset, hitbox.s),
+                        fill=PEN_COLOR,
+                        width=width,
+                    )
+                    self.canvas.create_line(
+                        *self.to_canvas(hitbox.w, hitbox.s + offset),
+                        *self.to_canvas(hitbox.e, hitbox.s + offset),
+                        fill=PEN_COLOR,
+                        width=width,
+                    )
+
+        # marks, cells first so the marks of won boards are drawn over them
+        for level in range(position.depth, 0, -1):
+            width = LINE_WIDTH_THICK * (position.depth - level + 1) / position.depth
+            for board in range(len(layout.hitboxes[level])):
+                path = position.path_of(level, board)
+                for index in range(position.geometry.cells):
+                    owner = position.owner((*path, index))
+                    if owner != EMPTY:
+                        self.draw_mark(
+                            layout.hitbox((*path, index)), owner, max(width / size, 1)
+                        )
+        if position.winner is not None:
+            self.draw_mark(
+                layout.top_hitbox, PLAYERS[position.winner], LINE_WIDTH_THICK
+            )
+
+    def on_mouse_click(self, event) -> None:
+        """play the clicked cell if it is a legal move"""
+
+        path = self.layout.hit_path(self.from_canvas(event.x, event.y))
+        if self.position.is_legal(path):
+            self.position.apply_move(path)
+            self.draw()
+
+    def undo(self) -> None:
+        """take back the last move"""
+
+        if self.position.history:
+            self.position.undo_move()
+            self.draw()
+
+    def mainloop(self) -> None:
+        """draw the board and run the event loop until the window is closed"""
+
+        self.draw()
+        self.root.mainloop()
+
+
+def main() -> None:
+    "main"
+
+    parser = argparse.ArgumentParser(description="play or time larger variants")
+    parser.add_argument("--size", type=int, default=3, help="cells along a board")
+    parser.add_argument("--depth", type=int, default=2, help="levels of boards")
+    parser.add_argument("--perft", type=int, default=3, help="depth of the move tree")
+    parser.add_argument("--games", type=int, default=200, help="random games to time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--play", action="store_true", help="open a window to play in")
+    parser.add_argument(
+        "--anywhere",
+        action="store_true",
+        help="let the first move be played anywhere, not in the last sub-board",
+    )
+    args = parser.parse_args()
+    forced = () if args.anywhere else None
+
+    if args.play:
+        VariantWindow(NestedPosition(args.size, args.depth, forced)).mainloop()
+        return
+
+    cells = get_geometry(args.size).cells ** args.depth
+    print(f"{args.size}x{args.size} boards, {args.depth} levels, {cells} cells")
+    for depth in range(1, args.perft + 1):
+        start = time.perf_counter()
+        nodes = perft(NestedPosition(args.size, args.depth, forced), depth)
+        seconds = time.perf_counter() - start
+        print(
+            f"perft {depth}: {nodes:12} nodes {seconds:8.3f}s "
+            f"{nodes / max(seconds, 1e-9):12,.0f} nodes/s"
+        )
+
+    seconds, moves = random_games(args.size, args.depth, args.games, args.seed, forced)
+    print(
+        f"{args.games} random games, {moves / args.games:.1f} moves each: "
+        f"{args.games / seconds:,.0f} games/s, {moves / seconds:,.0f} moves/s"
+    )
+
+
+if __name__ == "__main__":
+    main()